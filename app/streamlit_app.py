@@ -1,12 +1,9 @@
 import streamlit as st
 import tempfile
 import os
+import hashlib
 import sys
 from pathlib import Path
-import nltk
-
-nltk.download('punkt')
-
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -16,9 +13,13 @@ from src.inference import (
     extract_text_from_pdf, 
     classify_causality, 
     process_pdf_file, 
-    process_multiple_pdfs
+    process_multiple_pdfs,
+    ensure_sentence_tokenizer
 )
 
+# The hosted app may fetch the punkt sentence tokenizer; library imports never do
+ensure_sentence_tokenizer(allow_download=True)
+
 # App Configuration
 st.set_page_config(
     page_title="Drug Causality Classifier",
@@ -42,6 +43,19 @@ def load_model():
 
 classifier = load_model()
 
+# Uploads whose results are kept across reruns
+MAX_CACHED_UPLOADS = 16
+
+@st.cache_data(max_entries=MAX_CACHED_UPLOADS, show_spinner=False)
+def extract_uploaded_text(file_hash, _data):
+    """Text of an uploaded PDF, memoized by content hash"""
+    return extract_text_from_pdf(_data)
+
+@st.cache_data(max_entries=MAX_CACHED_UPLOADS, show_spinner=False)
+def analyze_uploaded_pdf(file_hash, threshold, _data):
+    """Classification of an uploaded PDF, memoized by content hash and threshold"""
+    return classify_causality(extract_uploaded_text(file_hash, _data), threshold=threshold)
+
 # Sidebar Configuration
 st.sidebar.header("⚙️ Configuration")
 threshold = st.sidebar.slider(
@@ -135,20 +149,15 @@ with tab2:
     )
     
     if pdf_file and classifier:
-        # Save uploaded file temporarily
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, pdf_file.name)
-        
-        with open(temp_path, "wb") as tmp_f:
-            tmp_f.write(pdf_file.getbuffer())
+        pdf_bytes = pdf_file.getvalue()
+        file_hash = hashlib.sha256(pdf_bytes).hexdigest()
         
         # Analysis Button
         if st.button("🔍 Analyze PDF", type="primary", use_container_width=True):
             with st.spinner(f"Processing {pdf_file.name}..."):
                 try:
-                    # Extract and classify
-                    pdf_text = extract_text_from_pdf(temp_path)
-                    results = classify_causality(pdf_text, threshold=threshold)
+                    # Extract and classify (repeat runs on the same file are served from cache)
+                    results = analyze_uploaded_pdf(file_hash, threshold, pdf_bytes)
                     
                     # Display Summary
                     st.subheader("📊 Analysis Summary")
@@ -210,13 +219,6 @@ with tab2:
                 except Exception as e:
                     st.error(f"Error processing PDF: {str(e)}")
                     st.info("Please ensure the PDF contains readable text and try again.")
-                
-                # Clean up temp file
-                finally:
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
 
 # TAB 3: Batch Processing
 with tab3:
@@ -1,24 +1,52 @@
 # Drug Causality BERT v2.0 - FULLY AUTOMATED WITH AUTO-DOWNLOADS
 import streamlit as st
 import torch
+import numpy as np
 import re
+import hashlib
 import json
-import requests
+import os
 from typing import Dict, Set, List
 from datetime import datetime
-import PyPDF2
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import base64
 from io import BytesIO
+from src.text_matching import MarkerDetector
+from src import extractors
+from src.extractors import ADRExtractor, CaseInfoExtractor, DrugExtractor
+from src.lexicon import Lexicon
+from src.meddra import load_meddra
+from src.pdf_cache import get_pdf_text_cache
+from src.pdf_text import extract_pdf_pages
+from src.inference import CausalityStream, iter_document_sentences
+from src.faers import FDAFAERSConnector
 
 # Store PDF analysis in session
 if 'pdf_data' not in st.session_state:
     st.session_state.pdf_data = None
 if 'extracted_data' not in st.session_state:
     st.session_state.extracted_data = None
+# Per-sentence model scores of uploaded documents, keyed by file hash
+if 'document_scores' not in st.session_state:
+    st.session_state.document_scores = {}
+
+# Optional local MedDRA ASCII distribution (MedAscii directory, see src/meddra.py)
+MEDDRA_DIR_ENV = 'DRUG_CAUSALITY_MEDDRA_DIR'
+
+@st.cache_resource
+def load_meddra_dictionary():
+    path = os.environ.get(MEDDRA_DIR_ENV)
+    if not path:
+        return None
+    try:
+        return load_meddra(path)
+    except Exception as e:
+        st.warning(f"Could not load MedDRA distribution {path}: {e}")
+        return None
 
 class MedDRAStandardizer:
-    def __init__(self):
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary if dictionary is not None else load_meddra_dictionary()
         self.meddra_mapping = {
             'hearing loss': 'Deafness',
             'neuropathy': 'Neuropathy peripheral',
@@ -33,40 +61,23 @@ class MedDRAStandardizer:
             'rash': 'Rash',
         }
     
+        self.fallback = Lexicon((value, key) for key, value in self.meddra_mapping.items())
+    
+    def lookup(self, adr_text):
+        """Full LLT -> PT -> SOC record, if a MedDRA distribution is loaded"""
+        if self.dictionary is None:
+            return None
+        return self.dictionary.best_match(adr_text)
+    
     def standardize(self, adr_text):
-        adr_lower = adr_text.lower().strip()
-        for key, value in self.meddra_mapping.items():
-            if key in adr_lower:
-                return value
+        record = self.lookup(adr_text)
+        if record is not None and record['pt_name']:
+            return record['pt_name']
+        hits = self.fallback.scan(adr_text)
+        if hits:
+            return hits[0][2]
         return adr_text.title()
 
-class FDAFAERSConnector:
-    def __init__(self):
-        self.api_url = 'https://api.fda.gov/drug/event.json'
-    
-    def get_adverse_events(self, drug_name, limit=5):
-        try:
-            params = {
-                'search': f'patient.drug.openfda.generic_name:"{drug_name}"',
-                'limit': limit
-            }
-            response = requests.get(self.api_url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                events = []
-                if 'results' in data:
-                    for report in data['results'][:limit]:
-                        if 'patient' in report and 'reaction' in report['patient']:
-                            for reaction in report['patient']['reaction']:
-                                events.append({
-                                    'event': reaction.get('reactionmeddrapt', 'Unknown'),
-                                    'outcome': reaction.get('reactionoutcome', 'Unknown'),
-                                })
-                return events
-        except:
-            pass
-        return []
-
 def preprocess_medical_causality(text):
     text_lower = text.lower()
     replacements = {
@@ -82,88 +93,27 @@ def preprocess_medical_causality(text):
         text_lower = text_lower.replace(old, new)
     return text_lower
 
+CAUSALITY_MARKER_DETECTOR = MarkerDetector(
+    ['secondary to', 'caused by', 'induced by', 'due to', 'side effect', 'adverse effect']
+)
+
 def detect_causality_markers(text):
-    markers = ['secondary to', 'caused by', 'induced by', 'due to', 'side effect', 'adverse effect']
-    text_lower = text.lower()
-    found = [m for m in markers if m in text_lower]
-    return {'has_markers': len(found) > 0, 'markers': found, 'count': len(found)}
-
-class DrugExtractor:
-    def __init__(self):
-        self.common_drugs = {
-            'bortezomib': ['bortezomib', 'velcade'],
-            'metoprolol': ['metoprolol', 'lopressor'],
-            'rituximab': ['rituximab', 'rituxan'],
-            'simvastatin': ['simvastatin', 'zocor'],
-            'paclitaxel': ['paclitaxel', 'taxol'],
-            'cisplatin': ['cisplatin', 'platinol'],
-            'doxorubicin': ['doxorubicin', 'adriamycin'],
-            'methotrexate': ['methotrexate', 'mtx'],
-        }
-    
-    def extract(self, text):
-        text_lower = text.lower()
-        found_drugs = set()
-        for drug_name, variants in self.common_drugs.items():
-            for variant in variants:
-                if variant in text_lower:
-                    found_drugs.add(drug_name)
-                    break
-        return found_drugs
-    
-    def get_frequencies(self, text):
-        text_lower = text.lower()
-        frequencies = {}
-        for drug_name, variants in self.common_drugs.items():
-            count = sum(text_lower.count(variant) for variant in variants)
-            if count > 0:
-                frequencies[drug_name] = count
-        return frequencies
-
-class ADRExtractor:
-    def __init__(self):
-        self.adr_keywords = {
-            'hearing loss': ['hearing loss', 'deafness'],
-            'neuropathy': ['neuropathy', 'nerve damage'],
-            'cardiotoxicity': ['cardiotoxicity', 'heart damage'],
-            'nephrotoxicity': ['nephrotoxicity', 'kidney damage'],
-            'hepatotoxicity': ['hepatotoxicity', 'liver damage'],
-            'thrombocytopenia': ['thrombocytopenia'],
-            'anemia': ['anemia'],
-            'nausea': ['nausea'],
-            'vomiting': ['vomiting'],
-            'diarrhea': ['diarrhea'],
-        }
-    
-    def extract(self, text):
-        text_lower = text.lower()
-        found = set()
-        for adr, keywords in self.adr_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    found.add(adr)
-                    break
-        return found
-
-class CaseInfoExtractor:
-    def extract_demographics(self, text):
-        info = {}
-        age_match = re.search(r'(\d{1,3})\s*(?:year|yo|y\.o\.)', text, re.IGNORECASE)
-        if age_match:
-            info['age'] = age_match.group(1)
-        gender_match = re.search(r'(male|female|man|woman)', text, re.IGNORECASE)
-        if gender_match:
-            info['gender'] = gender_match.group(1).capitalize()
-        return info
-    
-    def extract_conditions(self, text):
-        conditions = []
-        keywords = ['diabetes', 'hypertension', 'cancer', 'infection', 'renal', 'hepatic', 'cardiac']
-        text_lower = text.lower()
-        for condition in keywords:
-            if condition in text_lower:
-                conditions.append(condition.capitalize())
-        return conditions
+    info = CAUSALITY_MARKER_DETECTOR.detect(text)
+    return {
+        'has_markers': info['has_markers'],
+        'markers': info['markers_found'],
+        'count': info['marker_count'],
+        'spans': info['spans'],
+    }
+
+# Built-in term tables plus optional dictionaries (see src/extractors.py), loaded once per process
+@st.cache_resource
+def load_drug_lexicon():
+    return extractors.load_drug_lexicon(on_error=st.warning)
+
+@st.cache_resource
+def load_adr_lexicon():
+    return extractors.load_adr_lexicon(on_error=st.warning)
 
 @st.cache_resource
 def load_model():
@@ -207,6 +157,108 @@ def classify_text(text, threshold, enhance):
         'probs': {'not_related': float(probs[0]), 'related': float(probs[1])}
     }
 
+# Uploads whose extraction results are kept across reruns
+MAX_CACHED_UPLOADS = 16
+
+@st.cache_data(max_entries=MAX_CACHED_UPLOADS, show_spinner=False)
+def analyze_upload(file_hash, _data):
+    """PDF text and extractor output of an upload, memoized by content hash"""
+    pages = extract_pdf_pages(_data, cache=get_pdf_text_cache())
+    pdf_text = ''.join(page.text for page in pages)
+    
+    drug_hits = DrugExtractor(load_drug_lexicon()).analyze(pdf_text)
+    adrs = ADRExtractor(load_adr_lexicon()).extract(pdf_text)
+    case_ext = CaseInfoExtractor()
+    meddra = MedDRAStandardizer()
+    
+    return {
+        'pdf_text': pdf_text,
+        'drugs': list(drug_hits['found']),
+        'freqs': drug_hits['counts'],
+        'adrs': list(adrs),
+        'adr_standard': {adr: meddra.standardize(adr) for adr in adrs},
+        'demographics': case_ext.extract_demographics(pdf_text),
+        'conditions': case_ext.extract_conditions(pdf_text),
+        'page_errors': [(page.number, page.error) for page in pages if page.error],
+    }
+
+# Sentences per forward pass when scoring a whole document
+DOCUMENT_BATCH_SIZE = 32
+# Uploaded documents whose sentence scores are kept in the session
+MAX_STORED_DOCUMENTS = 5
+
+def score_document_sentences(pdf_text):
+    """Related-class probability and markers of every sentence (independent of threshold/enhance)"""
+    tokenizer, model = load_model()
+    if not tokenizer:
+        return None
+    
+    model.eval()
+    sentences = [
+        sent for sent in iter_document_sentences(pdf_text)
+        if len(sent.strip()) >= CausalityStream.MIN_SENTENCE_CHARS
+    ]
+    markers = [
+        {'has_markers': info['has_markers'], 'markers': info['markers_found'],
+         'count': info['marker_count'], 'spans': info['spans']}
+        for info in CAUSALITY_MARKER_DETECTOR.detect_batch(sentences)
+    ]
+    
+    # Length-sorted chunks keep padding per forward pass small
+    related = np.zeros(len(sentences), dtype=np.float32)
+    order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+    for start in range(0, len(order), DOCUMENT_BATCH_SIZE):
+        chunk = order[start:start + DOCUMENT_BATCH_SIZE]
+        inputs = tokenizer([preprocess_medical_causality(sentences[i]) for i in chunk],
+                           return_tensors='pt', truncation=True, padding=True, max_length=96)
+        with torch.no_grad():
+            probs = torch.softmax(model(**inputs).logits, dim=1).numpy()
+        related[chunk] = probs[:, 1]
+    
+    return {'sentences': sentences, 'related': related, 'markers': markers}
+
+def get_document_scores(doc_hash, pdf_text):
+    """Sentence scores of a document, computed once per session"""
+    store = st.session_state.document_scores
+    if doc_hash not in store:
+        with st.spinner('Classifying document sentences...'):
+            scores = score_document_sentences(pdf_text)
+        if scores is None:
+            return None
+        store[doc_hash] = scores
+        while len(store) > MAX_STORED_DOCUMENTS:
+            store.pop(next(iter(store)))
+    return store[doc_hash]
+
+def threshold_document(scores, threshold, enhance):
+    """Document classification from stored sentence scores (same keys as classify_text)"""
+    if not scores or not scores['sentences']:
+        return None
+    
+    base = scores['related'].astype(np.float64)
+    final = base
+    if enhance:
+        counts = np.array([m['count'] for m in scores['markers']], dtype=np.float64)
+        boosted = np.minimum(base + np.minimum(0.15, counts * 0.05), 0.99)
+        final = np.where(counts > 0, boosted, base)
+    
+    related = final > threshold
+    top = int(np.argmax(final))
+    return {
+        'prediction': 'RELATED' if related.any() else 'NOT RELATED',
+        'confidence': float(final[top]),
+        'base_score': float(base[top]),
+        'markers': scores['markers'][top],
+        'probs': {'not_related': float(1 - base[top]), 'related': float(base[top])},
+        'related_sentences': int(related.sum()),
+        'total_sentences': len(base),
+        'top_sentence': scores['sentences'][top],
+    }
+
+def classify_document(doc_hash, pdf_text, threshold, enhance):
+    """Whole-document classification; only the first call per document runs the model"""
+    return threshold_document(get_document_scores(doc_hash, pdf_text), threshold, enhance)
+
 def generate_professional_summary(pdf_text, drug, adrs, case_info, classification):
     """Generate comprehensive medical case summary report with robust fallback handling"""
     summary = 'MEDICAL CASE SUMMARY\n'
@@ -740,29 +792,31 @@ with tabs[0]:
     uploaded = st.file_uploader('Upload Literature/Case Report PDF', type=['pdf'], key='pdf_upload')
     
     if uploaded:
+        pdf_bytes = uploaded.getvalue()
+        doc_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        
+        # Reruns (any widget change) reuse the analysis of the same file
         with st.spinner('Analyzing PDF...'):
-            reader = PyPDF2.PdfReader(uploaded)
-            pdf_text = ''.join([page.extract_text() for page in reader.pages])
-            
-            drug_ext = DrugExtractor()
-            adr_ext = ADRExtractor()
-            case_ext = CaseInfoExtractor()
-            meddra = MedDRAStandardizer()
-            
-            drugs = drug_ext.extract(pdf_text)
-            freqs = drug_ext.get_frequencies(pdf_text)
-            adrs = adr_ext.extract(pdf_text)
-            demographics = case_ext.extract_demographics(pdf_text)
-            conditions = case_ext.extract_conditions(pdf_text)
-            
-            st.session_state.extracted_data = {
-                'pdf_text': pdf_text,
-                'drugs': list(drugs),
-                'freqs': freqs,
-                'adrs': list(adrs),
-                'demographics': demographics,
-                'conditions': conditions
-            }
+            analysis = analyze_upload(doc_hash, pdf_bytes)
+        
+        for page_number, error in analysis['page_errors']:
+            st.warning(f'Page {page_number} could not be read: {error}')
+        
+        pdf_text = analysis['pdf_text']
+        drugs = analysis['drugs']
+        freqs = analysis['freqs']
+        adrs = analysis['adrs']
+        demographics = analysis['demographics']
+        conditions = analysis['conditions']
+        
+        st.session_state.extracted_data = {
+            'pdf_text': pdf_text,
+            'drugs': drugs,
+            'freqs': freqs,
+            'adrs': adrs,
+            'demographics': demographics,
+            'conditions': conditions
+        }
         
         st.success(f'✅ Extracted: {len(drugs)} drugs, {len(adrs)} ADRs')
         
@@ -790,7 +844,7 @@ with tabs[0]:
             st.subheader('⚠️ Detected ADRs (MedDRA)')
             if adrs:
                 for adr in sorted(adrs):
-                    standard = meddra.standardize(adr)
+                    standard = analysis['adr_standard'][adr]
                     st.write(f'🔴 {adr} → **{standard}**')
             else:
                 st.info('No ADRs detected')
@@ -809,12 +863,20 @@ with tabs[0]:
                 selected_adr = st.multiselect('Select Adverse Events', st.session_state.extracted_data['adrs'], 
                                             default=st.session_state.extracted_data['adrs'][:1] if st.session_state.extracted_data['adrs'] else [])
             
+            # Once scored, threshold/enhance changes only re-threshold the stored scores
+            if doc_hash in st.session_state.document_scores:
+                document_result = threshold_document(st.session_state.document_scores[doc_hash], threshold, enhance)
+                if document_result:
+                    st.caption(f"Document classification: **{document_result['prediction']}** "
+                               f"({document_result['related_sentences']}/{document_result['total_sentences']} "
+                               f"sentences above threshold, max confidence {document_result['confidence']:.2%})")
+            
             col1, col2, col3 = st.columns(3)
             
             with col1:
                 if st.button('📝 Generate Summary', use_container_width=True):
                     if selected_drug and selected_drug != 'None':
-                        classification = classify_text(pdf_text[:2000], threshold, enhance)
+                        classification = classify_document(doc_hash, pdf_text, threshold, enhance)
                         case_info = {'demographics': demographics, 'conditions': conditions}
                         summary = generate_professional_summary(pdf_text, selected_drug, selected_adr, case_info, classification)
                         
@@ -827,7 +889,7 @@ with tabs[0]:
             with col2:
                 if st.button('🔬 Generate Causality', use_container_width=True):
                     if selected_drug and selected_drug != 'None':
-                        classification = classify_text(pdf_text[:2000], threshold, enhance)
+                        classification = classify_document(doc_hash, pdf_text, threshold, enhance)
                         causality = generate_causality_assessment(selected_drug, selected_adr, classification, {'demographics': demographics})
                         
                         st.text_area('Causality Assessment:', causality, height=400, disabled=True)
@@ -839,7 +901,7 @@ with tabs[0]:
             with col3:
                 if st.button('📋 Generate PBRER', use_container_width=True):
                     if selected_drug and selected_drug != 'None':
-                        classification = classify_text(pdf_text[:2000], threshold, enhance)
+                        classification = classify_document(doc_hash, pdf_text, threshold, enhance)
                         pbrer = generate_pbrer_section11(selected_drug, selected_adr, classification)
                         
                         st.text_area('PBRER Section 11:', pbrer, height=400, disabled=True)
@@ -878,8 +940,8 @@ with tabs[2]:
     
     if st.button('Extract'):
         if text.strip():
-            drug_ext = DrugExtractor()
-            adr_ext = ADRExtractor()
+            drug_ext = DrugExtractor(load_drug_lexicon())
+            adr_ext = ADRExtractor(load_adr_lexicon())
             drugs = drug_ext.extract(text)
             adrs = adr_ext.extract(text)
             
@@ -0,0 +1,403 @@
+"""
+Benchmarks for the inference and extraction hot paths
+
+Runs offline by default: the model is a tiny randomly initialized BERT built
+from the production config and tokenizer (models/production_model_final),
+so tokenization matches production while the forward pass stays cheap. Pass
+--model-path to measure a real model instead. Synthetic documents and PDFs
+are generated from a fixed seed.
+
+Cases:
+    preprocess              preprocess_medical_causality per sentence
+    markers                 detect_causality_markers per sentence
+    markers_batch           detect_causality_markers_batch over all sentences
+    predict                 CausalityClassifier.predict (batch of one)
+    predict_batch           CausalityClassifier.predict_batch
+    classify_document/N     classify_causality on an N-sentence document
+    pdf_extract/N           iter_pdf_pages on an N-page PDF (no cache)
+    app_drug_extractor      DrugExtractor.analyze on a document
+    app_adr_extractor       ADRExtractor.analyze on a document
+    app_case_info           CaseInfoExtractor on a document
+
+The app_* cases run the extractors app_v2 uses (src/extractors.py), with the
+same lexicons: built-in terms plus DRUG_CAUSALITY_DRUG_DICTIONARY /
+DRUG_CAUSALITY_ADR_DICTIONARY if set.
+
+Usage:
+    python benchmarks/hot_paths.py --output bench.json
+    python benchmarks/hot_paths.py --model-path models/production_model_final --only predict
+    python benchmarks/hot_paths.py --compare baseline.json --max-regression 1.25
+"""
+
+import argparse
+import hashlib
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+PRODUCTION_MODEL_DIR = REPO_ROOT / 'models' / 'production_model_final'
+
+# Shape of the offline stand-in model (vocabulary comes from the production tokenizer)
+TINY_MODEL_CONFIG = {
+    'num_hidden_layers': 2,
+    'hidden_size': 64,
+    'num_attention_heads': 2,
+    'intermediate_size': 128,
+}
+TOKENIZER_FILES = ('tokenizer.json', 'tokenizer_config.json', 'special_tokens_map.json', 'vocab.txt')
+
+DEFAULT_DOCUMENT_SIZES = (50, 200, 1000)
+DEFAULT_PDF_PAGES = (10, 50)
+DEFAULT_SEED = 0
+
+SENTENCE_TEMPLATES = [
+    "Patient developed {adr} after taking {drug}.",
+    "{adr} secondary to {drug} is a very rare side effect.",
+    "{adr} following {drug} administration resolved after dechallenge.",
+    "The {adr} was attributed to {drug}-induced toxicity.",
+    "{drug} was discontinued after the patient developed {adr}.",
+    "Patient has a history of diabetes and hypertension.",
+    "A {age}-year-old {sex} was admitted with fever and fatigue.",
+    "The patient was discharged in stable condition.",
+    "Blood pressure was controlled with {drug} throughout the admission.",
+    "No adverse events were reported during the study period.",
+    "Renal function remained within normal limits.",
+    "Ok.",
+]
+DRUGS = ['bortezomib', 'cisplatin', 'paclitaxel', 'doxorubicin', 'methotrexate', 'rituximab', 'metoprolol', 'simvastatin']
+ADRS = ['hearing loss', 'neuropathy', 'cardiotoxicity', 'hepatotoxicity', 'thrombocytopenia', 'rash', 'nephrotoxicity']
+
+
+def synthetic_sentences(count, seed=DEFAULT_SEED):
+    """Reproducible case-report style sentences (some too short to classify)"""
+    rng = random.Random(seed)
+    return [
+        rng.choice(SENTENCE_TEMPLATES).format(
+            drug=rng.choice(DRUGS), adr=rng.choice(ADRS),
+            age=rng.randint(18, 90), sex=rng.choice(['male', 'female'])
+        )
+        for _ in range(count)
+    ]
+
+
+def synthetic_document(sentence_count, seed=DEFAULT_SEED):
+    return ' '.join(synthetic_sentences(sentence_count, seed))
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_synthetic_pdf(path, page_count, sentences_per_page=30, seed=DEFAULT_SEED):
+    """Write a plain-text PDF (Helvetica, one content stream per page)"""
+    objects = {
+        1: "<< /Type /Catalog /Pages 2 0 R >>",
+        3: "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    number = 4
+    for page in range(page_count):
+        text = ' '.join(synthetic_sentences(sentences_per_page, seed * 100003 + page))
+        lines = [text[i:i + 90] for i in range(0, len(text), 90)]
+        stream = "BT /F1 10 Tf 40 800 Td 12 TL " + ' '.join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        objects[number] = (
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {number + 1} 0 R >>"
+        )
+        objects[number + 1] = f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream"
+        kids.append(number)
+        number += 2
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {page_count} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for index in range(1, number):
+        offsets[index] = len(out)
+        out += f"{index} 0 obj\n{objects[index]}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {number}\n0000000000 65535 f \n".encode('latin-1')
+    for index in range(1, number):
+        out += f"{offsets[index]:010d} 00000 n \n".encode('latin-1')
+    out += f"trailer\n<< /Size {number} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+
+    Path(path).write_bytes(bytes(out))
+    return path
+
+
+def build_tiny_model(source_dir=PRODUCTION_MODEL_DIR, output_dir=None, seed=DEFAULT_SEED):
+    """
+    Randomly initialized small BERT with the production config and tokenizer
+
+    Built once and cached under the user cache directory, keyed by the
+    source config, tokenizer and TINY_MODEL_CONFIG.
+
+    Returns:
+        Path of the model directory
+    """
+    source_dir = Path(source_dir)
+    if output_dir is None:
+        from src.paths import get_cache_dir
+        digest = hashlib.sha256(json.dumps(TINY_MODEL_CONFIG, sort_keys=True).encode('utf-8'))
+        digest.update(str(seed).encode('utf-8'))
+        for name in ('config.json',) + TOKENIZER_FILES:
+            if (source_dir / name).exists():
+                digest.update((source_dir / name).read_bytes())
+        output_dir = get_cache_dir() / 'benchmarks' / f"tiny-bert-{digest.hexdigest()[:16]}"
+    output_dir = Path(output_dir)
+    if (output_dir / 'config.json').exists():
+        return output_dir
+
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    config = AutoConfig.from_pretrained(source_dir)
+    for key, value in TINY_MODEL_CONFIG.items():
+        setattr(config, key, value)
+
+    torch.manual_seed(seed)
+    model = AutoModelForSequenceClassification.from_config(config)
+
+    output_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix='tiny-bert-', dir=output_dir.parent))
+    model.save_pretrained(tmp_dir)
+    for name in TOKENIZER_FILES:
+        if (source_dir / name).exists():
+            shutil.copy2(source_dir / name, tmp_dir / name)
+
+    try:
+        tmp_dir.rename(output_dir)
+    except OSError:
+        # Another process built it first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return output_dir
+
+
+def time_callable(fn, items=1, repeat=5, min_seconds=0.2, warmup=1):
+    """
+    Time a callable
+
+    Each of the `repeat` samples calls fn enough times to take at least
+    `min_seconds` (calibrated on the first sample).
+
+    Args:
+        fn: Callable without arguments
+        items: Units of work per call (sentences, pages, ...)
+
+    Returns:
+        dict with per-call median/min/max in ms, items/second and sample info
+    """
+    for _ in range(warmup):
+        fn()
+
+    start = time.perf_counter()
+    fn()
+    once = max(time.perf_counter() - start, 1e-9)
+    number = max(1, int(min_seconds / once))
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    median = statistics.median(samples)
+    return {
+        'median_ms': median * 1000,
+        'min_ms': min(samples) * 1000,
+        'max_ms': max(samples) * 1000,
+        'items': items,
+        'items_per_second': items / median if median else None,
+        'repeat': repeat,
+        'calls_per_sample': number,
+    }
+
+
+def run_benchmarks(model_path=None, document_sizes=DEFAULT_DOCUMENT_SIZES, pdf_pages=DEFAULT_PDF_PAGES,
+                   only=None, repeat=5, min_seconds=0.2, batch_size=32, seed=DEFAULT_SEED, verbose=True):
+    """
+    Run every case (or those whose name contains one of `only`)
+
+    Returns:
+        dict with 'meta' (environment, model, settings) and 'results' (case -> timing)
+    """
+    from src.inference import (
+        CausalityClassifier, classify_causality, detect_causality_markers,
+        detect_causality_markers_batch, ensure_sentence_tokenizer, preprocess_medical_causality
+    )
+    from src.extractors import ADRExtractor, CaseInfoExtractor, DrugExtractor
+    from src.pdf_text import iter_pdf_pages
+
+    def selected(name):
+        return not only or any(pattern in name for pattern in only)
+
+    results = {}
+
+    def record(name, fn, items):
+        if not selected(name):
+            return
+        results[name] = time_callable(fn, items=items, repeat=repeat, min_seconds=min_seconds)
+        if verbose:
+            r = results[name]
+            print(f"? {name:<28} {r['median_ms']:10.3f} ms  {r['items_per_second']:12.1f} items/s")
+
+    model_kind = 'real' if model_path else 'tiny-random'
+    if model_path is None:
+        model_path = build_tiny_model(seed=seed)
+
+    sentences = synthetic_sentences(256, seed)
+    sentence = sentences[0]
+
+    record('preprocess', lambda: [preprocess_medical_causality(s) for s in sentences], len(sentences))
+    record('markers', lambda: [detect_causality_markers(s) for s in sentences], len(sentences))
+    record('markers_batch', lambda: detect_causality_markers_batch(sentences), len(sentences))
+
+    classifier = None
+    if any(selected(name) for name in ('predict', 'predict_batch', 'classify_document')):
+        classifier = CausalityClassifier(str(model_path), batch_size=batch_size)
+        record('predict', lambda: classifier.predict(sentence), 1)
+        record('predict_batch', lambda: classifier.predict_batch(sentences, batch_size=batch_size), len(sentences))
+
+        for size in document_sizes:
+            document = synthetic_document(size, seed)
+            record(
+                f'classify_document/{size}',
+                lambda document=document: classify_causality(document, classifier=classifier),
+                size
+            )
+
+    if any(selected(f'pdf_extract/{pages}') for pages in pdf_pages):
+        with tempfile.TemporaryDirectory(prefix='bench-pdf-') as tmp:
+            for pages in pdf_pages:
+                pdf_path = write_synthetic_pdf(Path(tmp) / f'{pages}.pdf', pages, seed=seed)
+                data = Path(pdf_path).read_bytes()
+                record(f'pdf_extract/{pages}', lambda data=data: list(iter_pdf_pages(data)), pages)
+
+    if any(selected(name) for name in ('app_drug_extractor', 'app_adr_extractor', 'app_case_info')):
+        drug_extractor, adr_extractor, case_extractor = DrugExtractor(), ADRExtractor(), CaseInfoExtractor()
+        document = synthetic_document(max(document_sizes), seed)
+        words = len(document.split())
+        record('app_drug_extractor', lambda: drug_extractor.analyze(document), words)
+        record('app_adr_extractor', lambda: adr_extractor.analyze(document), words)
+        record(
+            'app_case_info',
+            lambda: (case_extractor.extract_demographics(document), case_extractor.extract_conditions(document)),
+            words
+        )
+
+    tokenizer = ensure_sentence_tokenizer()
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'packages': _package_versions(),
+            'model_kind': model_kind,
+            'model_path': str(model_path),
+            'sentence_tokenizer': getattr(tokenizer, '__name__', str(tokenizer)),
+            'document_sizes': list(document_sizes),
+            'pdf_pages': list(pdf_pages),
+            'batch_size': batch_size,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+def _git_commit():
+    try:
+        completed = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        return completed.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _package_versions():
+    versions = {}
+    for name in ('torch', 'transformers', 'PyPDF2', 'numpy', 'regex'):
+        module = sys.modules.get(name)
+        versions[name] = getattr(module, '__version__', None) if module else None
+    return versions
+
+
+def compare_reports(baseline, current, max_regression=None):
+    """
+    Median time ratio (current / baseline) per case present in both
+
+    Returns:
+        (rows, regressions): rows of (case, baseline_ms, current_ms, ratio);
+        regressions lists cases whose ratio exceeds max_regression
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] else None
+        rows.append((name, base['median_ms'], result['median_ms'], ratio))
+
+    regressions = [
+        name for name, _, _, ratio in rows
+        if max_regression is not None and ratio is not None and ratio > max_regression
+    ]
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inference and extraction hot paths")
+    parser.add_argument('--model-path', help="Real model to benchmark (default: tiny random BERT, offline)")
+    parser.add_argument('--only', nargs='+', help="Run cases whose name contains any of these")
+    parser.add_argument('--document-sizes', type=int, nargs='+', default=list(DEFAULT_DOCUMENT_SIZES))
+    parser.add_argument('--pdf-pages', type=int, nargs='+', default=list(DEFAULT_PDF_PAGES))
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-seconds', type=float, default=0.2, help="Minimum duration of each sample")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON report to compare against")
+    parser.add_argument('--max-regression', type=float, default=None,
+                        help="With --compare, fail if a case's median exceeds baseline by this factor (e.g. 1.25)")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        model_path=args.model_path, document_sizes=args.document_sizes, pdf_pages=args.pdf_pages,
+        only=args.only, repeat=args.repeat, min_seconds=args.min_seconds,
+        batch_size=args.batch_size, seed=args.seed
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"? Report saved: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows, regressions = compare_reports(baseline, report, args.max_regression)
+        print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('git_commit')}):")
+        for name, base_ms, current_ms, ratio in rows:
+            flag = '  REGRESSION' if name in regressions else ''
+            print(f"  {name:<28} {base_ms:10.3f} -> {current_ms:10.3f} ms  x{ratio:.2f}{flag}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
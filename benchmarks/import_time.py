@@ -0,0 +1,96 @@
+"""
+Import-time benchmark for src.inference
+
+Imports the module in fresh interpreters and reports the wall time. Fails
+(exit code 1) if the median exceeds the budget or if the import pulled in
+heavy or network-related modules that must only load on first use.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 20 --max-ms 400 --output import_time.json
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Must not be imported by `import src.inference`
+FORBIDDEN_MODULES = ('torch', 'transformers', 'PyPDF2', 'nltk', 'onnxruntime', 'huggingface_hub')
+
+DEFAULT_MODULE = 'src.inference'
+DEFAULT_RUNS = 10
+DEFAULT_MAX_MS = 500.0
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'forbidden': [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module=DEFAULT_MODULE, runs=DEFAULT_RUNS):
+    """
+    Import a module in `runs` fresh interpreters
+
+    Returns:
+        dict with per-run seconds, median/min/max in ms and any forbidden
+        modules that were loaded
+    """
+    probe = _PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)
+
+    seconds = []
+    forbidden = set()
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', probe], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        seconds.append(result['seconds'])
+        forbidden.update(result['forbidden'])
+
+    return {
+        'module': module,
+        'runs': runs,
+        'median_ms': statistics.median(seconds) * 1000,
+        'min_ms': min(seconds) * 1000,
+        'max_ms': max(seconds) * 1000,
+        'seconds': seconds,
+        'forbidden_modules_loaded': sorted(forbidden),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the import time of src.inference")
+    parser.add_argument('--module', default=DEFAULT_MODULE)
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--max-ms', type=float, default=DEFAULT_MAX_MS, help="Budget for the median import time")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = measure_import(args.module, args.runs)
+    report['budget_ms'] = args.max_ms
+    report['passed'] = report['median_ms'] <= args.max_ms and not report['forbidden_modules_loaded']
+
+    print(f"? import {report['module']}: median {report['median_ms']:.1f} ms "
+          f"(min {report['min_ms']:.1f}, max {report['max_ms']:.1f}, budget {args.max_ms:.0f})")
+    if report['forbidden_modules_loaded']:
+        print(f"? Loaded at import time: {', '.join(report['forbidden_modules_loaded'])}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    sys.exit(0 if report['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
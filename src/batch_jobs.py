@@ -0,0 +1,339 @@
+"""
+Background runner for multi-PDF batch jobs
+
+Streamlit runs the page script on every interaction, so a long batch cannot
+run on the script thread. BatchJobRunner owns one worker thread that takes
+submitted jobs off a queue and processes their files one after another with
+a shared, batched CausalityClassifier (weights come from the model
+registry, so every job reuses the same loaded model). Each job records
+per-file progress and results as it goes; the UI only reads snapshots.
+When a job finishes, all reports are available as one zip archive.
+
+Usage:
+    runner = BatchJobRunner(model_path='PrashantRGore/drug-causality-bert-v2-model')
+    job_id = runner.submit([(name, data) for name, data in uploads], threshold=0.5)
+
+    job = runner.get(job_id)
+    print(job.snapshot()['progress'])
+    if job.done:
+        open('reports.zip', 'wb').write(job.archive())
+"""
+
+import io
+import itertools
+import json
+import queue
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+CANCELLED = 'cancelled'
+FAILED = 'failed'
+
+# Per-file states
+PENDING = 'pending'
+PROCESSING = 'processing'
+DONE = 'done'
+ERROR = 'error'
+SKIPPED = 'skipped'
+
+# Finished jobs kept for download before the oldest are dropped
+DEFAULT_MAX_FINISHED_JOBS = 20
+
+
+class BatchJob:
+    """
+    One submitted batch of PDFs
+
+    Args:
+        job_id: Identifier returned by BatchJobRunner.submit
+        files: List of (file name, PDF bytes)
+        threshold: Classification threshold for every file
+        use_preprocessing: Apply medical terminology preprocessing
+        verdict_only: Stop inference per file once its verdict is settled
+
+    All state is guarded by a lock; read it through snapshot() and results().
+    """
+
+    def __init__(self, job_id, files, threshold=0.5, use_preprocessing=True, verdict_only=False):
+        self.job_id = job_id
+        self.threshold = threshold
+        self.use_preprocessing = use_preprocessing
+        self.verdict_only = verdict_only
+        self.created_at = datetime.now()
+
+        self._lock = threading.Lock()
+        self._files = list(files)
+        self._file_status = [
+            {'file': name, 'status': PENDING, 'pages': 0, 'seconds': None, 'classification': None, 'error': None}
+            for name, _ in self._files
+        ]
+        self._results = [None] * len(self._files)
+        self._status = QUEUED
+        self._error = None
+        self._started = None
+        self._finished = None
+        self._cancel = threading.Event()
+        self._archive = None
+
+    @property
+    def status(self):
+        with self._lock:
+            return self._status
+
+    @property
+    def done(self):
+        return self.status in (COMPLETED, CANCELLED, FAILED)
+
+    def cancel(self):
+        """Stop after the file in progress; remaining files are skipped"""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def snapshot(self):
+        """Copy of the job state for display"""
+        with self._lock:
+            files = [dict(entry) for entry in self._file_status]
+            finished = sum(1 for entry in files if entry['status'] in (DONE, ERROR, SKIPPED))
+            end = self._finished or time.time()
+            return {
+                'job_id': self.job_id,
+                'status': self._status,
+                'error': self._error,
+                'total_files': len(files),
+                'finished_files': finished,
+                'progress': finished / len(files) if files else 1.0,
+                'elapsed_seconds': end - self._started if self._started else 0.0,
+                'threshold': self.threshold,
+                'created_at': self.created_at.isoformat(),
+                'files': files,
+            }
+
+    def results(self):
+        """Per-file result dicts (None for files not processed yet)"""
+        with self._lock:
+            return list(self._results)
+
+    def summary(self):
+        """Batch summary in the format of process_multiple_pdfs' batch_summary.json"""
+        results = [r for r in self.results() if r is not None]
+        successful = [r for r in results if 'error' not in r]
+        return {
+            'total_pdfs': len(self._files),
+            'processed': len(results),
+            'successful': len(successful),
+            'failed': len(results) - len(successful),
+            'related_count': sum(1 for r in results if r.get('final_classification') == 'related'),
+            'not_related_count': sum(1 for r in results if r.get('final_classification') == 'not related'),
+            'threshold_used': self.threshold,
+            'preprocessing_enabled': self.use_preprocessing,
+            'status': self.status,
+            'timestamp': datetime.now().isoformat(),
+        }
+
+    def archive(self):
+        """
+        Zip (deflate) of one JSON report per file plus batch_summary.json
+
+        Built once after the job has finished and reused afterwards.
+        """
+        if not self.done:
+            raise RuntimeError(f"Job {self.job_id} has not finished")
+        with self._lock:
+            if self._archive is not None:
+                return self._archive
+
+        buffer = io.BytesIO()
+        used_names = set()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for (name, _), result in zip(self._files, self.results()):
+                if result is None:
+                    continue
+                report_name = _unique_name(f"{Path(name).stem}_causality_report.json", used_names)
+                zf.writestr(report_name, json.dumps(result, indent=2, ensure_ascii=False))
+            zf.writestr('batch_summary.json', json.dumps(
+                {**self.summary(), 'results': [r for r in self.results() if r is not None]},
+                indent=2, ensure_ascii=False
+            ))
+
+        with self._lock:
+            self._archive = buffer.getvalue()
+            # The PDFs are no longer needed once every report is archived
+            self._files = [(name, None) for name, _ in self._files]
+            return self._archive
+
+    # Called by the runner thread
+
+    def _set_status(self, status, error=None):
+        with self._lock:
+            self._status = status
+            self._error = error
+            if status == RUNNING:
+                self._started = time.time()
+            elif status in (COMPLETED, CANCELLED, FAILED):
+                self._finished = time.time()
+
+    def _update_file(self, index, **fields):
+        with self._lock:
+            self._file_status[index].update(fields)
+
+    def _set_result(self, index, result):
+        with self._lock:
+            self._results[index] = result
+
+
+def _unique_name(name, used_names):
+    """Disambiguate duplicate upload names inside the archive"""
+    candidate = name
+    stem, suffix = candidate.rsplit('.', 1)
+    for n in itertools.count(2):
+        if candidate not in used_names:
+            break
+        candidate = f"{stem}_{n}.{suffix}"
+    used_names.add(candidate)
+    return candidate
+
+
+class BatchJobRunner:
+    """
+    Queue of batch jobs processed on one background thread
+
+    Args:
+        model_path: Model used for every job
+        max_finished_jobs: Finished jobs kept in memory for download
+        extraction_workers: Processes for page extraction of big PDFs
+        use_pdf_cache: Reuse and store extracted text on disk (see
+            pdf_cache.get_pdf_text_cache)
+
+    Jobs run one at a time, so concurrent submissions never compete for the
+    CPU with each other; the runner thread is started on first submit.
+    """
+
+    def __init__(self, model_path='PrashantRGore/drug-causality-bert-v2-model',
+                 max_finished_jobs=DEFAULT_MAX_FINISHED_JOBS, extraction_workers=1, use_pdf_cache=False):
+        self.model_path = model_path
+        self.max_finished_jobs = max_finished_jobs
+        self.extraction_workers = extraction_workers
+        self.use_pdf_cache = use_pdf_cache
+
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = None
+
+    def submit(self, files, threshold=0.5, use_preprocessing=True, verdict_only=False):
+        """
+        Queue a batch
+
+        Args:
+            files: Iterable of (file name, PDF bytes)
+            threshold: Classification threshold
+            use_preprocessing: Apply medical terminology preprocessing
+            verdict_only: Stop inference per file once its verdict is settled
+
+        Returns:
+            Job id
+        """
+        with self._lock:
+            job_id = f"batch-{next(self._ids)}-{datetime.now():%H%M%S}"
+            job = BatchJob(job_id, files, threshold, use_preprocessing, verdict_only)
+            self._jobs[job_id] = job
+            self._prune()
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='batch-job-runner', daemon=True)
+                self._thread.start()
+
+        self._queue.put(job)
+        return job_id
+
+    def get(self, job_id):
+        """BatchJob for an id, or None if unknown or pruned"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """All known jobs, newest first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def _prune(self):
+        finished = [job for job in self._jobs.values() if job.done]
+        finished.sort(key=lambda job: job.created_at)
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.job_id]
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._process(job)
+            except Exception as e:
+                job._set_status(FAILED, f"{type(e).__name__}: {e}")
+
+    def _process(self, job):
+        from .inference import CausalityClassifier, classify_causality
+        from .pdf_cache import get_pdf_text_cache
+        from .pdf_text import iter_pdf_pages
+
+        if job.cancelled:
+            for index in range(len(job._file_status)):
+                job._update_file(index, status=SKIPPED)
+            job._set_status(CANCELLED)
+            return
+
+        job._set_status(RUNNING)
+        classifier = CausalityClassifier(self.model_path, job.threshold, job.use_preprocessing)
+        cache = get_pdf_text_cache(enable=self.use_pdf_cache)
+
+        for index, (name, data) in enumerate(job._files):
+            if job.cancelled:
+                job._update_file(index, status=SKIPPED)
+                continue
+
+            job._update_file(index, status=PROCESSING)
+            start = time.perf_counter()
+            extraction = {'pages': 0, 'page_errors': []}
+
+            def pages():
+                for page in iter_pdf_pages(data, workers=self.extraction_workers, cache=cache):
+                    extraction['pages'] += 1
+                    if page.error:
+                        extraction['page_errors'].append({'page': page.number, 'error': page.error})
+                    job._update_file(index, pages=extraction['pages'])
+                    yield page.text
+
+            try:
+                result = classify_causality(pages(), classifier=classifier, verdict_only=job.verdict_only)
+                result['pdf_file'] = name
+                result['pdf_pages'] = extraction['pages']
+                result['pdf_page_errors'] = extraction['page_errors']
+                status, error = DONE, None
+            except Exception as e:
+                result = {'pdf_file': name, 'error': str(e), 'final_classification': 'error'}
+                status, error = ERROR, str(e)
+
+            job._set_result(index, result)
+            job._update_file(
+                index, status=status, error=error, seconds=time.perf_counter() - start,
+                classification=result.get('final_classification'),
+                confidence=result.get('confidence_score'),
+            )
+
+        job._set_status(CANCELLED if job.cancelled else COMPLETED)
@@ -0,0 +1,644 @@
+"""
+CPU execution profiles: thread counts, core pinning and replicas per host
+
+A CPUProfile describes how a host runs the classifier:
+
+    replicas            Number of model replicas (one per worker process)
+    intra_op_threads    Torch / ONNX Runtime threads inside one operator
+    inter_op_threads    Torch threads running independent operators
+    pin_cores           Bind each replica to its own set of cores
+
+With pinning, each replica gets intra_op_threads cores. Physical cores are
+handed out socket by socket before any hyper-thread sibling, so replicas
+neither share a physical core nor span sockets while the cores last.
+Without pinning, only the thread counts are applied.
+
+Profiles come from a JSON file or an inline spec, and DRUG_CAUSALITY_CPU_PROFILE
+sets the default for process_multiple_pdfs and the HTTP service:
+
+    export DRUG_CAUSALITY_CPU_PROFILE="replicas=4,intra=8,inter=1,pin=1"
+    export DRUG_CAUSALITY_CPU_PROFILE=/etc/drug-causality/cpu_profile.json
+
+Usage:
+    # Show the topology and where each replica of a profile would run
+    python -m src.cpu_profile show --profile replicas=2,pin=1
+
+    # Measure throughput per layout and save the best one
+    python -m src.cpu_profile calibrate --model-path models/production_model_final --output cpu_profile.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+import warnings
+from collections import namedtuple
+from pathlib import Path
+
+from .paths import atomic_write
+
+
+CPU_PROFILE_ENV = 'DRUG_CAUSALITY_CPU_PROFILE'
+
+# Environment variables read by OpenMP / MKL when their pools start
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')
+
+CALIBRATION_DURATION = 10.0
+CALIBRATION_BATCH_SIZE = 32
+BARRIER_BROKEN_ERROR = 'another replica failed to start'
+
+# Seconds a replica may take to start (import, load the model, warm up)
+CALIBRATION_STARTUP_TIMEOUT = 300.0
+
+CALIBRATION_TEXTS = [
+    "Patient developed hearing loss after taking bortezomib.",
+    "Hearing loss secondary to bortezomib is a very rare side effect.",
+    "Neuropathy following paclitaxel administration was reported in the third cycle.",
+    "Acute kidney injury was attributed to cisplatin-induced nephrotoxicity.",
+    "Patient has a history of diabetes and hypertension.",
+    "The patient was discharged in stable condition after four days of observation.",
+    "Thrombocytopenia possibly related to rituximab resolved after dechallenge.",
+    "Blood pressure was controlled with metoprolol throughout the admission.",
+]
+
+
+CPU = namedtuple('CPU', ['cpu', 'socket', 'core', 'sibling_rank'])
+CPU.__doc__ = """One logical CPU (sibling_rank 0 is the first hyper-thread of its physical core)"""
+
+
+def _read_topology_value(cpu, name):
+    try:
+        with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/{name}') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus():
+    """Logical CPUs this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def detect_topology(cpus=None):
+    """
+    Socket and physical core of each available CPU
+
+    Falls back to one socket with one logical CPU per core where sysfs is
+    not available (non-Linux hosts, some containers).
+
+    Returns:
+        List of CPU in placement order: the first hyper-thread of every
+        core (socket by socket) before any second hyper-thread
+    """
+    if cpus is None:
+        cpus = available_cpus()
+
+    seen = {}
+    entries = []
+    for cpu in cpus:
+        socket = _read_topology_value(cpu, 'physical_package_id')
+        core = _read_topology_value(cpu, 'core_id')
+        if socket is None or core is None:
+            socket, core = 0, cpu
+        rank = seen.get((socket, core), 0)
+        seen[(socket, core)] = rank + 1
+        entries.append(CPU(cpu, socket, core, rank))
+
+    return sorted(entries, key=lambda c: (c.sibling_rank, c.socket, c.core, c.cpu))
+
+
+def topology_summary(topology=None):
+    """Counts of sockets, physical cores and logical CPUs"""
+    if topology is None:
+        topology = detect_topology()
+    return {
+        'sockets': len({c.socket for c in topology}),
+        'physical_cores': len({(c.socket, c.core) for c in topology}),
+        'logical_cpus': len(topology),
+    }
+
+
+def parse_cpu_list(spec):
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, stop = part.split('-', 1)
+            cpus.extend(range(int(start), int(stop) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+class CPUProfile:
+    """
+    Thread and core layout for the classifier on one host
+
+    Args:
+        replicas: Number of model replicas (worker processes)
+        intra_op_threads: Threads per operator in each replica; None splits
+            the physical cores evenly between replicas
+        inter_op_threads: Torch inter-op threads per replica; None leaves
+            the torch default
+        pin_cores: Bind each replica to its own cores
+        cpus: Optional CPUs the layout may use (default: all available)
+        name: Optional label, e.g. the calibrated layout
+    """
+
+    FIELDS = ('replicas', 'intra_op_threads', 'inter_op_threads', 'pin_cores', 'cpus', 'name')
+
+    def __init__(self, replicas=1, intra_op_threads=None, inter_op_threads=None, pin_cores=False, cpus=None, name=None):
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        if intra_op_threads is not None and intra_op_threads < 1:
+            raise ValueError("intra_op_threads must be at least 1")
+        if inter_op_threads is not None and inter_op_threads < 1:
+            raise ValueError("inter_op_threads must be at least 1")
+
+        self.replicas = replicas
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.pin_cores = pin_cores
+        self.cpus = list(cpus) if cpus is not None else None
+        self.name = name
+
+    def __repr__(self):
+        return f"CPUProfile({self.describe()})"
+
+    def describe(self):
+        """Compact one-line form, also accepted by parse_cpu_profile()"""
+        parts = [f"replicas={self.replicas}"]
+        if self.intra_op_threads is not None:
+            parts.append(f"intra={self.intra_op_threads}")
+        if self.inter_op_threads is not None:
+            parts.append(f"inter={self.inter_op_threads}")
+        parts.append(f"pin={int(bool(self.pin_cores))}")
+        if self.cpus is not None:
+            parts.append(f"cpus={'+'.join(str(c) for c in self.cpus)}")
+        return ','.join(parts)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        unknown = set(data) - set(cls.FIELDS) - {'calibration'}
+        if unknown:
+            raise ValueError(f"Unknown CPU profile fields: {', '.join(sorted(unknown))}")
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    def topology(self):
+        return detect_topology(self.cpus)
+
+    def threads_per_replica(self, topology=None):
+        """Resolved intra-op thread count of each replica"""
+        if self.intra_op_threads is not None:
+            return self.intra_op_threads
+        if topology is None:
+            topology = self.topology()
+        physical = topology_summary(topology)['physical_cores']
+        return max(1, physical // self.replicas)
+
+    def replica_cpus(self, replica_index, topology=None):
+        """
+        CPUs a replica is pinned to, or None without pinning
+
+        If replicas * intra_op_threads exceeds the available CPUs, the
+        assignment wraps around and replicas share cores.
+        """
+        if not self.pin_cores:
+            return None
+        if topology is None:
+            topology = self.topology()
+
+        threads = self.threads_per_replica(topology)
+        order = [c.cpu for c in topology]
+        start = (replica_index % self.replicas) * threads
+        return sorted({order[(start + i) % len(order)] for i in range(threads)})
+
+    def oversubscribed(self, topology=None):
+        """True if the replicas' threads exceed the logical CPUs"""
+        if topology is None:
+            topology = self.topology()
+        return self.replicas * self.threads_per_replica(topology) > len(topology)
+
+    def layout(self, topology=None):
+        """Per-replica threads and CPUs, for display"""
+        if topology is None:
+            topology = self.topology()
+        return [
+            {
+                'replica': index,
+                'intra_op_threads': self.threads_per_replica(topology),
+                'inter_op_threads': self.inter_op_threads,
+                'cpus': self.replica_cpus(index, topology),
+            }
+            for index in range(self.replicas)
+        ]
+
+
+_KEY_ALIASES = {
+    'replicas': 'replicas',
+    'intra': 'intra_op_threads',
+    'intra_op_threads': 'intra_op_threads',
+    'inter': 'inter_op_threads',
+    'inter_op_threads': 'inter_op_threads',
+    'pin': 'pin_cores',
+    'pin_cores': 'pin_cores',
+    'cpus': 'cpus',
+    'name': 'name',
+}
+
+
+def parse_cpu_profile(spec):
+    """
+    Build a CPUProfile from a JSON file path or an inline spec
+
+    Args:
+        spec: CPUProfile (returned as is), path to a JSON file written by
+            save_cpu_profile(), or 'replicas=2,intra=8,inter=1,pin=1,cpus=0-31'
+
+    Raises:
+        ValueError: If the spec cannot be parsed
+    """
+    if spec is None or isinstance(spec, CPUProfile):
+        return spec
+
+    spec = str(spec).strip()
+    if spec.endswith('.json') or Path(spec).is_file():
+        with open(spec, encoding='utf-8') as f:
+            return CPUProfile.from_dict(json.load(f))
+
+    values = {}
+    # ',' separates fields; inside cpus= ranges are joined with '+'
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition('=')
+        field = _KEY_ALIASES.get(key.strip().lower())
+        if not sep or field is None:
+            raise ValueError(f"Invalid CPU profile entry '{part}' in '{spec}'")
+        value = value.strip()
+        if field == 'pin_cores':
+            values[field] = value.lower() in ('1', 'true', 'yes', 'on')
+        elif field == 'cpus':
+            values[field] = parse_cpu_list(value.replace('+', ','))
+        elif field == 'name':
+            values[field] = value
+        else:
+            values[field] = int(value)
+    return CPUProfile(**values)
+
+
+def get_cpu_profile():
+    """Profile configured through DRUG_CAUSALITY_CPU_PROFILE, or None"""
+    spec = os.environ.get(CPU_PROFILE_ENV)
+    if not spec:
+        return None
+    return parse_cpu_profile(spec)
+
+
+def save_cpu_profile(profile, path, calibration=None):
+    """Write a profile (and optionally the calibration that chose it) as JSON"""
+    data = profile.to_dict()
+    if calibration is not None:
+        data['calibration'] = calibration
+
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    atomic_write(path, write)
+
+
+# Profile applied to this process by apply_cpu_profile
+_active_profile = None
+_active_lock = threading.Lock()
+
+
+def apply_cpu_profile(profile, replica_index=0, backend='torch'):
+    """
+    Apply a profile to the current process as one of its replicas
+
+    Pins the process (if the profile pins cores) and sets the torch thread
+    counts. Call it before the model runs its first forward pass: torch
+    only accepts a new inter-op thread count before its pool has started,
+    and a late change is skipped with a warning. ONNX Runtime sessions
+    created afterwards read the intra-op count from active_cpu_profile().
+
+    Args:
+        profile: CPUProfile or spec accepted by parse_cpu_profile()
+        replica_index: Which replica this process is
+        backend: 'onnx' leaves torch unimported
+
+    Returns:
+        dict with the applied replica index, thread counts and CPUs
+    """
+    global _active_profile
+
+    profile = parse_cpu_profile(profile)
+    topology = profile.topology()
+    intra = profile.threads_per_replica(topology)
+    cpus = profile.replica_cpus(replica_index, topology)
+
+    if cpus is not None:
+        if hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, cpus)
+        else:
+            warnings.warn("Core pinning is not supported on this platform; only thread counts are applied")
+            cpus = None
+
+    # Seen by OpenMP/MKL pools that start after this point (e.g. a later torch import)
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(intra)
+
+    inter = profile.inter_op_threads
+    if backend == 'torch' or 'torch' in sys.modules:
+        import torch
+        torch.set_num_threads(intra)
+        if inter is not None and torch.get_num_interop_threads() != inter:
+            try:
+                torch.set_num_interop_threads(inter)
+            except RuntimeError as e:
+                warnings.warn(f"Could not set inter-op threads to {inter}: {e}")
+        inter = torch.get_num_interop_threads()
+
+    applied = {
+        'replica': replica_index,
+        'intra_op_threads': intra,
+        'inter_op_threads': inter,
+        'cpus': cpus,
+        'profile': profile.describe(),
+    }
+    with _active_lock:
+        _active_profile = applied
+    return applied
+
+
+def active_cpu_profile():
+    """What apply_cpu_profile() set in this process, or None"""
+    with _active_lock:
+        return dict(_active_profile) if _active_profile is not None else None
+
+
+# Calibration
+
+def candidate_profiles(topology=None, max_replicas=None, pin_cores=True):
+    """
+    Layouts worth measuring on this host
+
+    One replica using every physical core, then doubling replica counts
+    (each with an equal share of the cores) down to one core per replica,
+    plus one replica per socket on multi-socket hosts.
+    """
+    if topology is None:
+        topology = detect_topology()
+    summary = topology_summary(topology)
+    physical = summary['physical_cores']
+
+    replica_counts = set()
+    replicas = 1
+    while replicas <= physical and (max_replicas is None or replicas <= max_replicas):
+        replica_counts.add(replicas)
+        replicas *= 2
+    if summary['sockets'] > 1 and (max_replicas is None or summary['sockets'] <= max_replicas):
+        replica_counts.add(summary['sockets'])
+
+    return [
+        CPUProfile(
+            replicas=replicas,
+            intra_op_threads=max(1, physical // replicas),
+            inter_op_threads=1,
+            pin_cores=pin_cores and replicas > 1,
+        )
+        for replicas in sorted(replica_counts)
+    ]
+
+
+def _calibration_replica(profile, replica_index, model_path, backend, quantization, texts, batch_size,
+                         duration, barrier, results):
+    """Worker process: apply the profile, load the model and classify until the time is up"""
+    try:
+        applied = apply_cpu_profile(profile, replica_index, backend)
+
+        from .inference import CausalityClassifier
+        classifier = CausalityClassifier(model_path, backend=backend, quantization=quantization)
+        batch = [texts[i % len(texts)] for i in range(batch_size)]
+        classifier.predict_batch(batch, batch_size=batch_size)
+    except Exception as e:
+        barrier.abort()
+        results.put({'replica': replica_index, 'error': f"{type(e).__name__}: {e}"})
+        return
+
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        results.put({'replica': replica_index, 'error': BARRIER_BROKEN_ERROR})
+        return
+
+    latencies = []
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        batch_start = time.perf_counter()
+        classifier.predict_batch(batch, batch_size=batch_size)
+        latencies.append(time.perf_counter() - batch_start)
+
+    results.put({
+        'replica': replica_index,
+        'texts': len(latencies) * batch_size,
+        'seconds': time.perf_counter() - start,
+        'batch_latencies': latencies,
+        'applied': applied,
+    })
+
+
+def measure_profile(profile, model_path, texts=None, batch_size=CALIBRATION_BATCH_SIZE,
+                    duration=CALIBRATION_DURATION, backend='torch', quantization=None):
+    """
+    Aggregate throughput of one layout
+
+    Starts one spawned process per replica. Each applies the profile, loads
+    the model and warms up; then all replicas classify fixed batches for
+    `duration` seconds at the same time. A replica that dies or does not
+    report within CALIBRATION_STARTUP_TIMEOUT + duration fails the
+    measurement instead of blocking calibration.
+
+    Returns:
+        dict with texts/second over all replicas, batch latency percentiles
+        and the per-replica placement (or an 'error' entry)
+    """
+    texts = texts or CALIBRATION_TEXTS
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(profile.replicas)
+    results = context.Queue()
+
+    processes = [
+        context.Process(
+            target=_calibration_replica,
+            args=(profile, index, str(model_path), backend, quantization, texts, batch_size, duration, barrier, results)
+        )
+        for index in range(profile.replicas)
+    ]
+    for process in processes:
+        process.start()
+
+    reported = {}
+    deadline = time.monotonic() + CALIBRATION_STARTUP_TIMEOUT + duration
+    while len(reported) < len(processes):
+        try:
+            result = results.get(timeout=1.0)
+            reported[result['replica']] = result
+            continue
+        except queue.Empty:
+            pass
+
+        # A replica that exited with an error code never reports; release the others from the barrier
+        for index, process in enumerate(processes):
+            if index not in reported and process.exitcode not in (None, 0):
+                reported[index] = {'replica': index, 'error': f"replica process exited with code {process.exitcode}"}
+                barrier.abort()
+        if time.monotonic() > deadline:
+            for index in range(len(processes)):
+                reported.setdefault(index, {'replica': index, 'error': 'replica did not finish in time'})
+            break
+
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+
+    replica_results = [reported[index] for index in sorted(reported)]
+    # Report the replica that caused the failure rather than the ones it released from the barrier
+    failed = sorted((r for r in replica_results if 'error' in r), key=lambda r: r['error'] == BARRIER_BROKEN_ERROR)
+    if failed:
+        return {'profile': profile.describe(), 'error': f"replica {failed[0]['replica']}: {failed[0]['error']}"}
+
+    latencies = sorted(latency for r in replica_results for latency in r['batch_latencies'])
+    total_texts = sum(r['texts'] for r in replica_results)
+    wall_seconds = max(r['seconds'] for r in replica_results)
+    return {
+        'profile': profile.describe(),
+        'replicas': profile.replicas,
+        'intra_op_threads': profile.threads_per_replica(),
+        'inter_op_threads': profile.inter_op_threads,
+        'pin_cores': profile.pin_cores,
+        'texts_per_second': total_texts / wall_seconds if wall_seconds else 0.0,
+        'batch_latency_p50_ms': 1000 * statistics.median(latencies) if latencies else None,
+        'batch_latency_p95_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        'placement': sorted((r['applied'] for r in replica_results), key=lambda a: a['replica']),
+    }
+
+
+def calibrate(model_path, profiles=None, texts=None, batch_size=CALIBRATION_BATCH_SIZE,
+              duration=CALIBRATION_DURATION, backend='torch', quantization=None, verbose=True):
+    """
+    Measure each layout and pick the one with the highest throughput
+
+    Args:
+        model_path: Model to benchmark
+        profiles: CPUProfiles to compare (default: candidate_profiles())
+        texts: Sample sentences (default: CALIBRATION_TEXTS)
+        batch_size: Texts per predict_batch call
+        duration: Seconds each layout is measured for
+        backend: Inference backend
+        quantization: None or 'int8'
+
+    Returns:
+        (best CPUProfile, list of measurement dicts)
+    """
+    if profiles is None:
+        profiles = candidate_profiles()
+
+    measurements = []
+    for profile in profiles:
+        if verbose:
+            print(f"? Measuring {profile.describe()} ...")
+        measurement = measure_profile(profile, model_path, texts, batch_size, duration, backend, quantization)
+        measurements.append(measurement)
+        if verbose:
+            if 'error' in measurement:
+                print(f"  failed: {measurement['error']}")
+            else:
+                print(f"  {measurement['texts_per_second']:.1f} texts/s, "
+                      f"p50 batch {measurement['batch_latency_p50_ms']:.1f} ms")
+
+    scored = [(m['texts_per_second'], i) for i, m in enumerate(measurements) if 'error' not in m]
+    if not scored:
+        raise RuntimeError("Every layout failed during calibration")
+
+    best = profiles[max(scored)[1]]
+    best = CPUProfile(
+        best.replicas, best.threads_per_replica(), best.inter_op_threads, best.pin_cores,
+        best.cpus, name='calibrated'
+    )
+    return best, measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU execution profiles for the causality classifier")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show = subparsers.add_parser('show', help="Print the CPU topology and a profile's placement")
+    show.add_argument('--profile', help=f"Profile spec or JSON file (default: ${CPU_PROFILE_ENV})")
+
+    cal = subparsers.add_parser('calibrate', help="Measure throughput per layout and recommend one")
+    cal.add_argument('--model-path', default='PrashantRGore/drug-causality-bert-v2-model')
+    cal.add_argument('--backend', default='torch', choices=['torch', 'onnx'])
+    cal.add_argument('--quantization', default=None, choices=['int8'])
+    cal.add_argument('--duration', type=float, default=CALIBRATION_DURATION, help="Seconds per layout")
+    cal.add_argument('--batch-size', type=int, default=CALIBRATION_BATCH_SIZE)
+    cal.add_argument('--max-replicas', type=int, default=None)
+    cal.add_argument('--profiles', nargs='+', help="Specs to compare instead of the generated candidates")
+    cal.add_argument('--output', help="Write the recommended profile (with the measurements) to this JSON file")
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        topology = detect_topology()
+        print(json.dumps(topology_summary(topology), indent=2))
+        profile = parse_cpu_profile(args.profile) if args.profile else get_cpu_profile()
+        if profile is None:
+            print("? No profile given; torch defaults apply")
+            return
+        print(f"? Profile: {profile.describe()}")
+        if profile.oversubscribed():
+            print("? Warning: replicas x threads exceed the available CPUs")
+        for replica in profile.layout():
+            print(f"  replica {replica['replica']}: {replica['intra_op_threads']} intra-op threads, "
+                  f"cpus {replica['cpus'] if replica['cpus'] is not None else 'unpinned'}")
+        return
+
+    profiles = [parse_cpu_profile(spec) for spec in args.profiles] if args.profiles else \
+        candidate_profiles(max_replicas=args.max_replicas)
+    best, measurements = calibrate(
+        args.model_path, profiles, batch_size=args.batch_size, duration=args.duration,
+        backend=args.backend, quantization=args.quantization
+    )
+
+    print(f"\n? Recommended: {best.describe()}")
+    print(f"  export {CPU_PROFILE_ENV}=\"{best.describe()}\"")
+    if args.output:
+        save_cpu_profile(best, args.output, calibration={
+            'model_path': str(args.model_path),
+            'backend': args.backend,
+            'quantization': args.quantization,
+            'batch_size': args.batch_size,
+            'duration_seconds': args.duration,
+            'topology': topology_summary(),
+            'measurements': measurements,
+        })
+        print(f"? Profile saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
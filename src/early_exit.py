@@ -0,0 +1,504 @@
+"""
+Confidence-based early exit over intermediate BERT layers
+
+Small linear heads read the [CLS] hidden state after some intermediate
+encoder layers (by default after 1/4, 1/2 and 3/4 of the stack). At
+inference the encoder runs layer by layer; after each head, sentences whose
+head is confident enough (max class probability >= the confidence bar) stop
+there and the rest continue. Sentences no head is sure about go through the
+full model as usual.
+
+The heads are trained on CPU by distillation from the model itself: the
+frozen model is run once over a set of unlabeled sentences, and each head
+learns to reproduce the model's final predictions from its layer's [CLS]
+vector. No labels are needed.
+
+Trained heads are cached next to the other converted artifacts, keyed by the
+fingerprint of the weights they were distilled from.
+
+Usage:
+    # Train heads from sentences (one per line) and/or PDFs
+    python -m src.early_exit train --model-path models/production_model_final --texts sentences.txt
+
+    # Exit-layer distribution and agreement with the full model
+    python -m src.early_exit report --model-path models/production_model_final --texts sample.txt
+
+    classifier = CausalityClassifier(model_path, early_exit=True, exit_confidence=0.95)
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .model_registry import model_fingerprint, resolve_model_dir
+from .paths import atomic_write, cache_artifact_path
+
+
+DEFAULT_EXIT_CONFIDENCE = 0.9
+DISTILLATION_TEMPERATURE = 2.0
+
+
+def default_exit_layers(num_layers):
+    """Exit points after 1/4, 1/2 and 3/4 of the encoder"""
+    return sorted({max(1, num_layers * k // 4) for k in (1, 2, 3)} - {num_layers})
+
+
+def build_exit_heads(hidden_size, num_labels, layers):
+    """One linear head per exit layer, keyed by the 1-based layer number"""
+    import torch
+
+    return torch.nn.ModuleDict({str(layer): torch.nn.Linear(hidden_size, num_labels) for layer in layers})
+
+
+def exit_layers_of(heads):
+    return sorted(int(layer) for layer in heads.keys())
+
+
+def exit_heads_path(model_path, fingerprint, cache_dir=None):
+    """Cache file for exit heads distilled from weights with the given fingerprint"""
+    return cache_artifact_path('early_exit', model_path, fingerprint, '-exit-heads.pt', cache_dir)
+
+
+def save_exit_heads(heads, path, metadata):
+    """Save head weights and training metadata (written atomically)"""
+    import torch
+
+    atomic_write(path, lambda tmp_path: torch.save({'state_dict': heads.state_dict(), 'metadata': metadata}, tmp_path))
+
+
+def load_exit_heads(path, source_model_dir=None):
+    """
+    Load exit heads
+
+    Args:
+        path: File written by save_exit_heads
+        source_model_dir: Directory with the weights the heads will run on;
+            checked against the recorded fingerprint
+
+    Returns:
+        (heads ModuleDict in eval mode, metadata dict)
+
+    Raises:
+        ValueError: If the heads were distilled from different weights
+    """
+    import torch
+
+    saved = torch.load(path, map_location='cpu', weights_only=True)
+    metadata = saved['metadata']
+
+    if source_model_dir is not None and metadata.get('source_fingerprint') != model_fingerprint(source_model_dir):
+        raise ValueError(
+            f"Exit heads in {path} were trained on different weights than {source_model_dir}; "
+            f"retrain with: python -m src.early_exit train --model-path {source_model_dir}"
+        )
+
+    heads = build_exit_heads(metadata['hidden_size'], metadata['num_labels'], metadata['layers'])
+    heads.load_state_dict(saved['state_dict'])
+    heads.eval()
+    return heads, metadata
+
+
+def load_early_exit_runner(model_path, model, heads_path=None, revision=None, confidence=DEFAULT_EXIT_CONFIDENCE):
+    """
+    EarlyExitRunner for a loaded model, using the cached heads by default
+
+    Returns:
+        (EarlyExitRunner, heads metadata)
+
+    Raises:
+        FileNotFoundError: If no heads were trained for these weights
+    """
+    model_dir = resolve_model_dir(model_path, revision)
+    path = Path(heads_path) if heads_path else exit_heads_path(model_path, model_fingerprint(model_dir))
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No early-exit heads at {path}; train them with: "
+            f"python -m src.early_exit train --model-path {model_path} --texts <sentences.txt>"
+        )
+
+    heads, metadata = load_exit_heads(path, source_model_dir=model_dir)
+    if metadata['num_hidden_layers'] != model.config.num_hidden_layers:
+        raise ValueError(f"Exit heads in {path} were trained for a different architecture")
+    return EarlyExitRunner(model, heads, confidence), metadata
+
+
+def _tokenize(tokenizer, texts, max_length):
+    return tokenizer(list(texts), return_tensors='pt', truncation=True, padding=True, max_length=max_length)
+
+
+def collect_distillation_features(model, tokenizer, texts, layers, max_length=96, batch_size=32):
+    """
+    Run the frozen model once and keep what the heads learn from
+
+    Returns:
+        (features, teacher_logits): dict layer -> float32 array (n, hidden)
+        of [CLS] vectors, and the model's final logits (n, num_labels)
+    """
+    import torch
+
+    features = {layer: [] for layer in layers}
+    teacher = []
+
+    # Length-sorted chunks keep padding small
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            chunk = [texts[i] for i in order[start:start + batch_size]]
+            outputs = model(**_tokenize(tokenizer, chunk, max_length), output_hidden_states=True)
+            # hidden_states[0] is the embedding output, hidden_states[k] follows layer k
+            for layer in layers:
+                features[layer].append(outputs.hidden_states[layer][:, 0].float().numpy())
+            teacher.append(outputs.logits.float().numpy())
+
+    inverse = np.argsort(order)
+    features = {layer: np.concatenate(parts)[inverse] for layer, parts in features.items()}
+    return features, np.concatenate(teacher)[inverse]
+
+
+def train_exit_heads(
+    model,
+    tokenizer,
+    texts,
+    layers=None,
+    max_length=96,
+    epochs=30,
+    learning_rate=1e-3,
+    batch_size=64,
+    validation_fraction=0.1,
+    seed=0
+):
+    """
+    Distill exit heads from the model's own predictions
+
+    Args:
+        model: BertForSequenceClassification in eval mode (stays frozen)
+        tokenizer: Matching tokenizer
+        texts: Unlabeled sentences
+        layers: 1-based layers to attach heads to (default: default_exit_layers)
+        max_length: Maximum tokens per text
+        epochs: Passes over the cached features
+        learning_rate: Adam learning rate
+        batch_size: Minibatch size for head training
+        validation_fraction: Share of texts held out to measure agreement
+        seed: Seed for the split and initialization
+
+    Returns:
+        (heads, metadata) where metadata records the layers and the held-out
+        agreement of each head with the full model
+    """
+    import torch
+
+    texts = [t for t in dict.fromkeys(texts) if t and t.strip()]
+    if len(texts) < 10:
+        raise ValueError("Need at least 10 distinct sentences to train exit heads")
+
+    config = model.config
+    layers = sorted(layers or default_exit_layers(config.num_hidden_layers))
+    if layers[0] < 1 or layers[-1] >= config.num_hidden_layers:
+        raise ValueError(f"Exit layers must be between 1 and {config.num_hidden_layers - 1}")
+
+    torch.manual_seed(seed)
+    heads = build_exit_heads(config.hidden_size, config.num_labels, layers)
+
+    features, teacher_logits = collect_distillation_features(model, tokenizer, texts, layers, max_length)
+    teacher_labels = teacher_logits.argmax(axis=1)
+    soft_targets = torch.softmax(torch.from_numpy(teacher_logits) / DISTILLATION_TEMPERATURE, dim=1)
+
+    rng = np.random.default_rng(seed)
+    permutation = rng.permutation(len(texts))
+    n_validation = max(1, int(len(texts) * validation_fraction))
+    validation, train = permutation[:n_validation], permutation[n_validation:]
+
+    agreement = {}
+    for layer in layers:
+        head = heads[str(layer)]
+        x = torch.from_numpy(features[layer])
+        optimizer = torch.optim.Adam(head.parameters(), lr=learning_rate)
+
+        head.train()
+        for _ in range(epochs):
+            shuffled = rng.permutation(train)
+            for start in range(0, len(shuffled), batch_size):
+                idx = torch.from_numpy(shuffled[start:start + batch_size])
+                log_probs = torch.log_softmax(head(x[idx]) / DISTILLATION_TEMPERATURE, dim=1)
+                loss = -(soft_targets[idx] * log_probs).sum(dim=1).mean()
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+        head.eval()
+
+        with torch.no_grad():
+            predicted = head(x[torch.from_numpy(validation)]).argmax(dim=1).numpy()
+        agreement[str(layer)] = float((predicted == teacher_labels[validation]).mean())
+
+    metadata = {
+        'layers': layers,
+        'hidden_size': config.hidden_size,
+        'num_labels': config.num_labels,
+        'num_hidden_layers': config.num_hidden_layers,
+        'training_sentences': len(train),
+        'validation_sentences': len(validation),
+        'validation_agreement': agreement,
+        'epochs': epochs,
+        'max_length': max_length,
+        'trained_at': datetime.now().isoformat(),
+    }
+    return heads, metadata
+
+
+def _layer_attention_mask(bert, attention_mask, hidden_states):
+    """Attention mask in the form the encoder layers expect"""
+    if hasattr(bert, '_create_attention_masks'):
+        mask, _ = bert._create_attention_masks(
+            attention_mask=attention_mask,
+            encoder_attention_mask=None,
+            embedding_output=hidden_states,
+            encoder_hidden_states=None,
+            past_key_values=None,
+        )
+        return mask
+    # transformers 4.x
+    return bert.get_extended_attention_mask(attention_mask, attention_mask.shape)
+
+
+class EarlyExitRunner:
+    """
+    Layer-by-layer forward pass that lets confident sentences exit early
+
+    Args:
+        model: BertForSequenceClassification in eval mode
+        heads: ModuleDict from build_exit_heads / load_exit_heads
+        confidence: Minimum max-class probability for a head to decide
+
+    Attributes:
+        exit_counts: Sentences that left at each layer (the last layer means
+            the full model decided), accumulated over calls
+    """
+
+    def __init__(self, model, heads, confidence=DEFAULT_EXIT_CONFIDENCE):
+        if not 0 < confidence <= 1:
+            raise ValueError("Exit confidence must be in (0, 1]")
+
+        self.model = model
+        self.heads = heads
+        self.confidence = confidence
+        self.layers = exit_layers_of(heads)
+        self.num_layers = model.config.num_hidden_layers
+        self.exit_counts = {layer: 0 for layer in self.layers + [self.num_layers]}
+
+    def __call__(self, inputs):
+        """
+        Logits for tokenized inputs
+
+        Returns:
+            (logits float32 array (n, num_labels), exit layer per row)
+        """
+        import torch
+
+        bert = self.model.bert
+        with torch.no_grad():
+            hidden = bert.embeddings(input_ids=inputs['input_ids'], token_type_ids=inputs.get('token_type_ids'))
+            attention_mask = inputs['attention_mask']
+
+            n = hidden.shape[0]
+            logits = torch.zeros(n, self.model.config.num_labels)
+            exit_layer = torch.full((n,), self.num_layers, dtype=torch.long)
+            active = torch.arange(n)
+
+            for number, layer in enumerate(bert.encoder.layer, 1):
+                output = layer(hidden, attention_mask=_layer_attention_mask(bert, attention_mask, hidden))
+                hidden = output[0] if isinstance(output, tuple) else output
+
+                head = self.heads[str(number)] if str(number) in self.heads else None
+                if head is None or number == self.num_layers:
+                    continue
+
+                head_logits = head(hidden[:, 0].float())
+                done = torch.softmax(head_logits, dim=1).max(dim=1).values >= self.confidence
+                if done.any():
+                    logits[active[done]] = head_logits[done]
+                    exit_layer[active[done]] = number
+                    keep = ~done
+                    active, hidden, attention_mask = active[keep], hidden[keep], attention_mask[keep]
+                    if len(active) == 0:
+                        break
+
+            if len(active) > 0:
+                pooled = bert.pooler(hidden) if bert.pooler is not None else hidden[:, 0]
+                logits[active] = self.model.classifier(self.model.dropout(pooled)).float()
+
+        exit_layer = exit_layer.numpy()
+        for layer in exit_layer.tolist():
+            self.exit_counts[layer] += 1
+        return logits.numpy(), exit_layer
+
+    def exit_distribution(self):
+        """Share of sentences that exited at each layer"""
+        total = sum(self.exit_counts.values())
+        return {
+            layer: {'sentences': count, 'share': count / total if total else 0.0}
+            for layer, count in self.exit_counts.items()
+        }
+
+    def reset_stats(self):
+        self.exit_counts = {layer: 0 for layer in self.exit_counts}
+
+    def estimated_layer_savings(self):
+        """Fraction of encoder layer evaluations skipped so far"""
+        total = sum(self.exit_counts.values())
+        if not total:
+            return 0.0
+        used = sum(layer * count for layer, count in self.exit_counts.items())
+        return 1.0 - used / (total * self.num_layers)
+
+
+def train_and_save_exit_heads(
+    model_path,
+    texts,
+    revision=None,
+    layers=None,
+    output_path=None,
+    use_preprocessing=True,
+    **train_kwargs
+):
+    """
+    Train exit heads for a model and write them to the cache (or output_path)
+
+    Texts are preprocessed the same way CausalityClassifier preprocesses
+    them, so the heads see the inputs they will see at inference.
+
+    Returns:
+        (path, metadata)
+    """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    if use_preprocessing:
+        from .inference import preprocess_medical_causality
+        texts = [preprocess_medical_causality(text) for text in texts]
+
+    model_dir = resolve_model_dir(model_path, revision)
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    heads, metadata = train_exit_heads(model, tokenizer, texts, layers=layers, **train_kwargs)
+    fingerprint = model_fingerprint(model_dir)
+    metadata['source_fingerprint'] = fingerprint
+    metadata['model_path'] = str(model_path)
+    metadata['use_preprocessing'] = use_preprocessing
+
+    path = Path(output_path) if output_path else exit_heads_path(model_path, fingerprint)
+    save_exit_heads(heads, path, metadata)
+    return path, metadata
+
+
+def early_exit_report(
+    model_path,
+    texts,
+    confidence=DEFAULT_EXIT_CONFIDENCE,
+    heads_path=None,
+    threshold=0.5,
+    revision=None
+):
+    """
+    Compare early-exit predictions with the full model
+
+    Returns:
+        dict with exit-layer distribution, label agreement, probability
+        drift, estimated layer savings and wall time of both runs
+    """
+    from .inference import CausalityClassifier
+
+    texts = list(texts)
+    full = CausalityClassifier(model_path, threshold, revision=revision)
+    early = CausalityClassifier(
+        model_path, threshold, revision=revision,
+        early_exit=heads_path or True, exit_confidence=confidence
+    )
+
+    start = time.perf_counter()
+    full_results = full.predict_batch(texts, return_probs=True)
+    full_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    early_results = early.predict_batch(texts, return_probs=True)
+    early_seconds = time.perf_counter() - start
+
+    full_probs = np.array([r['probabilities']['related'] for r in full_results])
+    early_probs = np.array([r['probabilities']['related'] for r in early_results])
+    agree = np.array([a['label'] == b['label'] for a, b in zip(full_results, early_results)])
+    runner = early.early_exit
+
+    return {
+        'samples': len(texts),
+        'exit_confidence': confidence,
+        'exit_distribution': {str(k): v for k, v in runner.exit_distribution().items()},
+        'estimated_layer_savings': runner.estimated_layer_savings(),
+        'label_agreement': float(agree.mean()) if texts else 1.0,
+        'label_disagreements': int((~agree).sum()),
+        'max_probability_drift': float(np.abs(early_probs - full_probs).max()) if texts else 0.0,
+        'full_model_seconds': full_seconds,
+        'early_exit_seconds': early_seconds,
+        'heads_metadata': early.early_exit_metadata,
+    }
+
+
+def _load_texts(text_files, pdf_files):
+    from .inference import safe_sent_tokenize
+    from .pdf_text import iter_pdf_texts
+
+    texts = []
+    for path in text_files or []:
+        with open(path, encoding='utf-8') as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    for path in pdf_files or []:
+        for page_text in iter_pdf_texts(path):
+            texts.extend(s for s in safe_sent_tokenize(page_text) if len(s.strip()) >= 10)
+    return texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and evaluate early-exit heads")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name in ('train', 'report'):
+        sub = subparsers.add_parser(name)
+        sub.add_argument('--model-path', default='PrashantRGore/drug-causality-bert-v2-model')
+        sub.add_argument('--revision', default=None)
+        sub.add_argument('--texts', nargs='*', help="Text files with one sentence per line")
+        sub.add_argument('--pdf', nargs='*', help="PDFs to take sentences from")
+
+    train = subparsers.choices['train']
+    train.add_argument('--layers', type=int, nargs='*', help="1-based exit layers")
+    train.add_argument('--epochs', type=int, default=30)
+    train.add_argument('--output', default=None, help="Defaults to the user cache")
+
+    report = subparsers.choices['report']
+    report.add_argument('--confidence', type=float, default=DEFAULT_EXIT_CONFIDENCE)
+    report.add_argument('--heads', default=None, help="Heads file (defaults to the cached heads)")
+    report.add_argument('--threshold', type=float, default=0.5)
+
+    args = parser.parse_args()
+    texts = _load_texts(args.texts, args.pdf)
+
+    if args.command == 'train':
+        path, metadata = train_and_save_exit_heads(
+            args.model_path, texts, revision=args.revision, layers=args.layers,
+            output_path=args.output, epochs=args.epochs
+        )
+        print(f"? Exit heads saved: {path}")
+        print(json.dumps(metadata, indent=2))
+    else:
+        result = early_exit_report(
+            args.model_path, texts, confidence=args.confidence, heads_path=args.heads,
+            threshold=args.threshold, revision=args.revision
+        )
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Drug, adverse event and case information extraction used by the app
+
+DrugExtractor and ADRExtractor match the built-in term tables, plus an
+optional full dictionary (JSON or TSV, see src/lexicon.py) named by
+DRUG_CAUSALITY_DRUG_DICTIONARY / DRUG_CAUSALITY_ADR_DICTIONARY, on token
+boundaries. The dictionaries are loaded through load_lexicon, so the
+compiled index comes from its on-disk snapshot after the first load.
+CaseInfoExtractor pulls demographics and pre-existing conditions out of a
+case narrative.
+
+Usage:
+    drugs = DrugExtractor().analyze(pdf_text)
+    drugs['found'], drugs['counts']
+    adrs = ADRExtractor().extract(pdf_text)
+    CaseInfoExtractor().extract_demographics(pdf_text)
+"""
+
+import os
+import re
+import threading
+
+from .lexicon import Lexicon, load_lexicon
+
+
+COMMON_DRUGS = {
+    'bortezomib': ['bortezomib', 'velcade'],
+    'metoprolol': ['metoprolol', 'lopressor'],
+    'rituximab': ['rituximab', 'rituxan'],
+    'simvastatin': ['simvastatin', 'zocor'],
+    'paclitaxel': ['paclitaxel', 'taxol'],
+    'cisplatin': ['cisplatin', 'platinol'],
+    'doxorubicin': ['doxorubicin', 'adriamycin'],
+    'methotrexate': ['methotrexate', 'mtx'],
+}
+
+ADR_KEYWORDS = {
+    'hearing loss': ['hearing loss', 'deafness'],
+    'neuropathy': ['neuropathy', 'nerve damage'],
+    'cardiotoxicity': ['cardiotoxicity', 'heart damage'],
+    'nephrotoxicity': ['nephrotoxicity', 'kidney damage'],
+    'hepatotoxicity': ['hepatotoxicity', 'liver damage'],
+    'thrombocytopenia': ['thrombocytopenia'],
+    'anemia': ['anemia'],
+    'nausea': ['nausea'],
+    'vomiting': ['vomiting'],
+    'diarrhea': ['diarrhea'],
+}
+
+# Optional full dictionaries (JSON or TSV, see src/lexicon.py), added to the built-in terms
+DRUG_DICTIONARY_ENV = 'DRUG_CAUSALITY_DRUG_DICTIONARY'
+ADR_DICTIONARY_ENV = 'DRUG_CAUSALITY_ADR_DICTIONARY'
+
+
+def _print_warning(message):
+    print(f"Warning: {message}")
+
+
+def build_lexicon(builtin, env_var, name, on_error=None):
+    """
+    Built-in terms plus the dictionary named by an environment variable
+
+    Args:
+        builtin: Canonical name -> synonyms
+        env_var: Environment variable holding an optional dictionary path
+        name: Lexicon name
+        on_error: Callable(message) when the dictionary cannot be loaded
+            (defaults to a printed warning); the built-in terms are used then
+
+    Returns:
+        Lexicon
+    """
+    path = os.environ.get(env_var)
+    if path:
+        try:
+            lexicon = load_lexicon(path, name=name)
+            for canonical, synonyms in builtin.items():
+                for synonym in [canonical] + synonyms:
+                    lexicon.add(canonical, synonym)
+            return lexicon
+        except Exception as e:
+            (on_error or _print_warning)(f"Could not load {name} dictionary {path}: {e}")
+    return Lexicon(builtin, name=name)
+
+
+def load_drug_lexicon(on_error=None):
+    """Drug lexicon from COMMON_DRUGS and DRUG_CAUSALITY_DRUG_DICTIONARY"""
+    return build_lexicon(COMMON_DRUGS, DRUG_DICTIONARY_ENV, 'drugs', on_error)
+
+
+def load_adr_lexicon(on_error=None):
+    """Adverse event lexicon from ADR_KEYWORDS and DRUG_CAUSALITY_ADR_DICTIONARY"""
+    return build_lexicon(ADR_KEYWORDS, ADR_DICTIONARY_ENV, 'adverse events', on_error)
+
+
+_default_lexicons = {}
+_default_lexicons_lock = threading.Lock()
+
+
+def _default_lexicon(loader):
+    """Process-wide lexicon built once per loader"""
+    with _default_lexicons_lock:
+        if loader not in _default_lexicons:
+            _default_lexicons[loader] = loader()
+        return _default_lexicons[loader]
+
+
+class DrugExtractor:
+    """
+    Drug names in a text
+
+    Args:
+        lexicon: Lexicon to match (defaults to the process-wide drug lexicon)
+    """
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon if lexicon is not None else _default_lexicon(load_drug_lexicon)
+
+    def analyze(self, text):
+        return self.lexicon.analyze(text)
+
+    def extract(self, text):
+        return self.lexicon.find(text)
+
+    def get_frequencies(self, text):
+        return self.lexicon.counts(text)
+
+
+class ADRExtractor:
+    """
+    Adverse event terms in a text
+
+    Args:
+        lexicon: Lexicon to match (defaults to the process-wide ADR lexicon)
+    """
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon if lexicon is not None else _default_lexicon(load_adr_lexicon)
+
+    def analyze(self, text):
+        return self.lexicon.analyze(text)
+
+    def extract(self, text):
+        return self.lexicon.find(text)
+
+
+class CaseInfoExtractor:
+    """Patient demographics and pre-existing conditions of a case narrative"""
+
+    def extract_demographics(self, text):
+        info = {}
+        age_match = re.search(r'(\d{1,3})\s*(?:year|yo|y\.o\.)', text, re.IGNORECASE)
+        if age_match:
+            info['age'] = age_match.group(1)
+        gender_match = re.search(r'(male|female|man|woman)', text, re.IGNORECASE)
+        if gender_match:
+            info['gender'] = gender_match.group(1).capitalize()
+        return info
+
+    def extract_conditions(self, text):
+        conditions = []
+        keywords = ['diabetes', 'hypertension', 'cancer', 'infection', 'renal', 'hepatic', 'cardiac']
+        text_lower = text.lower()
+        for condition in keywords:
+            if condition in text_lower:
+                conditions.append(condition.capitalize())
+        return conditions
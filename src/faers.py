@@ -0,0 +1,544 @@
+"""
+openFDA FAERS adverse event lookups
+
+FDAFAERSConnector queries the openFDA drug event endpoint for reports that
+list a drug and returns their MedDRA reactions. Lookups go through:
+
+- one pooled requests.Session (keep-alive, bounded connection pool)
+- a TTL-bounded on-disk response cache keyed by the normalized query, so
+  repeated lookups of a drug across reruns and sessions skip the network
+- a client-side token-bucket rate limiter shared by every request of the
+  connector (openFDA allows 240 requests per minute per client)
+- retries with exponential backoff on connection errors, truncated
+  responses, 429 and 5xx; other request errors raise FAERSError
+
+get_adverse_events_bulk looks up many drugs concurrently.
+
+With a local store built from the FAERS quarterly extracts (see
+src/faers_store.py), the same queries are answered offline with full counts:
+pass store= or set DRUG_CAUSALITY_FAERS_STORE.
+
+The API base URL comes from the api_url argument, DRUG_CAUSALITY_FAERS_URL
+or the public endpoint, in that order, so tests can point the connector at a
+local stand-in server.
+
+Usage:
+    faers = FDAFAERSConnector()
+    faers.get_adverse_events('aspirin', limit=5)
+    faers.get_adverse_events_bulk(['aspirin', 'ibuprofen', 'warfarin'])
+    faers.count_reports('aspirin', reaction='nausea')
+    faers.reaction_counts('aspirin', top=10)
+
+    python -m src.faers aspirin ibuprofen --limit 10
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+from pathlib import Path
+
+from .meddra import normalize_term
+from .paths import atomic_write, get_cache_dir
+
+
+DEFAULT_API_URL = 'https://api.fda.gov/drug/event.json'
+API_URL_ENV = 'DRUG_CAUSALITY_FAERS_URL'
+# Optional openFDA API key (raises the daily request quota)
+API_KEY_ENV = 'DRUG_CAUSALITY_FAERS_API_KEY'
+# Local store built by src/faers_store.py
+STORE_ENV = 'DRUG_CAUSALITY_FAERS_STORE'
+
+# Seconds a cached response stays valid (0 disables the cache)
+CACHE_TTL_ENV = 'DRUG_CAUSALITY_FAERS_CACHE_TTL'
+DEFAULT_CACHE_TTL = 24 * 3600
+
+DEFAULT_RATE_LIMIT = 4.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 0.5
+DEFAULT_CONCURRENCY = 8
+
+# Largest limit openFDA accepts for count queries
+OPENFDA_MAX_COUNT_TERMS = 1000
+
+# Responses worth retrying; openFDA answers 404 when nothing matches
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+ENTRY_SUFFIX = '.json'
+
+
+class FAERSError(RuntimeError):
+    """A FAERS query failed after all retries"""
+
+
+def get_api_url(api_url=None):
+    """Endpoint from the argument, DRUG_CAUSALITY_FAERS_URL or the public API"""
+    return api_url or os.environ.get(API_URL_ENV) or DEFAULT_API_URL
+
+
+def normalize_drug_name(drug_name):
+    """Lowercase word tokens, single-space separated ('Aspirin ' == 'aspirin')"""
+    return normalize_term(drug_name)
+
+
+class FaersResponseCache:
+    """
+    Directory of openFDA responses that expire after a TTL
+
+    Args:
+        cache_dir: Directory holding the entries
+        ttl_seconds: Age after which an entry is treated as a miss and removed
+
+    Entries are written atomically, so the cache can be shared between
+    processes; a missing, expired or unreadable entry is a miss.
+    """
+
+    def __init__(self, cache_dir, ttl_seconds=DEFAULT_CACHE_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.expired = 0
+
+    @staticmethod
+    def make_key(api_url, params):
+        """Hash of the endpoint and the (normalized) query parameters"""
+        payload = json.dumps([api_url, sorted(params.items())], separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, key):
+        """Cached response body, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry.get('stored', 0) > self.ttl_seconds:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            with self._lock:
+                self.misses += 1
+                self.expired += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry['body']
+
+    def put(self, key, body):
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'stored': time.time(), 'body': body}, f)
+
+        atomic_write(self._path(key), write)
+
+        with self._lock:
+            self.writes += 1
+
+    def purge_expired(self):
+        """Remove expired entries; returns how many were removed"""
+        if not self.cache_dir.exists():
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        removed = 0
+        for path in self.cache_dir.glob(f'*/*{ENTRY_SUFFIX}'):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def clear(self):
+        """Remove every entry"""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob(f'*/*{ENTRY_SUFFIX}'):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        """Hit/miss counters of this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'lookups': lookups,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'expired': self.expired,
+                'ttl_seconds': self.ttl_seconds,
+            }
+
+
+def get_faers_cache(ttl_seconds=None):
+    """
+    Response cache under the user cache directory
+
+    Returns None if the TTL (argument or DRUG_CAUSALITY_FAERS_CACHE_TTL) is 0.
+    """
+    if ttl_seconds is None:
+        ttl_seconds = float(os.environ.get(CACHE_TTL_ENV) or DEFAULT_CACHE_TTL)
+    if ttl_seconds <= 0:
+        return None
+
+    return FaersResponseCache(get_cache_dir() / 'faers', ttl_seconds=ttl_seconds)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket
+
+    Args:
+        rate: Requests per second (None or 0 disables limiting)
+        burst: Requests allowed back to back before the rate applies
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token; returns the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        if not self.rate:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a request may be sent"""
+        if not self.rate:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def _retry_after(response):
+    """Seconds from a numeric Retry-After header, or None"""
+    value = response.headers.get('Retry-After')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_adverse_events(data, limit):
+    """Reaction entries of the first `limit` reports of an openFDA response"""
+    events = []
+    for report in data.get('results', [])[:limit]:
+        if 'patient' in report and 'reaction' in report['patient']:
+            for reaction in report['patient']['reaction']:
+                events.append({
+                    'event': reaction.get('reactionmeddrapt', 'Unknown'),
+                    'outcome': reaction.get('reactionoutcome', 'Unknown'),
+                })
+    return events
+
+
+class FDAFAERSConnector:
+    """
+    Pooled, cached and rate-limited openFDA drug event client
+
+    Args:
+        api_url: Endpoint (defaults to DRUG_CAUSALITY_FAERS_URL or the public API)
+        api_key: openFDA API key (defaults to DRUG_CAUSALITY_FAERS_API_KEY)
+        timeout: Seconds per HTTP request
+        cache: FaersResponseCache, None for the default cache, False to disable
+        rate_limit: Requests per second across all threads (None disables)
+        max_retries: Retries after the first attempt
+        backoff_seconds: First retry delay, doubled after every attempt
+        pool_size: Keep-alive connections held by the session
+        store: FaersStore or store directory to answer queries from instead
+            of openFDA (defaults to DRUG_CAUSALITY_FAERS_STORE if set); a
+            directory without an ingested store raises FileNotFoundError
+    """
+
+    def __init__(self, api_url=None, api_key=None, timeout=10, cache=None, rate_limit=DEFAULT_RATE_LIMIT,
+                 max_retries=DEFAULT_MAX_RETRIES, backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+                 pool_size=DEFAULT_CONCURRENCY, store=None):
+        self.api_url = get_api_url(api_url)
+        self.api_key = api_key or os.environ.get(API_KEY_ENV)
+        self.timeout = timeout
+        self.cache = get_faers_cache() if cache is None else (cache or None)
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.pool_size = pool_size
+
+        self._session = None
+        self._session_lock = threading.Lock()
+
+        # An empty environment value means no store
+        store = store or os.environ.get(STORE_ENV) or None
+        if store is not None and not hasattr(store, 'count_reports'):
+            from .faers_store import FaersStore
+            store = FaersStore.open(store)
+        self.store = store
+
+    @property
+    def session(self):
+        """requests.Session with a keep-alive pool of pool_size connections"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+
+    def close(self):
+        """Close the pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _query_params(self, drug_name, limit, reaction=None):
+        search = f'patient.drug.openfda.generic_name:"{normalize_drug_name(drug_name)}"'
+        if reaction:
+            search += f' AND patient.reaction.reactionmeddrapt:"{normalize_term(reaction)}"'
+        return {'search': search, 'limit': int(limit)}
+
+    def fetch(self, params):
+        """
+        Response body for an openFDA query, from the cache when fresh
+
+        Args:
+            params: Query parameters (search, limit, ...) without the API key
+
+        Returns:
+            Parsed JSON body; {'results': []} when nothing matches
+
+        Raises:
+            FAERSError: The query still failed after max_retries retries, or
+                failed with a non-transient requests error
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.make_key(self.api_url, params)
+            body = self.cache.get(key)
+            if body is not None:
+                return body
+
+        body = self._request(params)
+        if self.cache is not None:
+            try:
+                self.cache.put(key, body)
+            except OSError as e:
+                warnings.warn(f"Could not write FAERS response cache {self.cache.cache_dir}: {e}")
+        return body
+
+    def _request(self, params):
+        import requests
+
+        request_params = dict(params)
+        if self.api_key:
+            request_params['api_key'] = self.api_key
+
+        # Dropped or truncated connections are worth retrying
+        transient_errors = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+        delay = self.backoff_seconds
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(delay)
+                delay *= 2
+
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(self.api_url, params=request_params, timeout=self.timeout)
+            except transient_errors as e:
+                error = f"{type(e).__name__}: {e}"
+                continue
+            except requests.RequestException as e:
+                raise FAERSError(f"FAERS query {params.get('search')!r} failed: {type(e).__name__}: {e}")
+
+            if response.status_code == 200:
+                try:
+                    return response.json()
+                except ValueError as e:
+                    raise FAERSError(f"Invalid JSON from {self.api_url}: {e}")
+            if response.status_code == 404:
+                return {'results': []}
+            error = f"HTTP {response.status_code}"
+            if response.status_code not in RETRY_STATUS:
+                break
+            delay = max(delay, _retry_after(response) or 0.0)
+
+        raise FAERSError(f"FAERS query {params.get('search')!r} failed: {error}")
+
+    def fetch_adverse_events(self, drug_name, limit=5):
+        """
+        Reactions reported for a drug
+
+        Raises:
+            FAERSError: The lookup failed (see get_adverse_events for the
+                lenient variant)
+        """
+        if self.store is not None:
+            return self.store.get_adverse_events(drug_name, limit)
+        return parse_adverse_events(self.fetch(self._query_params(drug_name, limit)), limit)
+
+    def get_adverse_events(self, drug_name, limit=5):
+        """
+        Reactions reported for a drug, [] if the lookup failed
+
+        Args:
+            drug_name: Generic drug name
+            limit: Number of reports to read reactions from
+
+        Returns:
+            List of {'event': MedDRA PT, 'outcome': openFDA outcome code}
+        """
+        try:
+            return self.fetch_adverse_events(drug_name, limit)
+        except FAERSError as e:
+            warnings.warn(str(e))
+            return []
+
+    def count_reports(self, drug_name, reaction=None):
+        """
+        Number of reports listing a drug (and a MedDRA PT, if given)
+
+        The local store counts the latest version of each case; openFDA
+        reports its total number of matching reports.
+
+        Raises:
+            FAERSError: The openFDA query failed
+        """
+        if self.store is not None:
+            return self.store.count_reports(drug_name, reaction)
+        body = self.fetch(self._query_params(drug_name, 1, reaction))
+        return int(body.get('meta', {}).get('results', {}).get('total', 0))
+
+    def reaction_counts(self, drug_name, top=10):
+        """
+        Reports per MedDRA PT for a drug, most frequent first
+
+        Returns:
+            List of (PT, report count); openFDA returns at most 1000 terms
+
+        Raises:
+            FAERSError: The openFDA query failed
+        """
+        if self.store is not None:
+            return self.store.reaction_counts(drug_name, top)
+        params = self._query_params(drug_name, min(top or OPENFDA_MAX_COUNT_TERMS, OPENFDA_MAX_COUNT_TERMS))
+        params['count'] = 'patient.reaction.reactionmeddrapt.exact'
+        return [(term['term'], int(term['count'])) for term in self.fetch(params).get('results', [])]
+
+    async def aget_adverse_events_bulk(self, drug_names, limit=5, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Look up many drugs concurrently
+
+        Each distinct normalized name is fetched once. Requests run on the
+        pooled session in a thread pool of `concurrency` workers and share
+        the connector's rate limiter.
+
+        Returns:
+            Dict of drug name (as given) -> events ([] for failed lookups)
+        """
+        drug_names = list(drug_names)
+        unique = {}
+        for name in drug_names:
+            unique.setdefault(normalize_drug_name(name), name)
+
+        loop = asyncio.get_running_loop()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, concurrency),
+                                                   thread_name_prefix='faers') as executor:
+            events = await asyncio.gather(*(
+                loop.run_in_executor(executor, self.get_adverse_events, name, limit)
+                for name in unique.values()
+            ))
+
+        by_normalized = dict(zip(unique, events))
+        return {name: by_normalized[normalize_drug_name(name)] for name in drug_names}
+
+    def get_adverse_events_bulk(self, drug_names, limit=5, concurrency=DEFAULT_CONCURRENCY):
+        """Synchronous wrapper of aget_adverse_events_bulk (usable from Streamlit scripts)"""
+        coroutine = self.aget_adverse_events_bulk(drug_names, limit, concurrency)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+
+        # Called from inside an event loop: run the lookups on a helper thread
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Look up FAERS adverse events for drugs via openFDA')
+    parser.add_argument('drugs', nargs='+', help='Generic drug names')
+    parser.add_argument('--limit', type=int, default=5, help='Reports per drug')
+    parser.add_argument('--api-url', default=None, help=f'Endpoint (default: ${API_URL_ENV} or {DEFAULT_API_URL})')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--rate-limit', type=float, default=DEFAULT_RATE_LIMIT, help='Requests per second')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the response cache')
+    parser.add_argument('--store', default=None, help=f'Local FAERS store to query instead (default: ${STORE_ENV})')
+    args = parser.parse_args()
+
+    with FDAFAERSConnector(api_url=args.api_url, rate_limit=args.rate_limit,
+                           cache=False if args.no_cache else None, store=args.store) as faers:
+        start = time.perf_counter()
+        results = faers.get_adverse_events_bulk(args.drugs, limit=args.limit, concurrency=args.concurrency)
+        elapsed = time.perf_counter() - start
+
+        for drug, events in results.items():
+            print(f"\n{drug}: {len(events)} reactions")
+            for event in events:
+                print(f"  - {event['event']} (outcome {event['outcome']})")
+        print(f"\n? {len(results)} drugs in {elapsed:.2f}s")
+        if faers.cache is not None:
+            print(f"? Cache: {faers.cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,730 @@
+"""
+Offline FAERS store built from the quarterly ASCII extracts
+
+FDA publishes FAERS as quarterly '$'-delimited ASCII files (DEMOyyQn.txt,
+DRUGyyQn.txt, REACyyQn.txt, ...). This module ingests one quarter at a time
+into a local columnar store and answers drug / reaction queries from it with
+full counts, instead of the first N reports openFDA returns.
+
+Layout (all arrays are .npy files, memory-mapped when the store is opened):
+
+    manifest.json                  quarters, vocabulary version, counts
+    deleted_caseids.npy            cases removed by FDA's deletion files
+    vocab-NNNN/                    drug and MedDRA PT vocabularies
+        drug_name.*, drug_index.*      normalized drug name -> drug id
+        pt_name.*, pt_index.*          normalized PT -> pt id
+    quarters/2024Q1/
+        report_primaryid, report_caseid, report_caseversion,
+        report_fda_dt, report_sex, report_age_years, report_active
+        drug_report, drug_offsets      reports per drug id (CSR index)
+        pt_report, pt_offsets          reports per pt id (CSR index)
+        reac_pt, reac_offsets          PTs per report row (CSR)
+
+Drugs are indexed under the normalized verbatim name and under each active
+ingredient of prod_ai. FAERS repeats a case in later quarters when it is
+followed up; only the latest version of each case (and no case listed in a
+deletion file) is marked active and counted.
+
+Usage:
+    python -m src.faers_store ingest /data/faers_ascii_2024Q1.zip
+    python -m src.faers_store query aspirin --reaction "gastrointestinal haemorrhage"
+
+    store = FaersStore.open()
+    store.count_reports('aspirin')
+    store.reaction_counts('aspirin', top=10)
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from .faers import STORE_ENV
+from .meddra import HashIndex, StringTable, normalize_term
+from .paths import atomic_write, get_cache_dir
+
+
+# Bump when the store layout changes
+STORE_VERSION = 1
+
+MANIFEST_FILENAME = 'manifest.json'
+DELETED_FILENAME = 'deleted_caseids.npy'
+
+# Files of a quarterly extract; DELE lists cases FDA removed (recent quarters only)
+REQUIRED_TABLES = ('DEMO', 'DRUG', 'REAC')
+DELETED_TABLE = 'DELE'
+
+_QUARTER_FILE_RE = re.compile(r'^(DEMO|DRUG|REAC|DELE)[A-Z]*(\d{2})Q([1-4])\.TXT$', re.IGNORECASE)
+
+SEX_CODES = {'F': 1, 'M': 2}
+SEX_NAMES = {0: None, 1: 'F', 2: 'M'}
+
+# age_cod -> years
+AGE_UNITS = {'DEC': 10.0, 'YR': 1.0, 'MON': 1 / 12, 'WK': 1 / 52, 'DY': 1 / 365, 'HR': 1 / 8760}
+
+QUARTER_ARRAYS = (
+    'report_primaryid', 'report_caseid', 'report_caseversion',
+    'report_fda_dt', 'report_sex', 'report_age_years',
+    'drug_report', 'drug_offsets',
+    'pt_report', 'pt_offsets',
+    'reac_pt', 'reac_offsets',
+)
+ACTIVE_ARRAY = 'report_active'
+
+
+def get_store_path(path=None):
+    """Store directory from the argument, DRUG_CAUSALITY_FAERS_STORE or the user cache"""
+    if path:
+        return Path(path)
+    if os.environ.get(STORE_ENV):
+        return Path(os.environ[STORE_ENV])
+    return get_cache_dir() / 'faers_store'
+
+
+def drug_keys(drugname, prod_ai=''):
+    """Normalized names a DRUG row is indexed under (verbatim name and each active ingredient)"""
+    keys = {normalize_term(drugname)}
+    for ingredient in prod_ai.split('\\'):
+        keys.add(normalize_term(ingredient))
+    keys.discard('')
+    return keys
+
+
+# Reading extracts
+
+def find_quarter_files(source):
+    """
+    Locate the tables of one quarterly extract
+
+    Args:
+        source: Directory (searched recursively) or the downloaded .zip
+
+    Returns:
+        (quarter label such as '2024Q1', {table: member path or name})
+    """
+    source = Path(source)
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            names = zf.namelist()
+    elif source.is_dir():
+        names = [str(path) for path in source.rglob('*') if path.is_file()]
+    else:
+        raise FileNotFoundError(f"FAERS extract not found: {source}")
+
+    files, quarters = {}, set()
+    for name in names:
+        match = _QUARTER_FILE_RE.match(Path(name).name)
+        if match is None:
+            continue
+        table = match.group(1).upper()
+        # Several DELE files can ship with a quarter; the main tables appear once
+        files.setdefault(table, []).append(name)
+        if table != DELETED_TABLE:
+            quarters.add(f"20{match.group(2)}Q{match.group(3)}")
+
+    missing = [table for table in REQUIRED_TABLES if table not in files]
+    if missing:
+        raise FileNotFoundError(f"FAERS tables {', '.join(missing)} not found in {source}")
+    if len(quarters) != 1:
+        raise ValueError(f"Expected the files of one quarter in {source}, found {sorted(quarters) or 'none'}")
+
+    return quarters.pop(), files
+
+
+@contextlib.contextmanager
+def _open_member(source, name):
+    source = Path(source)
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf, zf.open(name) as member:
+            yield io.TextIOWrapper(member, encoding='latin-1', newline='')
+    else:
+        with open(name, encoding='latin-1', newline='') as f:
+            yield f
+
+
+def _read_table(source, name):
+    """
+    Stream a '$'-delimited table
+
+    Yields the header (lowercase column names) first, then the split rows
+    one at a time, so a table is never held in memory as a whole.
+    """
+    with _open_member(source, name) as f:
+        yield [column.strip().lower() for column in f.readline().rstrip('\r\n').split('$')]
+        for line in f:
+            if line.strip():
+                yield line.rstrip('\r\n').split('$')
+
+
+def _column(header, *names):
+    """Index of the first column present (legacy AERS files use other names)"""
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _to_int(value, default=0):
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _field(row, index):
+    return row[index].strip() if index is not None and index < len(row) else ''
+
+
+def source_checksum(source):
+    """SHA-256 of a zip, or of the table files in an extract directory"""
+    source = Path(source)
+    paths = [source] if source.is_file() else sorted(
+        Path(name) for names in find_quarter_files(source)[1].values() for name in names
+    )
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode('utf-8'))
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+# array typecode -> numpy dtype of the streamed columns
+_ARRAY_DTYPES = {'q': np.int64, 'i': np.int32, 'B': np.uint8, 'f': np.float32}
+
+
+def _report_rows(primaryids, keys, key_primaryids):
+    """
+    Map the primaryids of streamed DRUG/REAC entries to report rows
+
+    Entries whose primaryid is not in DEMO are dropped.
+
+    Returns:
+        (keys, report rows) as int arrays
+    """
+    keys = np.frombuffer(keys, dtype=np.int32)
+    key_primaryids = np.frombuffer(key_primaryids, dtype=np.int64)
+    if not len(primaryids):
+        return keys[:0], keys[:0]
+    rows = np.minimum(np.searchsorted(primaryids, key_primaryids), len(primaryids) - 1)
+    known = primaryids[rows] == key_primaryids
+    return keys[known], rows[known]
+
+
+def _csr(keys, values, size):
+    """Sorted unique values grouped by key, plus offsets of length size + 1"""
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.int64)
+    if len(keys):
+        base = values.max() + 1
+        keys, values = np.divmod(np.unique(keys * base + values), base)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=size), out=offsets[1:])
+    return offsets, values.astype(np.int32)
+
+
+class _Vocabulary:
+    """Growing list of display names with an index on their normalized form"""
+
+    def __init__(self, names=(), keys=()):
+        self.names = list(names)
+        self.keys = list(keys)
+        self.ids = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_store(cls, names, index):
+        keys = [None] * len(names)
+        for position in range(len(index)):
+            keys[int(index.values[position])] = index.keys[position]
+        return cls((names[i] for i in range(len(names))), keys)
+
+    def id(self, key, name):
+        ident = self.ids.get(key)
+        if ident is None:
+            ident = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.names.append(name)
+        return ident
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def _save_strings(path, name, table):
+    np.save(path / f'{name}.blob.npy', table.blob)
+    np.save(path / f'{name}.offsets.npy', table.offsets)
+
+
+def _save_index(path, name, index):
+    _save_strings(path, f'{name}.keys', index.keys)
+    np.save(path / f'{name}.values.npy', index.values)
+    np.save(path / f'{name}.slots.npy', index.slots)
+
+
+def _load_strings(path, name):
+    return StringTable(np.load(path / f'{name}.blob.npy', mmap_mode='r'),
+                       np.load(path / f'{name}.offsets.npy', mmap_mode='r'))
+
+
+def _load_index(path, name):
+    return HashIndex(_load_strings(path, f'{name}.keys'),
+                     np.load(path / f'{name}.values.npy', mmap_mode='r'),
+                     np.load(path / f'{name}.slots.npy', mmap_mode='r'))
+
+
+def _write_atomic_json(path, data):
+    def write(tmp_path):
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+    atomic_write(path, write)
+
+
+# Store
+
+class FaersStore:
+    """
+    Memory-mapped FAERS quarters with drug and PT indexes
+
+    Open with FaersStore.open(); add quarters with ingest_quarter().
+    Queries take drug names and MedDRA PTs in any case or spacing.
+    """
+
+    def __init__(self, path, manifest, vocab, quarters):
+        self.path = Path(path)
+        self.manifest = manifest
+        self.drug_name, self.drug_index, self.pt_name, self.pt_index = vocab
+        self.quarters = quarters
+
+    @classmethod
+    def open(cls, path=None, create=False):
+        """
+        Open a store
+
+        Args:
+            path: Store directory (see get_store_path)
+            create: Return an empty store to ingest into if the directory
+                has no manifest yet
+
+        Raises:
+            FileNotFoundError: If there is no store and create is false
+            ValueError: If the store has another layout version
+        """
+        path = get_store_path(path)
+        manifest_path = path / MANIFEST_FILENAME
+        if not manifest_path.exists():
+            if not create:
+                raise FileNotFoundError(f"No FAERS store at {path}; build one with: python -m src.faers_store ingest")
+            empty = StringTable.from_strings([])
+            return cls(path, {'version': STORE_VERSION, 'quarters': [], 'vocab': None},
+                       (empty, HashIndex.build([]), empty, HashIndex.build([])), {})
+
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != STORE_VERSION:
+            raise ValueError(f"FAERS store {path} has an unsupported version")
+
+        vocab_path = path / manifest['vocab']
+        vocab = (
+            _load_strings(vocab_path, 'drug_name'), _load_index(vocab_path, 'drug_index'),
+            _load_strings(vocab_path, 'pt_name'), _load_index(vocab_path, 'pt_index'),
+        )
+
+        quarters = {}
+        for entry in manifest['quarters']:
+            quarter_path = path / 'quarters' / entry['quarter']
+            quarters[entry['quarter']] = {
+                name: np.load(quarter_path / f'{name}.npy', mmap_mode='r')
+                for name in QUARTER_ARRAYS + (ACTIVE_ARRAY,)
+            }
+        return cls(path, manifest, vocab, quarters)
+
+    # Ingestion
+
+    def ingest_quarter(self, source, force=False, verbose=True):
+        """
+        Add (or replace) one quarterly extract
+
+        Args:
+            source: Extract directory or .zip with DEMO/DRUG/REAC files
+            force: Re-ingest a quarter even if the same files were ingested
+
+        Returns:
+            FaersStore reopened with the new quarter
+        """
+        start = time.perf_counter()
+        quarter, files = find_quarter_files(source)
+        checksum = source_checksum(source)
+        for entry in self.manifest['quarters']:
+            if entry['quarter'] == quarter and entry['source_sha256'] == checksum and not force:
+                if verbose:
+                    print(f"? {quarter} already ingested from the same files")
+                return self
+
+        drugs = _Vocabulary.from_store(self.drug_name, self.drug_index)
+        pts = _Vocabulary.from_store(self.pt_name, self.pt_index)
+
+        # DEMO: one row per report (primaryid); legacy AERS files use isr/case/gndr_cod.
+        # Tables are streamed row by row into typed columns, never held as text
+        rows = _read_table(source, files['DEMO'][0])
+        header = next(rows)
+        columns = {
+            'primaryid': _column(header, 'primaryid', 'isr'),
+            'caseid': _column(header, 'caseid', 'case'),
+            'caseversion': _column(header, 'caseversion'),
+            'fda_dt': _column(header, 'fda_dt'),
+            'sex': _column(header, 'sex', 'gndr_cod'),
+            'age': _column(header, 'age'),
+            'age_cod': _column(header, 'age_cod'),
+        }
+        demo = {
+            'report_primaryid': array('q'), 'report_caseid': array('q'), 'report_caseversion': array('i'),
+            'report_fda_dt': array('i'), 'report_sex': array('B'), 'report_age_years': array('f'),
+        }
+        seen = set()
+        for row in rows:
+            primaryid = _to_int(_field(row, columns['primaryid']), None)
+            if primaryid is None or primaryid in seen:
+                continue
+            seen.add(primaryid)
+            age = _field(row, columns['age'])
+            unit = AGE_UNITS.get(_field(row, columns['age_cod']).upper())
+            try:
+                age_years = float(age) * unit if unit else np.nan
+            except ValueError:
+                age_years = np.nan
+            demo['report_primaryid'].append(primaryid)
+            demo['report_caseid'].append(_to_int(_field(row, columns['caseid'])))
+            demo['report_caseversion'].append(_to_int(_field(row, columns['caseversion'])))
+            demo['report_fda_dt'].append(_to_int(_field(row, columns['fda_dt'])))
+            demo['report_sex'].append(SEX_CODES.get(_field(row, columns['sex']).upper(), 0))
+            demo['report_age_years'].append(age_years)
+        del seen
+
+        # Report rows are ordered by primaryid
+        order = np.argsort(np.frombuffer(demo['report_primaryid'], dtype=np.int64), kind='stable')
+        arrays = {name: np.frombuffer(column, dtype=_ARRAY_DTYPES[column.typecode])[order]
+                  for name, column in demo.items()}
+        del demo, order
+        primaryids = arrays['report_primaryid']
+
+        # DRUG: index each report under the drug's verbatim name and active ingredients
+        rows = _read_table(source, files['DRUG'][0])
+        header = next(rows)
+        primaryid_col = _column(header, 'primaryid', 'isr')
+        name_col = _column(header, 'drugname')
+        ai_col = _column(header, 'prod_ai')
+        drug_ids, drug_primaryids = array('i'), array('q')
+        for row in rows:
+            primaryid = _to_int(_field(row, primaryid_col), None)
+            if primaryid is None:
+                continue
+            for key in drug_keys(_field(row, name_col), _field(row, ai_col)):
+                drug_ids.append(drugs.id(key, key.upper()))
+                drug_primaryids.append(primaryid)
+        drug_ids, drug_rows = _report_rows(primaryids, drug_ids, drug_primaryids)
+        arrays['drug_offsets'], arrays['drug_report'] = _csr(drug_ids, drug_rows, len(drugs))
+        del drug_ids, drug_rows, drug_primaryids
+
+        # REAC: PTs per report and reports per PT
+        rows = _read_table(source, files['REAC'][0])
+        header = next(rows)
+        primaryid_col = _column(header, 'primaryid', 'isr')
+        pt_col = _column(header, 'pt')
+        reac_pts, reac_primaryids = array('i'), array('q')
+        for row in rows:
+            primaryid = _to_int(_field(row, primaryid_col), None)
+            pt = _field(row, pt_col)
+            key = normalize_term(pt)
+            if primaryid is None or not key:
+                continue
+            reac_pts.append(pts.id(key, pt))
+            reac_primaryids.append(primaryid)
+        reac_pts, reac_rows = _report_rows(primaryids, reac_pts, reac_primaryids)
+        arrays['reac_offsets'], arrays['reac_pt'] = _csr(reac_rows, reac_pts, len(primaryids))
+        arrays['pt_offsets'], arrays['pt_report'] = _csr(reac_pts, reac_rows, len(pts))
+        del reac_rows, reac_pts, reac_primaryids
+
+        deleted = set()
+        for name in files.get(DELETED_TABLE, []):
+            with _open_member(source, name) as f:
+                deleted.update(_to_int(line.split('$')[0].strip(), None) for line in f)
+        deleted.discard(None)
+
+        self._write_quarter(quarter, arrays)
+        manifest = self._write_vocab(drugs, pts)
+
+        quarters = [entry for entry in manifest['quarters'] if entry['quarter'] != quarter]
+        quarters.append({
+            'quarter': quarter,
+            'source': str(source),
+            'source_sha256': checksum,
+            'reports': len(primaryids),
+            'drug_entries': len(arrays['drug_report']),
+            'reactions': len(arrays['reac_pt']),
+            'deleted_cases': len(deleted),
+            'ingested_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        manifest['quarters'] = sorted(quarters, key=lambda entry: entry['quarter'])
+
+        deleted_path = self.path / DELETED_FILENAME
+        if deleted:
+            if deleted_path.exists():
+                deleted.update(np.load(deleted_path).tolist())
+            atomic_write(deleted_path, lambda tmp_path: np.save(tmp_path, np.array(sorted(deleted), dtype=np.int64)))
+
+        active = self._update_active(manifest)
+        manifest['active_reports'] = active
+        manifest['drug_count'] = len(drugs)
+        manifest['pt_count'] = len(pts)
+        _write_atomic_json(self.path / MANIFEST_FILENAME, manifest)
+        self._remove_stale_vocab(manifest['vocab'])
+
+        if verbose:
+            print(f"? Ingested {quarter}: {len(primaryids)} reports, {len(arrays['drug_report'])} drug entries, "
+                  f"{len(arrays['reac_pt'])} reactions in {time.perf_counter() - start:.1f}s")
+            print(f"? Store: {len(manifest['quarters'])} quarters, {active} active reports")
+        return FaersStore.open(self.path)
+
+    def _write_quarter(self, quarter, arrays):
+        def write(tmp_path):
+            tmp_path.mkdir()
+            for name in QUARTER_ARRAYS:
+                np.save(tmp_path / f'{name}.npy', arrays[name])
+            # Recomputed over all quarters once the manifest lists this one
+            np.save(tmp_path / f'{ACTIVE_ARRAY}.npy', np.ones(len(arrays['report_primaryid']), dtype=bool))
+
+        atomic_write(self.path / 'quarters' / quarter, write)
+
+    def _write_vocab(self, drugs, pts):
+        """Write the vocabularies into a new vocab-NNNN directory; returns the manifest to commit"""
+        manifest = dict(self.manifest)
+        serial = int(manifest['vocab'].rsplit('-', 1)[1]) + 1 if manifest.get('vocab') else 1
+        manifest['vocab'] = f'vocab-{serial:04d}'
+
+        path = self.path / manifest['vocab']
+        if path.exists():
+            shutil.rmtree(path)
+        path.mkdir(parents=True)
+
+        _save_strings(path, 'drug_name', StringTable.from_strings(drugs.names))
+        _save_index(path, 'drug_index', HashIndex.build((key, i) for i, key in enumerate(drugs.keys)))
+        _save_strings(path, 'pt_name', StringTable.from_strings(pts.names))
+        _save_index(path, 'pt_index', HashIndex.build((key, i) for i, key in enumerate(pts.keys)))
+        return manifest
+
+    def _remove_stale_vocab(self, current):
+        # Readers that already mapped an old vocabulary keep their open files
+        for path in self.path.glob('vocab-*'):
+            if path.name != current:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _update_active(self, manifest):
+        """
+        Mark the latest version of every case active across all quarters
+
+        Returns:
+            Number of active reports
+        """
+        quarters = [entry['quarter'] for entry in manifest['quarters']]
+        caseids, versions, order, sizes = [], [], [], []
+        for position, quarter in enumerate(quarters):
+            path = self.path / 'quarters' / quarter
+            caseid = np.load(path / 'report_caseid.npy')
+            caseids.append(caseid)
+            versions.append(np.load(path / 'report_caseversion.npy'))
+            order.append(np.full(len(caseid), position, dtype=np.int32))
+            sizes.append(len(caseid))
+
+        if not quarters:
+            return 0
+        caseids, versions, order = np.concatenate(caseids), np.concatenate(versions), np.concatenate(order)
+
+        # Last row per case after sorting by (case, version, quarter, row) is its latest version
+        rows = np.arange(len(caseids))
+        sort = np.lexsort((rows, order, versions, caseids))
+        last = np.ones(len(sort), dtype=bool)
+        last[:-1] = caseids[sort][1:] != caseids[sort][:-1]
+        active = np.zeros(len(caseids), dtype=bool)
+        active[sort[last]] = True
+        deleted_path = self.path / DELETED_FILENAME
+        if deleted_path.exists():
+            active &= ~np.isin(caseids, np.load(deleted_path))
+
+        for quarter, chunk in zip(quarters, np.split(active, np.cumsum(sizes)[:-1])):
+            path = self.path / 'quarters' / quarter / f'{ACTIVE_ARRAY}.npy'
+            if not np.array_equal(np.load(path), chunk):
+                atomic_write(path, lambda tmp_path: np.save(tmp_path, chunk))
+        return int(active.sum())
+
+    # Queries
+
+    def _drug_id(self, drug_name):
+        return self.drug_index.get(normalize_term(drug_name))
+
+    def _pt_id(self, reaction):
+        return self.pt_index.get(normalize_term(reaction))
+
+    def report_rows(self, drug=None, reaction=None):
+        """
+        Active report rows per quarter matching a drug and/or a reaction
+
+        Returns:
+            Dict of quarter -> sorted int array of report rows
+        """
+        drug_id = self._drug_id(drug) if drug else None
+        pt_id = self._pt_id(reaction) if reaction else None
+        if (drug and drug_id is None) or (reaction and pt_id is None):
+            return {quarter: np.empty(0, dtype=np.int32) for quarter in self.quarters}
+
+        matches = {}
+        for quarter, q in self.quarters.items():
+            rows = None
+            if drug:
+                rows = _slice(q['drug_report'], q['drug_offsets'], drug_id)
+            if reaction:
+                pt_rows = _slice(q['pt_report'], q['pt_offsets'], pt_id)
+                rows = pt_rows if rows is None else np.intersect1d(rows, pt_rows, assume_unique=True)
+            if rows is None:
+                rows = np.arange(len(q['report_primaryid']), dtype=np.int32)
+            matches[quarter] = rows[q[ACTIVE_ARRAY][rows]]
+        return matches
+
+    def count_reports(self, drug=None, reaction=None):
+        """Number of active reports listing the drug and/or the reaction"""
+        return sum(len(rows) for rows in self.report_rows(drug, reaction).values())
+
+    def reaction_counts(self, drug, top=None):
+        """
+        Reports per MedDRA PT among the active reports of a drug
+
+        Returns:
+            List of (PT, report count), most frequent first
+        """
+        counts = np.zeros(len(self.pt_name), dtype=np.int64)
+        for quarter, rows in self.report_rows(drug).items():
+            if len(rows):
+                q = self.quarters[quarter]
+                pt_ids = _gather(q['reac_pt'], q['reac_offsets'], rows)
+                counts += np.bincount(pt_ids, minlength=len(counts))
+
+        ranked = np.argsort(-counts, kind='stable')
+        ranked = ranked[counts[ranked] > 0]
+        if top is not None:
+            ranked = ranked[:top]
+        return [(self.pt_name[int(i)], int(counts[i])) for i in ranked]
+
+    def reports(self, drug=None, reaction=None, limit=5):
+        """
+        Most recent active reports matching a drug and/or reaction
+
+        Returns:
+            List of dicts with primaryid, caseid, caseversion, fda_dt, sex,
+            age_years and the report's reactions (MedDRA PTs)
+        """
+        results = []
+        for quarter, rows in sorted(self.report_rows(drug, reaction).items(), reverse=True):
+            q = self.quarters[quarter]
+            for row in rows[::-1][:limit - len(results)].tolist():
+                age = float(q['report_age_years'][row])
+                start, end = int(q['reac_offsets'][row]), int(q['reac_offsets'][row + 1])
+                results.append({
+                    'quarter': quarter,
+                    'primaryid': int(q['report_primaryid'][row]),
+                    'caseid': int(q['report_caseid'][row]),
+                    'caseversion': int(q['report_caseversion'][row]),
+                    'fda_dt': int(q['report_fda_dt'][row]),
+                    'sex': SEX_NAMES[int(q['report_sex'][row])],
+                    'age_years': None if np.isnan(age) else round(age, 2),
+                    'reactions': [self.pt_name[int(pt)] for pt in q['reac_pt'][start:end]],
+                })
+            if len(results) >= limit:
+                break
+        return results
+
+    def get_adverse_events(self, drug_name, limit=5):
+        """Reactions of the `limit` most recent reports, in FDAFAERSConnector's format"""
+        return [
+            {'event': reaction, 'outcome': 'Unknown'}
+            for report in self.reports(drug_name, limit=limit)
+            for reaction in report['reactions']
+        ]
+
+    def info(self):
+        return {
+            'path': str(self.path),
+            'quarters': [entry['quarter'] for entry in self.manifest['quarters']],
+            'reports': sum(entry['reports'] for entry in self.manifest['quarters']),
+            'active_reports': self.manifest.get('active_reports', 0),
+            'drugs': len(self.drug_name),
+            'reactions': len(self.pt_name),
+        }
+
+
+def _slice(values, offsets, ident):
+    """Values of one key of a CSR index (empty for ids the quarter never saw)"""
+    if ident >= len(offsets) - 1:
+        return np.empty(0, dtype=np.int32)
+    return np.asarray(values[int(offsets[ident]):int(offsets[ident + 1])])
+
+
+def _gather(values, offsets, rows):
+    """Concatenated CSR values of many rows"""
+    starts = np.asarray(offsets[rows])
+    lengths = np.asarray(offsets[rows + 1]) - starts
+    if not lengths.sum():
+        return np.empty(0, dtype=np.int32)
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return np.asarray(values[positions])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest FAERS quarterly ASCII extracts and query the local store")
+    parser.add_argument('--store', default=None, help=f"Store directory (default: ${STORE_ENV} or the user cache)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Add quarterly extracts, one quarter per .zip or directory")
+    ingest.add_argument('sources', nargs='+')
+    ingest.add_argument('--force', action='store_true', help="Re-ingest quarters whose files were ingested before")
+
+    commands.add_parser('info', help="Show the quarters and counts of the store")
+
+    query = commands.add_parser('query', help="Count reports and reactions for a drug")
+    query.add_argument('drug')
+    query.add_argument('--reaction', default=None, help="MedDRA PT to count together with the drug")
+    query.add_argument('--top', type=int, default=10, help="Most frequent reactions to list")
+    args = parser.parse_args()
+
+    store = FaersStore.open(args.store, create=args.command == 'ingest')
+    if args.command == 'ingest':
+        for source in args.sources:
+            store = store.ingest_quarter(source, force=args.force)
+    elif args.command == 'info':
+        print(json.dumps(store.info(), indent=2))
+    else:
+        start = time.perf_counter()
+        result = {
+            'drug': args.drug,
+            'reports': store.count_reports(args.drug),
+            'top_reactions': store.reaction_counts(args.drug, top=args.top),
+        }
+        if args.reaction:
+            result['reaction'] = args.reaction
+            result['reports_with_reaction'] = store.count_reports(args.drug, args.reaction)
+        result['query_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
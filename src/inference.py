@@ -4,78 +4,184 @@ Enhanced BioBERT Model with Medical Terminology Preprocessing
 PBRER/PSUR Compliant for Pharmacovigilance
 """
 
-import torch
 import numpy as np
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from pathlib import Path
-import PyPDF2
 import json
+import os
+import threading
 from datetime import datetime
 from typing import Union, List, Dict
 import re
-import ssl
-
-# NLTK setup with robust error handling
-import nltk
-
-# SSL fix for NLTK
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-# Enhanced NLTK data download with retry
-def download_nltk_data_robust():
-    """Download NLTK data with multiple attempts and fallbacks"""
-    import os
-    
-    # Set NLTK data path explicitly
-    nltk_data_dir = '/home/appuser/nltk_data'
-    if not os.path.exists(nltk_data_dir):
-        try:
-            os.makedirs(nltk_data_dir, exist_ok=True)
-        except:
-            pass
+import heapq
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .cpu_profile import apply_cpu_profile, get_cpu_profile, parse_cpu_profile
+from .metrics import current_timings, timed_operation
+from .model_registry import get_model_registry, model_fingerprint, resolve_model_dir
+from .paths import get_cache_dir
+from .quantization import SUPPORTED_QUANTIZATION
+from .pdf_cache import get_pdf_text_cache
+from .pdf_text import iter_pdf_pages, iter_pdf_texts
+from .text_matching import MarkerDetector, MultiPatternMatcher, ReplacementTable
+
+# Importing this module must stay cheap and offline: torch, transformers,
+# PyPDF2 and NLTK are imported on first use, and tokenizer resources are
+# only downloaded when explicitly allowed.
+
+# Local directory for NLTK resources (defaults to <cache dir>/nltk_data)
+NLTK_DATA_ENV = 'DRUG_CAUSALITY_NLTK_DATA'
+# Set to 1 to let ensure_sentence_tokenizer() download missing resources
+ALLOW_DOWNLOADS_ENV = 'DRUG_CAUSALITY_ALLOW_DOWNLOADS'
+
+NLTK_PACKAGES = ('punkt_tab', 'punkt')
+
+_sentence_tokenizer = None
+_sentence_tokenizer_lock = threading.Lock()
+
+
+def get_nltk_data_dir():
+    """Local directory searched first for NLTK resources"""
+    return Path(os.environ.get(NLTK_DATA_ENV) or get_cache_dir() / 'nltk_data')
+
+
+def _downloads_allowed():
+    return os.environ.get(ALLOW_DOWNLOADS_ENV, '').strip().lower() in ('1', 'true', 'yes')
+
+
+# Fallback sentence tokenizer using regex
+def simple_sentence_tokenize(text):
+    """Simple regex-based sentence tokenizer as fallback"""
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    return [s.strip() for s in sentences if s.strip()]
+
+
+def ensure_sentence_tokenizer(allow_download=None):
+    """
+    Resolve the sentence tokenizer once per process
     
-    if nltk_data_dir not in nltk.data.path:
-        nltk.data.path.insert(0, nltk_data_dir)
+    Uses NLTK's punkt model if it is installed in the local resource
+    directory (or any standard NLTK data path), and the regex tokenizer
+    otherwise. Nothing is downloaded unless allow_download is True or
+    DRUG_CAUSALITY_ALLOW_DOWNLOADS=1 is set.
     
-    packages = ['punkt', 'punkt_tab']
-    for package in packages:
-        for attempt in range(3):
+    Args:
+        allow_download: Download missing punkt resources into the local
+            resource directory (None defers to the environment)
+        
+    Returns:
+        Callable mapping text -> list of sentences
+    """
+    global _sentence_tokenizer
+    
+    with _sentence_tokenizer_lock:
+        # Only a download request can improve on an already resolved tokenizer
+        if _sentence_tokenizer is not None and (
+            not allow_download or _sentence_tokenizer is not simple_sentence_tokenize
+        ):
+            return _sentence_tokenizer
+        
+        if allow_download is None:
+            allow_download = _downloads_allowed()
+        
+        try:
+            import nltk
+        except ImportError:
+            _sentence_tokenizer = simple_sentence_tokenize
+            return _sentence_tokenizer
+        
+        nltk_data_dir = str(get_nltk_data_dir())
+        if nltk_data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, nltk_data_dir)
+        
+        for package in NLTK_PACKAGES:
             try:
                 nltk.data.find(f'tokenizers/{package}')
-                break
+                continue
             except LookupError:
+                pass
+            
+            if allow_download:
                 try:
+                    os.makedirs(nltk_data_dir, exist_ok=True)
                     nltk.download(package, download_dir=nltk_data_dir, quiet=True)
-                    break
                 except Exception as e:
-                    if attempt == 2:
-                        print(f"Warning: Could not download {package}")
-
-# Download on import
-download_nltk_data_robust()
+                    print(f"Warning: Could not download {package}: {e}")
+        
+        try:
+            from nltk.tokenize import sent_tokenize
+            sent_tokenize("Check. Tokenizer.")
+            _sentence_tokenizer = sent_tokenize
+        except Exception:
+            _sentence_tokenizer = simple_sentence_tokenize
+        
+        return _sentence_tokenizer
 
-# Fallback sentence tokenizer using regex
-def simple_sentence_tokenize(text):
-    """Simple regex-based sentence tokenizer as fallback"""
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    return [s.strip() for s in sentences if s.strip()]
 
 # Safe sentence tokenization with fallback
 def safe_sent_tokenize(text):
-    """Tokenize with NLTK, fallback to regex if NLTK fails"""
+    """Tokenize with NLTK if its resources are available locally, else with the regex fallback"""
+    tokenizer = _sentence_tokenizer or ensure_sentence_tokenizer()
     try:
-        from nltk.tokenize import sent_tokenize
-        return sent_tokenize(text)
-    except Exception as e:
+        return tokenizer(text)
+    except Exception:
         return simple_sentence_tokenize(text)
 
+# Medical terminology normalization table, applied in this order
+MEDICAL_CAUSALITY_REPLACEMENTS = {
+    # Strong causality markers
+    'secondary to': 'caused by',
+    'due to': 'caused by',
+    'caused by': 'caused by',
+    'induced by': 'caused by',
+    'associated with': 'related to',
+    'related to': 'related to',
+    
+    # Side effect terminology (normalize to "adverse effect")
+    'is a very rare side effect of': 'is an adverse effect of',
+    'is a very rare side effect': 'is an adverse effect',
+    'is a rare side effect of': 'is an adverse effect of',
+    'is a rare side effect': 'is an adverse effect',
+    'is a common side effect of': 'is an adverse effect of',
+    'is a common side effect': 'is an adverse effect',
+    'is a side effect of': 'is an adverse effect of',
+    'is a side effect': 'is an adverse effect',
+    'a side effect of': 'an adverse effect of',
+    'a side effect': 'an adverse effect',
+    'side effect of': 'adverse effect of',
+    'side effects of': 'adverse effects of',
+    
+    # Hedging language ? stronger causality
+    'may be related to': 'related to',
+    'may be associated with': 'related to',
+    'possibly related to': 'related to',
+    'possibly associated with': 'related to',
+    'likely related to': 'related to',
+    'likely associated with': 'related to',
+    'could be related to': 'related to',
+    'could be associated with': 'related to',
+    
+    # Temporal indicators
+    'after taking': 'following',
+    'following administration of': 'following',
+    'following treatment with': 'following',
+    'after administration of': 'following',
+    'upon taking': 'following',
+    
+    # Adverse event terminology
+    'adverse reaction': 'adverse effect',
+    'adverse event': 'adverse effect',
+    'adr': 'adverse effect',
+    'untoward effect': 'adverse effect',
+}
+
+# Compiled once; compat mode reproduces the original sequential str.replace output
+_DEFAULT_REPLACEMENT_TABLE = ReplacementTable(MEDICAL_CAUSALITY_REPLACEMENTS, compat=True)
+
+
 # Medical terminology preprocessing
-def preprocess_medical_causality(text):
+def preprocess_medical_causality(text, replacement_table=None):
     """
     Enhance causality signals in medical text by normalizing medical terminology.
     Converts hedged language to more definitive causality language.
@@ -84,94 +190,106 @@ def preprocess_medical_causality(text):
         "secondary to" ? "caused by"
         "is a very rare side effect" ? "is an adverse effect"
         "may be related to" ? "related to"
+    
+    Args:
+        text: Input text
+        replacement_table: Optional ReplacementTable, e.g. a site-specific
+            synonym table from text_matching.load_replacement_table(). The
+            default is MEDICAL_CAUSALITY_REPLACEMENTS in compat mode.
     """
     
     text_lower = text.lower()
     
-    # Normalize medical causality indicators
-    replacements = {
-        # Strong causality markers
-        'secondary to': 'caused by',
-        'due to': 'caused by',
-        'caused by': 'caused by',
-        'induced by': 'caused by',
-        'associated with': 'related to',
-        'related to': 'related to',
-        
-        # Side effect terminology (normalize to "adverse effect")
-        'is a very rare side effect of': 'is an adverse effect of',
-        'is a very rare side effect': 'is an adverse effect',
-        'is a rare side effect of': 'is an adverse effect of',
-        'is a rare side effect': 'is an adverse effect',
-        'is a common side effect of': 'is an adverse effect of',
-        'is a common side effect': 'is an adverse effect',
-        'is a side effect of': 'is an adverse effect of',
-        'is a side effect': 'is an adverse effect',
-        'a side effect of': 'an adverse effect of',
-        'a side effect': 'an adverse effect',
-        'side effect of': 'adverse effect of',
-        'side effects of': 'adverse effects of',
-        
-        # Hedging language ? stronger causality
-        'may be related to': 'related to',
-        'may be associated with': 'related to',
-        'possibly related to': 'related to',
-        'possibly associated with': 'related to',
-        'likely related to': 'related to',
-        'likely associated with': 'related to',
-        'could be related to': 'related to',
-        'could be associated with': 'related to',
-        
-        # Temporal indicators
-        'after taking': 'following',
-        'following administration of': 'following',
-        'following treatment with': 'following',
-        'after administration of': 'following',
-        'upon taking': 'following',
-        
-        # Adverse event terminology
-        'adverse reaction': 'adverse effect',
-        'adverse event': 'adverse effect',
-        'adr': 'adverse effect',
-        'untoward effect': 'adverse effect',
-    }
+    # Normalize medical causality indicators in a single compiled scan
+    table = _DEFAULT_REPLACEMENT_TABLE if replacement_table is None else replacement_table
+    return table.apply(text_lower)
+
+
+# Explicit causality/adverse event markers
+CAUSALITY_MARKERS = [
+    'secondary to',
+    'caused by',
+    'induced by',
+    'due to',
+    'following',
+    'after taking',
+    'side effect',
+    'adverse effect',
+    'adverse event',
+    'adr',
+    'related to',
+    'associated with',
+    'untoward effect',
+    'drug toxicity',
+    'drug-induced',
+    'iatrogenic',
+]
+
+_CAUSALITY_MARKER_DETECTOR = MarkerDetector(CAUSALITY_MARKERS)
+
+
+# Detect explicit causality markers
+def detect_causality_markers(text, detector=None):
+    """
+    Detect explicit causality/adverse event markers in text
     
-    for old, new in replacements.items():
-        text_lower = text_lower.replace(old, new)
+    All markers are found in one scan of the lowercased text.
     
-    return text_lower
+    Args:
+        text: Input text
+        detector: Optional MarkerDetector with a custom marker list
+        
+    Returns:
+        dict with has_markers, markers_found, marker_count (distinct markers),
+        spans ((start, end, marker) offsets into text.lower()) and occurrences
+    """
+    detector = _CAUSALITY_MARKER_DETECTOR if detector is None else detector
+    return detector.detect(text)
 
-# Detect explicit causality markers
-def detect_causality_markers(text):
-    """Detect explicit causality/adverse event markers in text"""
-    
-    causality_markers = [
-        'secondary to',
-        'caused by',
-        'induced by',
-        'due to',
-        'following',
-        'after taking',
-        'side effect',
-        'adverse effect',
-        'adverse event',
-        'adr',
-        'related to',
-        'associated with',
-        'untoward effect',
-        'drug toxicity',
-        'drug-induced',
-        'iatrogenic',
-    ]
+
+def detect_causality_markers_batch(texts, detector=None):
+    """Detect causality markers in many texts with a single scan; same format as detect_causality_markers"""
+    detector = _CAUSALITY_MARKER_DETECTOR if detector is None else detector
+    return detector.detect_batch(texts)
+
+
+def _softmax(logits):
+    """Row-wise softmax over a NumPy logits array"""
+    logits = np.asarray(logits, dtype=np.float32)
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# Small drug/ADR lexicon for the cheap sentence prior used by verdict-only mode
+PRIOR_LEXICON_TERMS = [
+    # Drugs (generic and brand names)
+    'bortezomib', 'velcade', 'metoprolol', 'lopressor', 'rituximab', 'rituxan',
+    'simvastatin', 'zocor', 'paclitaxel', 'taxol', 'cisplatin', 'platinol',
+    'doxorubicin', 'adriamycin', 'methotrexate', 'mtx',
+    # Adverse reactions
+    'hearing loss', 'deafness', 'neuropathy', 'nerve damage', 'cardiotoxicity',
+    'heart damage', 'nephrotoxicity', 'kidney damage', 'hepatotoxicity',
+    'liver damage', 'thrombocytopenia', 'anemia', 'nausea', 'vomiting', 'diarrhea',
+    'rash', 'toxicity',
+]
+
+_PRIOR_LEXICON_MATCHER = MultiPatternMatcher(PRIOR_LEXICON_TERMS)
+
+
+def causality_prior(text, marker_info=None):
+    """
+    Cheap prior for how likely a sentence is to be classified as related
     
-    text_lower = text.lower()
-    found_markers = [marker for marker in causality_markers if marker in text_lower]
+    Counts causality markers plus drug/ADR lexicon hits; no model involved.
     
-    return {
-        'has_markers': len(found_markers) > 0,
-        'markers_found': found_markers,
-        'marker_count': len(found_markers)
-    }
+    Args:
+        text: Input text
+        marker_info: Result of detect_causality_markers(text), if already known
+    """
+    if marker_info is None:
+        marker_info = detect_causality_markers(text)
+    lexicon_hits = len(_PRIOR_LEXICON_MATCHER.present(text.lower()))
+    return marker_info['marker_count'] + lexicon_hits
 
 
 class CausalityClassifier:
@@ -188,17 +306,226 @@ class CausalityClassifier:
         model_path: Path to trained model directory
         threshold: Base classification threshold (0-1)
         use_preprocessing: Whether to preprocess medical text
+        max_length: Maximum tokens per text (longer texts are truncated)
+        batch_size: Default number of texts per forward pass in predict_batch
+        revision: Optional model revision (branch, tag or commit hash)
+        dtype: Weight dtype name ('float32', 'float16' or 'bfloat16')
+        backend: Inference backend: 'torch', or 'onnx' for an ONNX Runtime
+            session on an export made with `python -m src.onnx_backend`
+            (torch is not imported on this path)
+        registry: ModelRegistry to load from (defaults to the process-wide one)
+        quantization: None for full precision, or 'int8' for dynamic INT8
+            quantization of the Linear layers (CPU). The converted model is
+            cached on disk after the first conversion.
+        cache: Optional LogitCache (src/result_cache.py). Raw logits are cached
+            per preprocessed text; threshold and score enhancement are applied
+            after lookup, so changing them does not invalidate the cache.
+        early_exit: None, True for the cached heads trained with
+            `python -m src.early_exit train`, or a path to a heads file.
+            Sentences leave at the first intermediate head whose confidence
+            reaches exit_confidence (torch backend only).
+        exit_confidence: Minimum head probability for an early exit
+    
+    The tokenizer and weights come from the model registry, so every classifier
+    for the same (model_path, revision, dtype, backend) shares one loaded model
+    and constructing additional classifiers is cheap.
     """
     
-    def __init__(self, model_path='PrashantRGore/drug-causality-bert-v2-model', threshold=0.5, use_preprocessing=True):
+    def __init__(self, model_path='PrashantRGore/drug-causality-bert-v2-model', threshold=0.5, use_preprocessing=True,
+                 max_length=96, batch_size=32, revision=None, dtype='float32', backend='torch', registry=None,
+                 quantization=None, cache=None, early_exit=None, exit_confidence=0.9):
+        if quantization is not None:
+            if quantization not in SUPPORTED_QUANTIZATION:
+                raise ValueError(f"Unsupported quantization '{quantization}'. Choose from: {', '.join(SUPPORTED_QUANTIZATION)}")
+            if dtype != 'float32':
+                raise ValueError("quantization can only be combined with dtype='float32'")
+            dtype = quantization
+        
         self.model_path = model_path
         self.threshold = threshold
         self.use_preprocessing = use_preprocessing
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.revision = revision
+        self.dtype = dtype
+        self.backend = backend
+        self.quantization = quantization
+        self.cache = cache
+        self._model_revision = None
+        
+        # Load model and tokenizer (shared across classifiers)
+        if registry is None:
+            registry = get_model_registry()
+        loaded = registry.get(self.model_path, revision=revision, dtype=dtype, backend=backend)
+        self.tokenizer = loaded.tokenizer
+        self.model = loaded.model
+        
+        # Optional early exit through distilled heads on intermediate layers
+        self.early_exit = None
+        self.early_exit_metadata = None
+        if early_exit:
+            if backend != 'torch':
+                raise ValueError("early_exit is only supported with the torch backend")
+            from .early_exit import load_early_exit_runner
+            heads_path = None if early_exit is True else early_exit
+            self.early_exit, self.early_exit_metadata = load_early_exit_runner(
+                model_path, self.model, heads_path=heads_path, revision=revision, confidence=exit_confidence
+            )
+    
+    @property
+    def model_revision(self):
+        """Identifier of the loaded weights, used to key cached logits"""
+        if self._model_revision is None:
+            try:
+                model_dir = resolve_model_dir(self.model_path, self.revision)
+            except OSError as e:
+                # Hub id that cannot be resolved (offline, not in the local
+                # hub cache): the name does not pin the weights, so only the
+                # in-memory tier of the cache may be keyed on it
+                if Path(self.model_path).is_dir():
+                    raise
+                fingerprint = f"{self.model_path}@{self.revision or 'default'}"
+                if self.cache is not None:
+                    self.cache.disable_persistent(f"could not fingerprint the weights of {self.model_path}: {e}")
+            else:
+                fingerprint = model_fingerprint(model_dir)
+            self._model_revision = f"{fingerprint}:{self.dtype}:{self.backend}"
+            if self.early_exit is not None:
+                heads = self.early_exit_metadata.get('trained_at', 'heads')
+                self._model_revision += f":exit@{heads}@{self.early_exit.confidence}"
+        return self._model_revision
+    
+    def _forward_logits(self, input_texts):
+        """
+        Run one tokenizer call and one forward pass over a chunk of texts
+        
+        Padding is dynamic (to the longest text in the chunk), so callers
+        should group texts of similar length together.
+        
+        Returns:
+            numpy float32 array of shape (len(input_texts), 2) with raw logits
+        """
+        timings = current_timings()
+        
+        if self.backend == 'onnx':
+            with timings.stage('tokenize', items=len(input_texts)):
+                inputs = self.tokenizer(list(input_texts), max_length=self.max_length)
+            with timings.stage('forward', items=len(input_texts)):
+                return np.asarray(self.model(inputs), dtype=np.float32)
+        
+        import torch
+        
+        with timings.stage('tokenize', items=len(input_texts)):
+            inputs = self.tokenizer(
+                list(input_texts),
+                return_tensors="pt",
+                truncation=True,
+                padding=True,
+                max_length=self.max_length
+            )
+        
+        with timings.stage('forward', items=len(input_texts)):
+            if self.early_exit is not None:
+                logits, _ = self.early_exit(inputs)
+                return logits
+            
+            with torch.no_grad():
+                outputs = self.model(**inputs)
+                return outputs.logits.float().numpy()
+    
+    def _compute_logits(self, input_texts, batch_size=None):
+        """
+        Logits for (already preprocessed) texts
+        
+        Duplicate texts are scored once. With a cache attached, cached logits
+        are reused and only the misses go through the model, in length-sorted
+        chunks of batch_size.
+        
+        Returns:
+            numpy float32 array of shape (len(input_texts), 2)
+        """
+        batch_size = batch_size or self.batch_size
+        unique_texts = list(dict.fromkeys(input_texts))
+        logits_by_text = {}
+        
+        keys = {}
+        if self.cache is not None:
+            with current_timings().stage('cache_lookup', items=len(unique_texts)):
+                revision = self.model_revision
+                keys = {
+                    text: self.cache.make_key(text, revision, self.max_length, self.use_preprocessing)
+                    for text in unique_texts
+                }
+                found = self.cache.get_many(list(keys.values()))
+                for text in unique_texts:
+                    if keys[text] in found:
+                        logits_by_text[text] = found[keys[text]]
+        
+        pending = sorted((text for text in unique_texts if text not in logits_by_text), key=len)
+        
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            chunk_logits = self._forward_logits(chunk)
+            logits_by_text.update(zip(chunk, chunk_logits))
+            
+            if self.cache is not None:
+                self.cache.put_many((keys[text], logits) for text, logits in zip(chunk, chunk_logits))
         
-        # Load model and tokenizer
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_path)
-        self.model.eval()
+        return np.stack([logits_by_text[text] for text in input_texts]).astype(np.float32)
+    
+    def _postprocess(self, probs, marker_counts, enhance_score=True):
+        """
+        Vectorized thresholding and marker-based score enhancement
+        
+        Args:
+            probs: Array of shape (n, 2) with class probabilities
+            marker_counts: Array of shape (n,) with causality marker counts
+            enhance_score: Apply score enhancement for edge cases
+            
+        Returns:
+            (labels, scores) arrays of shape (n,)
+        """
+        scores = probs[:, 1].astype(np.float64)
+        labels = (probs[:, 1] > self.threshold).astype(np.int64)
+        
+        if enhance_score:
+            # Boost score if explicit causality markers detected,
+            # 0.05 per marker capped at 0.15, same as the single-text path
+            marker_counts = np.asarray(marker_counts, dtype=np.float64)
+            boost = np.minimum(0.15, marker_counts * 0.05)
+            enhanced = np.minimum(scores + boost, 0.99)
+            
+            # Re-evaluate with enhanced score
+            boosted = (marker_counts > 0) & (enhanced > self.threshold)
+            labels = np.where(boosted, 1, labels)
+            scores = np.where(boosted, enhanced, scores)
+        
+        return labels, scores
+    
+    def _build_results(self, probs, labels, scores, marker_infos, return_probs):
+        """Assemble per-text result dicts from post-processed arrays"""
+        results = []
+        
+        for i, marker_info in enumerate(marker_infos):
+            pred = int(labels[i])
+            result = {
+                'prediction': 'related' if pred == 1 else 'not related',
+                'confidence': float(scores[i]),
+                'label': pred,
+                'causality_markers_detected': marker_info['has_markers'],
+                'marker_count': marker_info['marker_count'],
+                'markers_found': marker_info['markers_found'],
+            }
+            
+            if return_probs:
+                result['probabilities'] = {
+                    'not_related': float(probs[i, 0]),
+                    'related': float(probs[i, 1])
+                }
+            
+            results.append(result)
+        
+        return results
     
     def predict(self, text, return_probs=False, enhance_score=True):
         """
@@ -213,178 +540,458 @@ class CausalityClassifier:
             dict with prediction, confidence, and optional probabilities
         """
         
-        # Step 1: Detect causality markers
-        marker_info = detect_causality_markers(text)
+        with timed_operation() as timings:
+            # Step 1: Detect causality markers
+            with timings.stage('markers', items=1):
+                marker_info = detect_causality_markers(text)
+            
+            # Step 2: Preprocess text if enabled
+            input_text = text
+            if self.use_preprocessing:
+                with timings.stage('preprocess', items=1):
+                    input_text = preprocess_medical_causality(text)
+            
+            # Step 3: Tokenize and predict
+            logits = self._compute_logits([input_text])
+            
+            with timings.stage('postprocess', items=1):
+                probs = _softmax(logits)
+                
+                # Step 4: Score enhancement for edge cases
+                # This handles edge cases like "Hearing loss secondary to bortezomib is a very rare side effect"
+                labels, scores = self._postprocess(probs, [marker_info['marker_count']], enhance_score)
+                
+                # Step 5: Build result
+                return self._build_results(probs, labels, scores, [marker_info], return_probs)[0]
+    
+    def predict_batch(self, texts, return_probs=True, enhance_score=True, batch_size=None):
+        """
+        Predict causality for multiple texts
         
-        # Step 2: Preprocess text if enabled
-        input_text = text
-        if self.use_preprocessing:
-            input_text = preprocess_medical_causality(text)
-        
-        # Step 3: Tokenize and predict
-        inputs = self.tokenizer(
-            input_text,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=96
-        )
+        Texts are sorted by length and split into chunks of ``batch_size`` so
+        each chunk is padded only to its own longest member. Every chunk costs
+        one tokenizer call and one forward pass; softmax, thresholding and
+        score enhancement run as array operations over the whole input.
+        Texts found in the logit cache (if one is attached) skip the model.
         
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            probs = torch.softmax(outputs.logits, dim=1).numpy()[0]
-            pred = 1 if probs[1] > self.threshold else 0
+        Args:
+            texts: List of input texts
+            return_probs: Return probability distribution
+            enhance_score: Apply score enhancement for edge cases
+            batch_size: Texts per forward pass (defaults to self.batch_size)
+            
+        Returns:
+            List of result dicts, in input order, same format as predict()
+        """
+        texts = list(texts)
+        if not texts:
+            return []
         
-        # Step 4: Score enhancement for edge cases
-        score = float(probs[1])
+        batch_size = batch_size or self.batch_size
         
-        if enhance_score and marker_info['has_markers']:
-            # Boost score if explicit causality markers detected
-            # This handles edge cases like "Hearing loss secondary to bortezomib is a very rare side effect"
+        with timed_operation() as timings:
+            # Step 1: Detect causality markers
+            with timings.stage('markers', items=len(texts)):
+                marker_infos = detect_causality_markers_batch(texts)
+                marker_counts = np.array([info['marker_count'] for info in marker_infos])
             
-            # Boost based on number of markers
-            boost = min(0.15, marker_info['marker_count'] * 0.05)
-            enhanced_score = min(score + boost, 0.99)
+            # Step 2: Preprocess text if enabled
+            input_texts = texts
+            if self.use_preprocessing:
+                with timings.stage('preprocess', items=len(texts)):
+                    input_texts = [preprocess_medical_causality(text) for text in texts]
             
-            # Re-evaluate with enhanced score
-            if enhanced_score > self.threshold:
-                pred = 1
-                score = enhanced_score
-        
-        # Step 5: Build result
-        result = {
-            'prediction': 'related' if pred == 1 else 'not related',
-            'confidence': score,
-            'label': int(pred),
-            'causality_markers_detected': marker_info['has_markers'],
-            'marker_count': marker_info['marker_count'],
-        }
-        
-        if return_probs:
-            result['probabilities'] = {
-                'not_related': float(probs[0]),
-                'related': float(probs[1])
-            }
-        
-        return result
-    
-    def predict_batch(self, texts):
-        """Predict causality for multiple texts"""
-        return [self.predict(text, return_probs=True) for text in texts]
+            # Step 3: Tokenize and predict in length-sorted chunks
+            logits = self._compute_logits(input_texts, batch_size)
+            
+            with timings.stage('postprocess', items=len(texts)):
+                probs = _softmax(logits)
+                
+                # Step 4: Score enhancement for edge cases
+                labels, scores = self._postprocess(probs, marker_counts, enhance_score)
+                
+                # Step 5: Build results
+                return self._build_results(probs, labels, scores, marker_infos, return_probs)
 
 
-def extract_text_from_pdf(pdf_path):
+def extract_text_from_pdf(pdf_path, workers=1, use_cache=False):
     """
     Extract text from PDF file
     
+    Pages that fail to extract are skipped with a warning instead of
+    failing the whole document. Use pdf_text.iter_pdf_pages() to process
+    pages as they are extracted.
+    
     Args:
-        pdf_path: Path to PDF file
+        pdf_path: Path to PDF file (or its bytes / a binary file object)
+        workers: Extract pages in this many processes (big files only)
+        use_cache: Reuse and store text extracted from a file with the same
+            bytes on disk (see pdf_cache.get_pdf_text_cache; also enabled by
+            DRUG_CAUSALITY_PDF_CACHE_MB)
         
     Returns:
         Extracted text as string
     """
-    try:
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            
-            for page in pdf_reader.pages:
-                text += page.extract_text()
-            
-            return text
+    cache = get_pdf_text_cache(enable=use_cache)
+    return ''.join(iter_pdf_texts(pdf_path, workers=workers, on_error=_warn_page_error, cache=cache))
+
+
+def _warn_page_error(page):
+    print(f"Warning: Could not extract page {page.number}: {page.error}")
+
+
+def iter_document_sentences(document):
+    """
+    Yield sentences from a document
+    
+    Args:
+        document: Full text as a string, or an iterable of text blocks
+            (e.g. PDF pages) that are sentence-split one at a time
+    
+    The last sentence of each block is held back and split again together
+    with the next block, so a sentence running across a page break comes
+    out whole, as it would from the joined text.
+    """
+    if isinstance(document, str):
+        yield from safe_sent_tokenize(document)
+        return
+    
+    carry = ''
+    for block in document:
+        if not block:
+            continue
+        text = carry + block
+        sentences = safe_sent_tokenize(text)
+        if not sentences:
+            carry = text
+            continue
+        
+        yield from sentences[:-1]
+        start = text.rfind(sentences[-1])
+        carry = text[start:] if start >= 0 else sentences[-1]
+    
+    if carry:
+        yield from safe_sent_tokenize(carry)
+
+
+class CausalityAggregate:
+    """
+    Running document-level totals over streamed sentence results
+    
+    Keeps only counts and a bounded min-heap of the top-K related sentences,
+    so memory stays constant however long the document is.
+    
+    Args:
+        top_k: Number of top related sentences to keep
+    """
+    
+    def __init__(self, top_k=10):
+        self.top_k = top_k
+        self.total_sentences = 0
+        self.classified_sentences = 0
+        self.related_count = 0
+        self._top = []
+    
+    def add_sentence(self, index, sentence, result=None):
+        """
+        Record one sentence
+        
+        Args:
+            index: Position of the sentence in the document
+            sentence: Sentence text
+            result: predict() result with probabilities, or None when the
+                sentence was too short to classify
+        """
+        self.total_sentences += 1
+        if result is None:
+            return
+        
+        self.classified_sentences += 1
+        if result['label'] != 1:
+            return
+        
+        self.related_count += 1
+        if self.top_k <= 0:
+            return
+        
+        detail = {
+            'sentence': sentence[:150] + ('...' if len(sentence) > 150 else ''),
+            'probability_related': result['probabilities']['related'],
+            'confidence': result['confidence'],
+            'markers_detected': result['causality_markers_detected'],
+            'marker_count': result['marker_count']
+        }
+        
+        # Ties on probability keep the earlier sentence, like a stable sort
+        entry = (detail['probability_related'], -index, detail)
+        if len(self._top) < self.top_k:
+            heapq.heappush(self._top, entry)
+        elif entry[:2] > self._top[0][:2]:
+            heapq.heapreplace(self._top, entry)
+    
+    def top_related_sentences(self):
+        """Top related sentences, highest probability first"""
+        ranked = sorted(self._top, key=lambda entry: (-entry[0], -entry[1]))
+        return [detail for _, _, detail in ranked]
+    
+    def to_results(self, threshold, use_preprocessing, duration):
+        """Build the classify_causality() results dict from the running totals"""
+        total = self.total_sentences
+        return {
+            'final_classification': 'related' if self.related_count > 0 else 'not related',
+            'confidence_score': self.related_count / total if total else 0,
+            'related_sentences': self.related_count,
+            'not_related_sentences': total - self.related_count,
+            'total_sentences': total,
+            'top_related_sentences': self.top_related_sentences(),
+            'threshold_used': threshold,
+            'preprocessing_applied': use_preprocessing,
+            'processing_time_seconds': duration,
+            'timestamp': datetime.now().isoformat()
+        }
+
+
+class CausalityStream:
+    """
+    Incremental sentence-level classification of a document
+    
+    Sentences are split lazily, classified in chunks with predict_batch, and
+    yielded as soon as their chunk is done. A CausalityAggregate is updated
+    along the way, so summary() returns the same dict as classify_causality()
+    once the stream is exhausted (or a partial summary before that).
+    
+    Args:
+        document: Text string or iterable of text blocks (e.g. PDF pages)
+        classifier: CausalityClassifier to use
+        chunk_size: Sentences per forward pass
+        top_k: Number of top related sentences kept in the summary
+        start_time: Optional datetime used for processing_time_seconds
+        
+    Example:
+        stream = CausalityStream(pdf_text, classifier)
+        for sentence_result in stream:
+            print(sentence_result['index'], sentence_result['prediction'])
+        results = stream.summary()
+    """
+    
+    # Sentences shorter than this are counted but not classified
+    MIN_SENTENCE_CHARS = 10
+    
+    def __init__(self, document, classifier, chunk_size=32, top_k=10, start_time=None):
+        self.document = document
+        self.classifier = classifier
+        self.chunk_size = chunk_size
+        self.aggregate = CausalityAggregate(top_k=top_k)
+        self.start_time = start_time or datetime.now()
+        self._consumed = False
+    
+    def _classify_chunk(self, chunk):
+        results = self.classifier.predict_batch(
+            [sent for _, sent in chunk], return_probs=True, enhance_score=True
+        )
+        records = []
+        with current_timings().stage('aggregate', items=len(chunk)):
+            for (index, sent), result in zip(chunk, results):
+                self.aggregate.add_sentence(index, sent, result)
+                records.append({'index': index, 'sentence': sent, **result})
+        return records
+    
+    def chunks(self):
+        """Yield lists of per-sentence results, one list per classified chunk"""
+        if self._consumed:
+            raise RuntimeError("CausalityStream can only be iterated once")
+        self._consumed = True
+        
+        sentences = current_timings().iter_stage('sentence_split', iter_document_sentences(self.document))
+        
+        chunk = []
+        for index, sent in enumerate(sentences):
+            if not sent.strip() or len(sent.strip()) < self.MIN_SENTENCE_CHARS:
+                self.aggregate.add_sentence(index, sent)
+                continue
             
-    except FileNotFoundError:
-        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-    except Exception as e:
-        raise Exception(f"Error extracting PDF: {e}")
+            chunk.append((index, sent))
+            if len(chunk) >= self.chunk_size:
+                yield self._classify_chunk(chunk)
+                chunk = []
+        
+        if chunk:
+            yield self._classify_chunk(chunk)
+    
+    def __iter__(self):
+        """Yield per-sentence results as soon as each chunk is classified"""
+        for records in self.chunks():
+            yield from records
+    
+    def summary(self):
+        """Results dict for everything streamed so far"""
+        duration = (datetime.now() - self.start_time).total_seconds()
+        return self.aggregate.to_results(
+            self.classifier.threshold, self.classifier.use_preprocessing, duration
+        )
 
 
-def classify_causality(
-    pdf_text,
+def stream_classify_causality(
+    document,
     model_path='PrashantRGore/drug-causality-bert-v2-model',
     threshold=0.5,
     use_preprocessing=True,
-    verbose=False
+    classifier=None,
+    chunk_size=32,
+    top_k=10,
+    quantization=None
 ):
     """
-    Classify causality relationship in text
+    Streaming counterpart of classify_causality()
     
     Args:
-        pdf_text: Extracted text to classify
+        document: Text string or iterable of text blocks (e.g. PDF pages)
         model_path: Path to trained model
         threshold: Classification threshold (0-1)
         use_preprocessing: Apply medical terminology preprocessing
-        verbose: Print progress information
+        classifier: Optional CausalityClassifier to use instead of building one
+        chunk_size: Sentences per forward pass
+        top_k: Number of top related sentences kept in the summary
+        quantization: None or 'int8' (see CausalityClassifier)
         
     Returns:
-        Dictionary with classification results
+        CausalityStream; iterate it for per-sentence results, call chunks()
+        for per-chunk results, and summary() for the results dict
     """
-    
     start_time = datetime.now()
     
-    if verbose:
-        print(f"\nClassifying causality...")
-        print(f"Text length: {len(pdf_text)} characters")
-        print(f"Preprocessing: {'Enabled' if use_preprocessing else 'Disabled'}")
+    if classifier is None:
+        classifier = CausalityClassifier(model_path, threshold, use_preprocessing, quantization=quantization)
     
-    # Initialize classifier
-    classifier = CausalityClassifier(model_path, threshold, use_preprocessing)
+    return CausalityStream(document, classifier, chunk_size=chunk_size, top_k=top_k, start_time=start_time)
+
+
+def _classify_verdict_only(document, classifier, start_time, chunk_size):
+    """
+    Settle the document verdict with as few forward passes as possible
     
-    # Tokenize into sentences
-    sentences = safe_sent_tokenize(pdf_text)
+    Eligible sentences are ranked by causality_prior() and classified in
+    chunks, highest prior first. Inference stops after the first chunk that
+    contains a related sentence, since one related sentence already makes
+    the document 'related'. Sentences never scored are counted as not related
+    and reported in 'sentences_skipped'.
+    """
+    timings = current_timings()
+    sentences = list(timings.iter_stage('sentence_split', iter_document_sentences(document)))
+    aggregate = CausalityAggregate()
     
-    if verbose:
-        print(f"Total sentences: {len(sentences)}")
+    candidates = []
+    for index, sent in enumerate(sentences):
+        if not sent.strip() or len(sent.strip()) < CausalityStream.MIN_SENTENCE_CHARS:
+            aggregate.add_sentence(index, sent)
+        else:
+            candidates.append((index, sent))
     
-    # Classify each sentence
-    related_count = 0
-    sentence_details = []
+    # Stable sort keeps document order among sentences with the same prior
+    with timings.stage('prior', items=len(candidates)):
+        marker_infos = detect_causality_markers_batch([sent for _, sent in candidates])
+        priors = [causality_prior(sent, info) for (_, sent), info in zip(candidates, marker_infos)]
+        order = sorted(range(len(candidates)), key=priors.__getitem__, reverse=True)
+        candidates = [candidates[i] for i in order]
+    
+    classified = 0
+    for start in range(0, len(candidates), chunk_size):
+        chunk = candidates[start:start + chunk_size]
+        results = classifier.predict_batch(
+            [sent for _, sent in chunk], return_probs=True, enhance_score=True
+        )
+        with timings.stage('aggregate', items=len(chunk)):
+            for (index, sent), result in zip(chunk, results):
+                aggregate.add_sentence(index, sent, result)
+        classified += len(chunk)
+        
+        if aggregate.related_count > 0:
+            break
+    
+    for index, sent in candidates[classified:]:
+        aggregate.add_sentence(index, sent)
     
-    for sent in sentences:
-        if not sent.strip() or len(sent.strip()) < 10:
-            continue
-            
-        result = classifier.predict(sent, return_probs=True, enhance_score=True)
-        
-        if result['label'] == 1:
-            related_count += 1
-            sentence_details.append({
-                'sentence': sent[:150] + ('...' if len(sent) > 150 else ''),
-                'probability_related': result['probabilities']['related'],
-                'confidence': result['confidence'],
-                'markers_detected': result['causality_markers_detected'],
-                'marker_count': result['marker_count']
-            })
-    
-    # Sort by probability
-    sentence_details.sort(key=lambda x: x['probability_related'], reverse=True)
-    
-    # Final classification
-    final_classification = 'related' if related_count > 0 else 'not related'
-    confidence_score = related_count / len(sentences) if sentences else 0
-    
-    # Processing time
     duration = (datetime.now() - start_time).total_seconds()
+    results = aggregate.to_results(classifier.threshold, classifier.use_preprocessing, duration)
+    results['verdict_only'] = True
+    results['sentences_classified'] = classified
+    results['sentences_skipped'] = len(candidates) - classified
+    return results
+
+
+def classify_causality(
+    pdf_text,
+    model_path='PrashantRGore/drug-causality-bert-v2-model',
+    threshold=0.5,
+    use_preprocessing=True,
+    verbose=False,
+    classifier=None,
+    verdict_only=False,
+    quantization=None,
+    collect_timings=False
+):
+    """
+    Classify causality relationship in text
     
-    results = {
-        'final_classification': final_classification,
-        'confidence_score': confidence_score,
-        'related_sentences': related_count,
-        'not_related_sentences': len(sentences) - related_count,
-        'total_sentences': len(sentences),
-        'top_related_sentences': sentence_details[:10],
-        'threshold_used': threshold,
-        'preprocessing_applied': use_preprocessing,
-        'processing_time_seconds': duration,
-        'timestamp': datetime.now().isoformat()
-    }
+    Args:
+        pdf_text: Extracted text to classify, or an iterable of page texts
+            (e.g. pdf_text.iter_pdf_texts) that is consumed as it is produced
+        model_path: Path to trained model
+        threshold: Classification threshold (0-1)
+        use_preprocessing: Apply medical terminology preprocessing
+        verbose: Print progress information
+        classifier: Optional CausalityClassifier to use instead of building one
+            from model_path/threshold/use_preprocessing
+        verdict_only: Only settle final_classification. Sentences are scored
+            in order of a cheap marker/lexicon prior and inference stops once
+            a related sentence is found, so sentence counts are lower bounds.
+            The result reports 'sentences_skipped'.
+        quantization: None or 'int8' for dynamic INT8 CPU inference
+        collect_timings: Add per-stage wall/CPU time and item counts as
+            results['timings'] (see src/metrics.py)
+        
+    Returns:
+        Dictionary with classification results
+    """
     
-    if verbose:
-        print(f"\nResults:")
-        print(f"  Classification: {final_classification}")
-        print(f"  Confidence: {confidence_score:.2%}")
-        print(f"  Related sentences: {related_count}/{len(sentences)}")
-        print(f"  Processing time: {duration:.2f}s")
+    with timed_operation(collect_timings) as timings:
+        start_time = datetime.now()
+        
+        # Initialize classifier (weights come from the shared model registry)
+        if classifier is None:
+            with timings.stage('model_load'):
+                classifier = CausalityClassifier(model_path, threshold, use_preprocessing, quantization=quantization)
+        else:
+            threshold = classifier.threshold
+            use_preprocessing = classifier.use_preprocessing
+        
+        if verbose:
+            print(f"\nClassifying causality...")
+            if isinstance(pdf_text, str):
+                print(f"Text length: {len(pdf_text)} characters")
+            print(f"Preprocessing: {'Enabled' if use_preprocessing else 'Disabled'}")
+        
+        if verdict_only:
+            results = _classify_verdict_only(pdf_text, classifier, start_time, classifier.batch_size)
+        else:
+            # Classify sentences in batched chunks
+            stream = CausalityStream(pdf_text, classifier, chunk_size=classifier.batch_size, start_time=start_time)
+            for _ in stream.chunks():
+                pass
+            
+            results = stream.summary()
+        
+        if verbose:
+            print(f"\nResults:")
+            print(f"  Classification: {results['final_classification']}")
+            print(f"  Confidence: {results['confidence_score']:.2%}")
+            print(f"  Related sentences: {results['related_sentences']}/{results['total_sentences']}")
+            if verdict_only:
+                print(f"  Sentences skipped: {results['sentences_skipped']}")
+            print(f"  Processing time: {results['processing_time_seconds']:.2f}s")
+        
+        if collect_timings:
+            results['timings'] = timings.as_dict()
     
     return results
 
@@ -395,7 +1002,13 @@ def process_pdf_file(
     threshold=0.5,
     use_preprocessing=True,
     save_report=False,
-    output_dir='./results'
+    output_dir='./results',
+    classifier=None,
+    verdict_only=False,
+    quantization=None,
+    extraction_workers=1,
+    use_pdf_cache=False,
+    collect_timings=False
 ):
     """
     Complete pipeline: Extract PDF ? Classify ? Generate Report
@@ -407,6 +1020,15 @@ def process_pdf_file(
         use_preprocessing: Apply medical terminology preprocessing
         save_report: Save detailed report to file
         output_dir: Directory to save reports
+        classifier: Optional CausalityClassifier to reuse
+        verdict_only: Stop inference once the document verdict is settled
+            (see classify_causality)
+        quantization: None or 'int8' for dynamic INT8 CPU inference
+        extraction_workers: Processes for page extraction (big PDFs only)
+        use_pdf_cache: Reuse and store extracted text on disk (see
+            pdf_cache.get_pdf_text_cache)
+        collect_timings: Add per-stage timings, including PDF extraction and
+            report writing, as results['timings']
         
     Returns:
         Classification results dictionary
@@ -414,45 +1036,135 @@ def process_pdf_file(
     
     print(f"\nProcessing PDF: {pdf_path}")
     
-    # Step 1: Extract text
-    pdf_text = extract_text_from_pdf(pdf_path)
-    print(f"? Extracted {len(pdf_text)} characters")
-    
-    # Step 2: Classify causality
-    results = classify_causality(
-        pdf_text=pdf_text,
-        model_path=model_path,
-        threshold=threshold,
-        use_preprocessing=use_preprocessing,
-        verbose=True
-    )
-    
-    # Step 3: Add PDF metadata
-    results['pdf_file'] = str(Path(pdf_path).name)
-    results['pdf_path'] = str(Path(pdf_path).absolute())
-    
-    # Step 4: Save report if requested
-    if save_report:
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with timed_operation(collect_timings) as timings:
+        # Step 1: Extract text page by page; classification starts on the first pages
+        extraction = {'pages': 0, 'characters': 0, 'page_errors': []}
         
-        report_filename = f"{Path(pdf_path).stem}_causality_report.json"
-        report_path = Path(output_dir) / report_filename
+        def pages():
+            cache = get_pdf_text_cache(enable=use_pdf_cache)
+            pdf_pages = iter_pdf_pages(pdf_path, workers=extraction_workers, cache=cache)
+            for page in timings.iter_stage('pdf_extract', pdf_pages):
+                extraction['pages'] += 1
+                extraction['characters'] += len(page.text)
+                if page.error:
+                    _warn_page_error(page)
+                    extraction['page_errors'].append({'page': page.number, 'error': page.error})
+                yield page.text
         
-        with open(report_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # Step 2: Classify causality
+        results = classify_causality(
+            pdf_text=pages(),
+            model_path=model_path,
+            threshold=threshold,
+            use_preprocessing=use_preprocessing,
+            verbose=True,
+            classifier=classifier,
+            verdict_only=verdict_only,
+            quantization=quantization
+        )
+        
+        print(f"? Extracted {extraction['characters']} characters from {extraction['pages']} pages")
+        
+        # Step 3: Add PDF metadata
+        results['pdf_pages'] = extraction['pages']
+        results['pdf_page_errors'] = extraction['page_errors']
+        results['pdf_file'] = str(Path(pdf_path).name)
+        results['pdf_path'] = str(Path(pdf_path).absolute())
+        
+        # Step 4: Save report if requested
+        if save_report:
+            with timings.stage('report_write'):
+                if collect_timings:
+                    results['timings'] = timings.as_dict()
+                
+                Path(output_dir).mkdir(parents=True, exist_ok=True)
+                
+                report_filename = f"{Path(pdf_path).stem}_causality_report.json"
+                report_path = Path(output_dir) / report_filename
+                
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2, ensure_ascii=False)
+            
+            print(f"? Report saved: {report_path}")
         
-        print(f"? Report saved: {report_path}")
+        if collect_timings:
+            results['timings'] = timings.as_dict()
     
     return results
 
 
+def _print_pdf_status(results):
+    """Print the one-line outcome for a PDF in a batch run"""
+    if 'error' in results:
+        print(f"? Error: {results['error']}")
+    else:
+        print(f"? Success: {results['final_classification']}")
+
+
+# Classifier loaded once per worker process by _init_pdf_worker
+_worker_classifier = None
+_worker_init_error = None
+
+
+def _init_pdf_worker(model_path, threshold, use_preprocessing, torch_threads, quantization=None,
+                     cpu_profile=None, replica_counter=None):
+    """Worker initializer: apply the CPU layout and load the classifier once"""
+    global _worker_classifier, _worker_init_error
+    
+    if cpu_profile is not None:
+        # Each worker takes the next replica slot (and its cores) of the profile
+        with replica_counter.get_lock():
+            replica_index = replica_counter.value
+            replica_counter.value += 1
+        apply_cpu_profile(cpu_profile, replica_index)
+    elif torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+    
+    try:
+        _worker_classifier = CausalityClassifier(model_path, threshold, use_preprocessing, quantization=quantization)
+    except Exception as e:
+        # Reported per file, like a model load failure in the sequential path
+        _worker_init_error = e
+
+
+def _pdf_error_result(pdf_path, error):
+    """Result dict recorded for a PDF that failed to process"""
+    return {
+        'pdf_file': str(Path(pdf_path).name),
+        'pdf_path': str(pdf_path),
+        'error': str(error),
+        'final_classification': 'error'
+    }
+
+
+def _process_pdf_safely(pdf_path, **pdf_kwargs):
+    """Run process_pdf_file, turning any failure into an error result dict"""
+    try:
+        return process_pdf_file(pdf_path=pdf_path, **pdf_kwargs)
+    except Exception as e:
+        return _pdf_error_result(pdf_path, e)
+
+
+def _process_pdf_in_worker(pdf_path, **pdf_kwargs):
+    """Task run inside a worker process with the worker's resident classifier"""
+    if _worker_init_error is not None:
+        return _pdf_error_result(pdf_path, _worker_init_error)
+    return _process_pdf_safely(pdf_path, classifier=_worker_classifier, **pdf_kwargs)
+
+
 def process_multiple_pdfs(
     pdf_paths,
     model_path='PrashantRGore/drug-causality-bert-v2-model',
     threshold=0.5,
     use_preprocessing=True,
     save_reports=False,
-    output_dir='./results'
+    output_dir='./results',
+    num_workers=1,
+    torch_threads=None,
+    verdict_only=False,
+    quantization=None,
+    cpu_profile=None
 ):
     """
     Process multiple PDF files in batch
@@ -464,44 +1176,81 @@ def process_multiple_pdfs(
         use_preprocessing: Apply medical terminology preprocessing
         save_reports: Save individual reports
         output_dir: Directory to save reports
+        num_workers: Number of worker processes. With more than one, each
+            worker loads the classifier once at startup and PDFs are
+            distributed across workers; results keep the input order.
+        torch_threads: Torch intra-op threads per worker (None leaves the
+            torch default; set it so num_workers * torch_threads fits the cores)
+        verdict_only: Stop inference per PDF once its verdict is settled
+            (see classify_causality)
+        quantization: None or 'int8' for dynamic INT8 CPU inference
+        cpu_profile: CPUProfile or spec (see src/cpu_profile.py); defaults
+            to DRUG_CAUSALITY_CPU_PROFILE. When set, it replaces num_workers
+            and torch_threads: one worker per replica, each with the
+            profile's threads and cores. A single-replica profile is applied
+            to the calling process.
         
     Returns:
         List of results for each PDF
     """
     
+    pdf_paths = list(pdf_paths)
+    
+    cpu_profile = parse_cpu_profile(cpu_profile) if cpu_profile is not None else get_cpu_profile()
+    if cpu_profile is not None:
+        num_workers = cpu_profile.replicas
+        torch_threads = cpu_profile.threads_per_replica()
+        if num_workers == 1:
+            apply_cpu_profile(cpu_profile)
+    
     print(f"\n{'='*70}")
     print(f"BATCH PDF PROCESSING - v2.0 ENHANCED")
     print(f"{'='*70}")
     print(f"Total PDFs: {len(pdf_paths)}")
     print(f"Threshold: {threshold}")
     print(f"Preprocessing: {'Enabled' if use_preprocessing else 'Disabled'}")
+    if cpu_profile is not None:
+        print(f"CPU profile: {cpu_profile.describe()}")
+    elif num_workers > 1:
+        print(f"Workers: {num_workers} (torch threads per worker: {torch_threads or 'default'})")
     print(f"{'='*70}\n")
     
+    pdf_kwargs = {
+        'model_path': model_path,
+        'threshold': threshold,
+        'use_preprocessing': use_preprocessing,
+        'save_report': save_reports,
+        'output_dir': output_dir,
+        'verdict_only': verdict_only,
+        'quantization': quantization,
+    }
+    
     all_results = []
     
-    for i, pdf_path in enumerate(pdf_paths, 1):
-        print(f"\n[{i}/{len(pdf_paths)}] Processing: {pdf_path}")
-        
-        try:
-            results = process_pdf_file(
-                pdf_path=pdf_path,
-                model_path=model_path,
-                threshold=threshold,
-                use_preprocessing=use_preprocessing,
-                save_report=save_reports,
-                output_dir=output_dir
-            )
-            all_results.append(results)
-            print(f"? Success: {results['final_classification']}")
+    if num_workers > 1:
+        # Spawn rather than fork: forking a process that has already
+        # initialized torch's thread pools can deadlock the children
+        context = multiprocessing.get_context('spawn')
+        executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=_init_pdf_worker,
+            initargs=(model_path, threshold, use_preprocessing, torch_threads, quantization,
+                      cpu_profile, context.Value('i', 0))
+        )
+        with executor:
+            results_iter = executor.map(partial(_process_pdf_in_worker, **pdf_kwargs), pdf_paths)
+            for i, (pdf_path, results) in enumerate(zip(pdf_paths, results_iter), 1):
+                print(f"\n[{i}/{len(pdf_paths)}] Processed: {pdf_path}")
+                _print_pdf_status(results)
+                all_results.append(results)
+    else:
+        for i, pdf_path in enumerate(pdf_paths, 1):
+            print(f"\n[{i}/{len(pdf_paths)}] Processing: {pdf_path}")
             
-        except Exception as e:
-            print(f"? Error: {e}")
-            all_results.append({
-                'pdf_file': str(Path(pdf_path).name),
-                'pdf_path': str(pdf_path),
-                'error': str(e),
-                'final_classification': 'error'
-            })
+            results = _process_pdf_safely(pdf_path, **pdf_kwargs)
+            _print_pdf_status(results)
+            all_results.append(results)
     
     # Generate summary
     successful = len([r for r in all_results if 'error' not in r])
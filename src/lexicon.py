@@ -0,0 +1,268 @@
+"""
+Token-based drug and adverse event lexicon matching
+
+A lexicon maps canonical names to their synonyms, e.g.
+'bortezomib' -> ['bortezomib', 'velcade']. Synonyms are matched on token
+boundaries ('mtx' does not match inside 'mtxa', 'cisplatin' does match in
+'cisplatin-induced'), leftmost-longest, in one pass over the text.
+
+The compiled index is a hash of token sequences plus, per first token, the
+longest phrase starting with it, so each text position costs one dict lookup
+no matter how many synonyms are loaded. Dictionaries with hundreds of
+thousands of entries are loaded from JSON/TSV files and the compiled index is
+pickled next to the other cached artifacts, keyed by the file's checksum, so
+later processes skip the rebuild.
+
+Usage:
+    drugs = load_lexicon('dictionaries/drugs.tsv')
+    result = drugs.analyze(pdf_text)
+    result['found'], result['counts'], result['spans']
+"""
+
+import hashlib
+import json
+import pickle
+import re
+import sys
+from pathlib import Path
+
+from .paths import atomic_write, cache_artifact_path
+
+
+# Bump when the pickled layout changes
+SNAPSHOT_VERSION = 1
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Lowercased word tokens of a text with their (start, end) offsets"""
+    return [(m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text.lower())]
+
+
+def _phrase_key(phrase):
+    return tuple(sys.intern(token) for token, _, _ in tokenize(phrase))
+
+
+class Lexicon:
+    """
+    Compiled synonym lexicon
+
+    Args:
+        entries: Mapping canonical name -> iterable of synonyms (the canonical
+            name itself is always matched too), or iterable of
+            (canonical, synonym) pairs
+        name: Optional label for reports
+
+    If a synonym is listed under several canonical names, the first one wins.
+    """
+
+    def __init__(self, entries, name=None):
+        self.name = name
+        self.canonical = []
+        self._canonical_index = {}
+        self._phrases = {}
+        self._max_tokens = {}
+
+        pairs = entries.items() if hasattr(entries, 'items') else entries
+        for canonical, synonyms in pairs:
+            if isinstance(synonyms, str):
+                synonyms = [synonyms]
+            self.add(canonical, canonical)
+            for synonym in synonyms:
+                self.add(canonical, synonym)
+
+    def add(self, canonical, synonym):
+        """Add one synonym; returns False if it was empty or already present"""
+        key = _phrase_key(synonym)
+        if not key or key in self._phrases:
+            return False
+
+        index = self._canonical_index.get(canonical)
+        if index is None:
+            index = len(self.canonical)
+            self.canonical.append(canonical)
+            self._canonical_index[canonical] = index
+
+        self._phrases[key] = index
+        first = key[0]
+        if len(key) > self._max_tokens.get(first, 0):
+            self._max_tokens[first] = len(key)
+        return True
+
+    def __len__(self):
+        """Number of synonyms"""
+        return len(self._phrases)
+
+    def scan(self, text):
+        """
+        Find synonym occurrences, leftmost-longest and non-overlapping
+
+        Returns:
+            List of (start, end, canonical) with character offsets into text
+        """
+        tokens = tokenize(text)
+        words = [token for token, _, _ in tokens]
+        phrases = self._phrases
+        max_tokens = self._max_tokens
+
+        hits = []
+        i = 0
+        n = len(words)
+        while i < n:
+            longest = max_tokens.get(words[i])
+            if longest is None:
+                i += 1
+                continue
+
+            for size in range(min(longest, n - i), 0, -1):
+                index = phrases.get(tuple(words[i:i + size]))
+                if index is not None:
+                    hits.append((tokens[i][1], tokens[i + size - 1][2], self.canonical[index]))
+                    i += size
+                    break
+            else:
+                i += 1
+        return hits
+
+    def analyze(self, text):
+        """
+        Hits, counts and offsets in one pass
+
+        Returns:
+            dict with:
+                found: Set of canonical names present
+                counts: Occurrences per canonical name
+                spans: (start, end, canonical) per occurrence
+        """
+        spans = self.scan(text)
+        counts = {}
+        for _, _, canonical in spans:
+            counts[canonical] = counts.get(canonical, 0) + 1
+        return {'found': set(counts), 'counts': counts, 'spans': spans}
+
+    def find(self, text):
+        """Set of canonical names present in the text"""
+        return {canonical for _, _, canonical in self.scan(text)}
+
+    def counts(self, text):
+        """Occurrences per canonical name"""
+        return self.analyze(text)['counts']
+
+    def save(self, path, source_sha256=None):
+        """Pickle the compiled lexicon (written atomically)"""
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'source_sha256': source_sha256,
+            'name': self.name,
+            'canonical': self.canonical,
+            'phrases': self._phrases,
+            'max_tokens': self._max_tokens,
+        }
+
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        atomic_write(path, write)
+
+    @classmethod
+    def load(cls, path, source_sha256=None):
+        """
+        Load a pickled lexicon
+
+        Only load snapshots this application wrote itself; pickle files can
+        execute code.
+
+        Raises:
+            ValueError: If the snapshot has another layout version or was
+                built from a different source file
+        """
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Lexicon snapshot {path} has an unsupported version")
+        if source_sha256 is not None and snapshot.get('source_sha256') != source_sha256:
+            raise ValueError(f"Lexicon snapshot {path} was built from a different source file")
+
+        lexicon = cls({}, name=snapshot['name'])
+        lexicon.canonical = snapshot['canonical']
+        lexicon._canonical_index = {name: i for i, name in enumerate(lexicon.canonical)}
+        lexicon._phrases = snapshot['phrases']
+        lexicon._max_tokens = snapshot['max_tokens']
+        return lexicon
+
+
+def read_lexicon_entries(path):
+    """
+    Read (canonical, synonym) pairs from a dictionary file
+
+    Supported formats:
+        .json: object mapping canonical name -> list of synonyms
+        anything else: one 'canonical<TAB>synonym[<TAB>synonym...]' row per
+            line; blank lines and lines starting with '#' are ignored
+    """
+    path = Path(path)
+
+    if path.suffix.lower() == '.json':
+        with open(path, encoding='utf-8') as f:
+            loaded = json.load(f)
+        for canonical, synonyms in loaded.items():
+            yield canonical, canonical
+            for synonym in ([synonyms] if isinstance(synonyms, str) else synonyms):
+                yield canonical, synonym
+        return
+
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split('\t')]
+            canonical = fields[0]
+            yield canonical, canonical
+            for synonym in fields[1:]:
+                if synonym:
+                    yield canonical, synonym
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def lexicon_snapshot_path(path, source_sha256, cache_dir=None):
+    """Snapshot file for a dictionary file with the given checksum"""
+    return cache_artifact_path('lexicons', path, source_sha256, '.pkl', cache_dir)
+
+
+def load_lexicon(path, cache_dir=None, use_cache=True, name=None):
+    """
+    Load a lexicon from a dictionary file, using the compiled snapshot if present
+
+    Args:
+        path: JSON or TSV dictionary file (see read_lexicon_entries)
+        cache_dir: Directory for compiled snapshots (defaults to the user cache)
+        use_cache: Read and write the snapshot
+        name: Optional label (defaults to the file name)
+
+    Returns:
+        Lexicon
+    """
+    source_sha256 = _file_sha256(path)
+    snapshot_path = lexicon_snapshot_path(path, source_sha256, cache_dir)
+
+    if use_cache and snapshot_path.exists():
+        try:
+            return Lexicon.load(snapshot_path, source_sha256)
+        except Exception as e:
+            print(f"Warning: Rebuilding unreadable lexicon snapshot {snapshot_path}: {e}")
+
+    lexicon = Lexicon(read_lexicon_entries(path), name=name or Path(path).name)
+    if use_cache:
+        lexicon.save(snapshot_path, source_sha256)
+    return lexicon
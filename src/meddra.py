@@ -0,0 +1,500 @@
+"""
+Compact, indexed MedDRA hierarchy
+
+Reads a local MedDRA ASCII distribution (the '$'-delimited MedAscii files)
+into array-backed tables with integer row IDs:
+
+    LLT -> PT -> HLT -> HLGT -> SOC   (primary SOC path)
+
+Names are stored as one UTF-8 blob per table plus an offsets array, and
+lookups go through open-addressing hash indexes that are themselves plain
+arrays. Everything is saved as .npy files, so a snapshot is memory-mapped at
+startup instead of parsed; only the pages that lookups touch are read.
+
+Lookups:
+    lookup('Hearing loss')           exact name, then normalized name
+    lookup_code(10011878)            LLT code
+    find_terms('sudden hearing loss after cisplatin')
+                                     leftmost-longest LLT matches in free text
+
+Usage:
+    meddra = load_meddra('/data/meddra_27_0_english/MedAscii')
+    meddra.lookup('hearing loss')['pt_name']
+
+    python -m src.meddra --ascii-dir /data/meddra_27_0_english/MedAscii "hearing loss"
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from .paths import atomic_write, cache_artifact_path
+
+
+# Bump when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+# Files of the ASCII distribution this loader reads
+LLT_FILE = 'llt.asc'
+HIERARCHY_FILE = 'mdhier.asc'
+
+MANIFEST_FILENAME = 'manifest.json'
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def normalize_term(term):
+    """Lowercase, keep word tokens only, single-space separated"""
+    return ' '.join(_TOKEN_RE.findall(term.lower()))
+
+
+def _hash(key_bytes):
+    return zlib.crc32(key_bytes)
+
+
+class StringTable:
+    """
+    Immutable list of strings stored as one UTF-8 blob plus offsets
+
+    Args:
+        blob: uint8 array with the concatenated encoded strings
+        offsets: int64 array of length n + 1
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def raw(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, i):
+        return self.raw(i).decode('utf-8')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class HashIndex:
+    """
+    Open-addressing string -> int32 index backed by arrays
+
+    Args:
+        keys: StringTable of the indexed keys
+        values: int32 array, value per key
+        slots: int32 array (power-of-two length) of key positions, -1 if empty
+    """
+
+    def __init__(self, keys, values, slots):
+        self.keys = keys
+        self.values = values
+        self.slots = slots
+        self._mask = len(slots) - 1
+
+    @classmethod
+    def build(cls, pairs):
+        """Build from (key, value) pairs; the first value of a repeated key wins"""
+        unique = {}
+        for key, value in pairs:
+            unique.setdefault(key, value)
+
+        size = 1
+        while size < 2 * max(len(unique), 1):
+            size *= 2
+        slots = np.full(size, -1, dtype=np.int32)
+        mask = size - 1
+
+        keys = list(unique)
+        for position, key in enumerate(keys):
+            h = _hash(key.encode('utf-8')) & mask
+            while slots[h] != -1:
+                h = (h + 1) & mask
+            slots[h] = position
+
+        values = np.array([unique[key] for key in keys], dtype=np.int32)
+        return cls(StringTable.from_strings(keys), values, slots)
+
+    def get(self, key, default=None):
+        key_bytes = key.encode('utf-8')
+        h = _hash(key_bytes) & self._mask
+        while True:
+            position = int(self.slots[h])
+            if position == -1:
+                return default
+            if self.keys.raw(position) == key_bytes:
+                return int(self.values[position])
+            h = (h + 1) & self._mask
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _read_asc(path):
+    """Rows of a '$'-delimited MedDRA ASCII file"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line.split('$')
+
+
+def _source_files(ascii_dir):
+    ascii_dir = Path(ascii_dir)
+    files = []
+    for name in (LLT_FILE, HIERARCHY_FILE):
+        path = ascii_dir / name
+        if not path.exists():
+            raise FileNotFoundError(f"MedDRA file {name} not found in {ascii_dir}")
+        files.append(path)
+    return files
+
+
+def _code_rows(codes, wanted):
+    """Row of each wanted code in a sorted code array (-1 if absent)"""
+    wanted = np.asarray(wanted, dtype=np.int32)
+    if len(codes) == 0:
+        return np.full(len(wanted), -1, dtype=np.int32)
+    found = np.minimum(np.searchsorted(codes, wanted), len(codes) - 1)
+    return np.where(codes[found] == wanted, found, -1).astype(np.int32)
+
+
+def source_checksum(ascii_dir):
+    """SHA-256 over the ASCII files the dictionary is built from"""
+    digest = hashlib.sha256()
+    for path in _source_files(ascii_dir):
+        digest.update(path.name.encode('utf-8'))
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class MedDRADictionary:
+    """
+    MedDRA terms and their primary hierarchy path
+
+    Row IDs are positions in the per-level tables; code arrays are sorted,
+    so codes resolve to rows with a binary search. Build with from_ascii()
+    or load_snapshot() rather than directly.
+    """
+
+    # Array and string-table names that make up a snapshot
+    ARRAYS = (
+        'llt_code', 'llt_pt', 'llt_current',
+        'pt_code', 'pt_hlt', 'pt_hlgt', 'pt_soc',
+        'hlt_code', 'hlgt_code', 'soc_code',
+    )
+    STRINGS = ('llt_name', 'pt_name', 'hlt_name', 'hlgt_name', 'soc_name', 'soc_abbrev')
+    INDEXES = ('exact_index', 'normalized_index', 'first_token_index')
+
+    def __init__(self, tables, manifest=None):
+        self.manifest = manifest or {}
+        for name, value in tables.items():
+            setattr(self, name, value)
+
+    # Building
+
+    @classmethod
+    def from_ascii(cls, ascii_dir):
+        """
+        Parse llt.asc and mdhier.asc of an ASCII distribution
+
+        Only the primary SOC path of each PT is kept.
+        """
+        llt_path, hierarchy_path = _source_files(ascii_dir)
+
+        # pt_code, hlt_code, hlgt_code, soc_code, pt_name, hlt_name, hlgt_name,
+        # soc_name, soc_abbrev, null_field, pt_soc_code, primary_soc_fg
+        pts, hlts, hlgts, socs = {}, {}, {}, {}
+        for row in _read_asc(hierarchy_path):
+            if len(row) < 12:
+                continue
+            pt, hlt, hlgt, soc = (int(code) for code in row[:4])
+            hlts.setdefault(hlt, row[5])
+            hlgts.setdefault(hlgt, row[6])
+            socs.setdefault(soc, (row[7], row[8]))
+            if row[11] == 'Y' or pt not in pts:
+                pts[pt] = (row[4], hlt, hlgt, soc)
+
+        # llt_code, llt_name, pt_code, ..., llt_currency (10th field)
+        llts = {}
+        for row in _read_asc(llt_path):
+            if len(row) < 3:
+                continue
+            current = len(row) < 10 or row[9] != 'N'
+            llts[int(row[0])] = (row[1], int(row[2]), current)
+
+        pt_codes = np.array(sorted(pts), dtype=np.int32)
+        hlt_codes = np.array(sorted(hlts), dtype=np.int32)
+        hlgt_codes = np.array(sorted(hlgts), dtype=np.int32)
+        soc_codes = np.array(sorted(socs), dtype=np.int32)
+        llt_codes = np.array(sorted(llts), dtype=np.int32)
+
+        pt_info = [pts[code] for code in pt_codes.tolist()]
+        llt_info = [llts[code] for code in llt_codes.tolist()]
+        llt_names = [name for name, _, _ in llt_info]
+
+        tables = {
+            'llt_code': llt_codes,
+            'llt_pt': _code_rows(pt_codes, [pt for _, pt, _ in llt_info]),
+            'llt_current': np.array([current for _, _, current in llt_info], dtype=np.uint8),
+            'pt_code': pt_codes,
+            'pt_hlt': _code_rows(hlt_codes, [info[1] for info in pt_info]),
+            'pt_hlgt': _code_rows(hlgt_codes, [info[2] for info in pt_info]),
+            'pt_soc': _code_rows(soc_codes, [info[3] for info in pt_info]),
+            'hlt_code': hlt_codes,
+            'hlgt_code': hlgt_codes,
+            'soc_code': soc_codes,
+            'llt_name': StringTable.from_strings(llt_names),
+            'pt_name': StringTable.from_strings([info[0] for info in pt_info]),
+            'hlt_name': StringTable.from_strings([hlts[code] for code in hlt_codes.tolist()]),
+            'hlgt_name': StringTable.from_strings([hlgts[code] for code in hlgt_codes.tolist()]),
+            'soc_name': StringTable.from_strings([socs[code][0] for code in soc_codes.tolist()]),
+            'soc_abbrev': StringTable.from_strings([socs[code][1] for code in soc_codes.tolist()]),
+        }
+
+        # Current LLTs take precedence when several normalize to the same key
+        order = sorted(range(len(llt_names)), key=lambda row: not llt_info[row][2])
+        normalized = {row: normalize_term(llt_names[row]) for row in order}
+        tables['exact_index'] = HashIndex.build((llt_names[row], row) for row in order)
+        tables['normalized_index'] = HashIndex.build((normalized[row], row) for row in order if normalized[row])
+
+        longest = {}
+        for key in normalized.values():
+            tokens = key.split(' ')
+            if key and len(tokens) > longest.get(tokens[0], 0):
+                longest[tokens[0]] = len(tokens)
+        tables['first_token_index'] = HashIndex.build(longest.items())
+
+        manifest = {
+            'version': SNAPSHOT_VERSION,
+            'llt_count': len(llt_codes),
+            'pt_count': len(pt_codes),
+            'soc_count': len(soc_codes),
+        }
+        return cls(tables, manifest)
+
+    # Snapshots
+
+    def save_snapshot(self, path, source_sha256=None):
+        """
+        Write the tables as .npy files into a snapshot directory
+
+        The directory is written under a temporary name and renamed into
+        place, so readers never see a partial snapshot.
+        """
+        atomic_write(path, lambda tmp_path: self._write_snapshot(tmp_path, source_sha256))
+
+    def _write_snapshot(self, tmp_path, source_sha256):
+        tmp_path.mkdir()
+        for name in self.ARRAYS:
+            np.save(tmp_path / f'{name}.npy', getattr(self, name))
+        for name in self.STRINGS:
+            table = getattr(self, name)
+            np.save(tmp_path / f'{name}.blob.npy', table.blob)
+            np.save(tmp_path / f'{name}.offsets.npy', table.offsets)
+        for name in self.INDEXES:
+            index = getattr(self, name)
+            np.save(tmp_path / f'{name}.keys.blob.npy', index.keys.blob)
+            np.save(tmp_path / f'{name}.keys.offsets.npy', index.keys.offsets)
+            np.save(tmp_path / f'{name}.values.npy', index.values)
+            np.save(tmp_path / f'{name}.slots.npy', index.slots)
+
+        manifest = dict(self.manifest, version=SNAPSHOT_VERSION, source_sha256=source_sha256)
+        with open(tmp_path / MANIFEST_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load_snapshot(cls, path, source_sha256=None):
+        """
+        Memory-map a snapshot directory
+
+        Raises:
+            ValueError: If the snapshot has another layout version or was
+                built from different source files
+        """
+        path = Path(path)
+        with open(path / MANIFEST_FILENAME, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"MedDRA snapshot {path} has an unsupported version")
+        if source_sha256 is not None and manifest.get('source_sha256') != source_sha256:
+            raise ValueError(f"MedDRA snapshot {path} was built from different source files")
+
+        def array(name):
+            return np.load(path / f'{name}.npy', mmap_mode='r')
+
+        tables = {name: array(name) for name in cls.ARRAYS}
+        for name in cls.STRINGS:
+            tables[name] = StringTable(array(f'{name}.blob'), array(f'{name}.offsets'))
+        for name in cls.INDEXES:
+            keys = StringTable(array(f'{name}.keys.blob'), array(f'{name}.keys.offsets'))
+            tables[name] = HashIndex(keys, array(f'{name}.values'), array(f'{name}.slots'))
+        return cls(tables, manifest)
+
+    # Lookups
+
+    def __len__(self):
+        """Number of LLTs"""
+        return len(self.llt_code)
+
+    def roll_up(self, llt_row):
+        """
+        LLT row -> dict with the LLT and its PT, HLT, HLGT and SOC
+
+        Levels that are missing from the distribution are None.
+        """
+        llt_row = int(llt_row)
+        record = {
+            'llt_code': int(self.llt_code[llt_row]),
+            'llt_name': self.llt_name[llt_row],
+            'llt_current': bool(self.llt_current[llt_row]),
+            'pt_code': None, 'pt_name': None,
+            'hlt_code': None, 'hlt_name': None,
+            'hlgt_code': None, 'hlgt_name': None,
+            'soc_code': None, 'soc_name': None, 'soc_abbrev': None,
+        }
+
+        pt = int(self.llt_pt[llt_row])
+        if pt < 0:
+            return record
+        record['pt_code'] = int(self.pt_code[pt])
+        record['pt_name'] = self.pt_name[pt]
+
+        hlt, hlgt, soc = int(self.pt_hlt[pt]), int(self.pt_hlgt[pt]), int(self.pt_soc[pt])
+        if hlt >= 0:
+            record['hlt_code'] = int(self.hlt_code[hlt])
+            record['hlt_name'] = self.hlt_name[hlt]
+        if hlgt >= 0:
+            record['hlgt_code'] = int(self.hlgt_code[hlgt])
+            record['hlgt_name'] = self.hlgt_name[hlgt]
+        if soc >= 0:
+            record['soc_code'] = int(self.soc_code[soc])
+            record['soc_name'] = self.soc_name[soc]
+            record['soc_abbrev'] = self.soc_abbrev[soc]
+        return record
+
+    def lookup(self, term, normalize=True):
+        """
+        Look up a term by exact LLT name, then by normalized name
+
+        Returns:
+            Rolled-up record (see roll_up) or None
+        """
+        row = self.exact_index.get(term.strip())
+        if row is None and normalize:
+            row = self.normalized_index.get(normalize_term(term))
+        return None if row is None else self.roll_up(row)
+
+    def lookup_code(self, llt_code):
+        """Rolled-up record for an LLT code, or None"""
+        row = int(np.searchsorted(self.llt_code, llt_code))
+        if row < len(self.llt_code) and int(self.llt_code[row]) == int(llt_code):
+            return self.roll_up(row)
+        return None
+
+    def find_terms(self, text):
+        """
+        Find LLTs in free text, leftmost-longest on word-token boundaries
+
+        Returns:
+            List of (start, end, record) with character offsets into text
+        """
+        tokens = [(m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text.lower())]
+        words = [token for token, _, _ in tokens]
+
+        hits = []
+        i = 0
+        while i < len(words):
+            longest = self.first_token_index.get(words[i])
+            if longest is None:
+                i += 1
+                continue
+
+            for size in range(min(longest, len(words) - i), 0, -1):
+                row = self.normalized_index.get(' '.join(words[i:i + size]))
+                if row is not None:
+                    hits.append((tokens[i][1], tokens[i + size - 1][2], self.roll_up(row)))
+                    i += size
+                    break
+            else:
+                i += 1
+        return hits
+
+    def best_match(self, text):
+        """Record for the term itself, else the longest LLT found inside it, else None"""
+        record = self.lookup(text)
+        if record is not None:
+            return record
+
+        hits = self.find_terms(text)
+        if not hits:
+            return None
+        return max(hits, key=lambda hit: hit[1] - hit[0])[2]
+
+
+def meddra_snapshot_path(source_sha256, cache_dir=None):
+    """Snapshot directory for ASCII files with the given checksum"""
+    return cache_artifact_path('meddra', 'meddra', source_sha256, '', cache_dir)
+
+
+def load_meddra(ascii_dir, cache_dir=None, use_cache=True):
+    """
+    Load a MedDRA ASCII distribution, memory-mapping the snapshot if present
+
+    Args:
+        ascii_dir: Directory with llt.asc and mdhier.asc
+        cache_dir: Directory for snapshots (defaults to the user cache)
+        use_cache: Read and write the snapshot
+
+    Returns:
+        MedDRADictionary
+    """
+    source_sha256 = source_checksum(ascii_dir)
+    snapshot_path = meddra_snapshot_path(source_sha256, cache_dir)
+
+    if use_cache and (snapshot_path / MANIFEST_FILENAME).exists():
+        try:
+            return MedDRADictionary.load_snapshot(snapshot_path, source_sha256)
+        except Exception as e:
+            print(f"Warning: Rebuilding unreadable MedDRA snapshot {snapshot_path}: {e}")
+
+    dictionary = MedDRADictionary.from_ascii(ascii_dir)
+    if use_cache:
+        dictionary.save_snapshot(snapshot_path, source_sha256)
+        return MedDRADictionary.load_snapshot(snapshot_path, source_sha256)
+    return dictionary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the MedDRA snapshot and look up terms")
+    parser.add_argument('--ascii-dir', required=True, help="MedAscii directory of a MedDRA release")
+    parser.add_argument('--cache-dir', default=None)
+    parser.add_argument('terms', nargs='*', help="Terms to look up")
+    args = parser.parse_args()
+
+    meddra = load_meddra(args.ascii_dir, cache_dir=args.cache_dir)
+    print(f"? MedDRA loaded: {len(meddra)} LLTs")
+    for term in args.terms:
+        print(json.dumps({'term': term, 'match': meddra.best_match(term)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
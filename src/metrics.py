@@ -0,0 +1,375 @@
+"""
+Per-stage timing of the classification pipeline and pluggable metrics sinks
+
+Pipeline code marks its stages (PDF extraction, sentence splitting, marker
+detection, preprocessing, tokenization, forward pass, post-processing, ...)
+with the StageTimings of the running operation:
+
+    timings = current_timings()
+    with timings.stage('tokenize', items=len(texts)):
+        ...
+
+Stage times are exclusive: time spent in a nested stage (e.g. PDF extraction
+pulled lazily while splitting sentences) is charged to the nested stage only,
+so the stages of an operation add up to its total. CPU time is the process
+CPU time, which includes torch's worker threads.
+
+When nothing collects timings and the metrics sink is the default no-op,
+current_timings() returns a shared null object whose stages do nothing.
+
+Sinks receive one record per stage per top-level operation:
+
+    NullMetricsSink         default, discards everything
+    InMemoryMetricsSink     running totals per stage (snapshot())
+    PrometheusMetricsSink   totals plus histograms in the Prometheus text format
+
+Usage:
+    sink = PrometheusMetricsSink()
+    set_metrics_sink(sink)
+    results = classify_causality(text, collect_timings=True)
+    print(results['timings']['stages']['forward'])
+    print(sink.exposition())
+"""
+
+import contextvars
+import threading
+import time
+
+
+class NullMetricsSink:
+    """Discards all records (the default sink)"""
+
+    enabled = False
+
+    def record(self, stage, wall_seconds, cpu_seconds, items=0, calls=1):
+        pass
+
+
+class InMemoryMetricsSink:
+    """
+    Running totals per stage
+
+    Thread-safe; snapshot() returns calls, items, wall and CPU seconds and
+    the min/max wall time of a single operation per stage.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self.operations = 0
+
+    def record(self, stage, wall_seconds, cpu_seconds, items=0, calls=1):
+        with self._lock:
+            totals = self._stages.get(stage)
+            if totals is None:
+                totals = self._stages[stage] = {
+                    'operations': 0, 'calls': 0, 'items': 0,
+                    'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                    'min_wall_seconds': wall_seconds, 'max_wall_seconds': wall_seconds,
+                }
+            totals['operations'] += 1
+            totals['calls'] += calls
+            totals['items'] += items
+            totals['wall_seconds'] += wall_seconds
+            totals['cpu_seconds'] += cpu_seconds
+            totals['min_wall_seconds'] = min(totals['min_wall_seconds'], wall_seconds)
+            totals['max_wall_seconds'] = max(totals['max_wall_seconds'], wall_seconds)
+            self._observe(stage, wall_seconds)
+
+    def _observe(self, stage, wall_seconds):
+        pass
+
+    def snapshot(self):
+        """Copy of the per-stage totals"""
+        with self._lock:
+            return {stage: dict(totals) for stage, totals in self._stages.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+# Upper bounds (seconds) of the per-operation stage time histogram
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class PrometheusMetricsSink(InMemoryMetricsSink):
+    """
+    Stage totals and per-operation histograms in the Prometheus text format
+
+    Args:
+        namespace: Metric name prefix
+        buckets: Histogram bucket upper bounds in seconds
+    """
+
+    def __init__(self, namespace='drug_causality', buckets=DEFAULT_BUCKETS):
+        super().__init__()
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._histograms = {}
+
+    def _observe(self, stage, wall_seconds):
+        # Called with the lock held
+        counts = self._histograms.get(stage)
+        if counts is None:
+            counts = self._histograms[stage] = [0] * len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if wall_seconds <= bound:
+                counts[i] += 1
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._histograms.clear()
+
+    def exposition(self):
+        """Metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            stages = {stage: dict(totals) for stage, totals in self._stages.items()}
+            histograms = {stage: list(counts) for stage, counts in self._histograms.items()}
+
+        ns = self.namespace
+        counters = [
+            ('stage_wall_seconds_total', 'wall_seconds', 'Wall time spent in each pipeline stage'),
+            ('stage_cpu_seconds_total', 'cpu_seconds', 'Process CPU time spent in each pipeline stage'),
+            ('stage_items_total', 'items', 'Items (pages, sentences, texts) processed by each stage'),
+            ('stage_calls_total', 'calls', 'Times each stage was entered'),
+        ]
+
+        lines = []
+        for name, key, help_text in counters:
+            lines.append(f"# HELP {ns}_{name} {help_text}")
+            lines.append(f"# TYPE {ns}_{name} counter")
+            for stage in sorted(stages):
+                lines.append(f'{ns}_{name}{{stage="{_escape_label(stage)}"}} {_format_value(stages[stage][key])}')
+
+        name = f"{ns}_stage_operation_seconds"
+        lines.append(f"# HELP {name} Wall time of a stage within one operation")
+        lines.append(f"# TYPE {name} histogram")
+        for stage in sorted(stages):
+            label = _escape_label(stage)
+            for bound, count in zip(self.buckets, histograms.get(stage, [])):
+                lines.append(f'{name}_bucket{{stage="{label}",le="{_format_value(bound)}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{label}",le="+Inf"}} {stages[stage]["operations"]}')
+            lines.append(f'{name}_sum{{stage="{label}"}} {_format_value(stages[stage]["wall_seconds"])}')
+            lines.append(f'{name}_count{{stage="{label}"}} {stages[stage]["operations"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+_sink = NullMetricsSink()
+
+
+def get_metrics_sink():
+    """Process-wide metrics sink"""
+    return _sink
+
+
+def set_metrics_sink(sink):
+    """
+    Replace the process-wide metrics sink
+
+    Args:
+        sink: Object with record(stage, wall_seconds, cpu_seconds, items, calls)
+            and an `enabled` attribute; None restores the no-op sink
+
+    Returns:
+        The previous sink
+    """
+    global _sink
+    previous = _sink
+    _sink = sink if sink is not None else NullMetricsSink()
+    return previous
+
+
+class _Stage:
+    __slots__ = ('timings', 'name', 'items', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, timings, name, items):
+        self.timings = timings
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.timings._stack.append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        stack = self.timings._stack
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.timings.add(self.name, wall - self.child_wall, cpu - self.child_cpu, self.items)
+        return False
+
+
+class StageTimings:
+    """
+    Exclusive wall/CPU time and item counts per stage for one operation
+
+    Args:
+        sink: Receives the totals on flush() (None keeps them local)
+    """
+
+    enabled = True
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.stages = {}
+        self._stack = []
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def stage(self, name, items=0):
+        """Context manager timing one stage; set .items on it if only known at the end"""
+        return _Stage(self, name, items)
+
+    def iter_stage(self, name, iterable):
+        """Yield from iterable, charging the time of each next() to a stage (one item per value)"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name, items=1) as stage:
+                try:
+                    value = next(iterator)
+                except StopIteration:
+                    stage.items = 0
+                    return
+            yield value
+
+    def add(self, name, wall_seconds, cpu_seconds, items=0):
+        totals = self.stages.get(name)
+        if totals is None:
+            self.stages[name] = {'wall_seconds': wall_seconds, 'cpu_seconds': cpu_seconds, 'items': items, 'calls': 1}
+        else:
+            totals['wall_seconds'] += wall_seconds
+            totals['cpu_seconds'] += cpu_seconds
+            totals['items'] += items
+            totals['calls'] += 1
+
+    def as_dict(self):
+        """Per-stage totals plus the operation's overall wall and CPU time so far"""
+        return {
+            'stages': {name: dict(totals) for name, totals in self.stages.items()},
+            'total_wall_seconds': time.perf_counter() - self._wall_start,
+            'total_cpu_seconds': time.process_time() - self._cpu_start,
+        }
+
+    def flush(self):
+        """Send the totals to the sink"""
+        if self.sink is None or not self.sink.enabled:
+            return
+        for name, totals in self.stages.items():
+            self.sink.record(name, totals['wall_seconds'], totals['cpu_seconds'], totals['items'], totals['calls'])
+
+
+class _NullStage:
+    __slots__ = ()
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _NullTimings:
+    """Stand-in when timing is off: every stage is a shared no-op"""
+
+    enabled = False
+    stages = {}
+
+    def stage(self, name, items=0):
+        return _NULL_STAGE
+
+    def iter_stage(self, name, iterable):
+        return iterable
+
+    def add(self, name, wall_seconds, cpu_seconds, items=0):
+        pass
+
+    def as_dict(self):
+        return None
+
+    def flush(self):
+        pass
+
+
+NULL_TIMINGS = _NullTimings()
+
+_current_timings = contextvars.ContextVar('drug_causality_stage_timings', default=None)
+
+
+def current_timings():
+    """StageTimings of the running operation, or the no-op NULL_TIMINGS"""
+    return _current_timings.get() or NULL_TIMINGS
+
+
+class timed_operation:
+    """
+    Scope of one pipeline call
+
+    Inside an operation that is already timed, the running StageTimings is
+    reused so nested calls (process_pdf_file -> classify_causality ->
+    predict_batch) add to the same totals. Otherwise a new StageTimings is
+    started if `collect` is true or a metrics sink is enabled, and flushed to
+    the sink when the outermost operation ends. In every other case this
+    yields NULL_TIMINGS.
+
+    Example:
+        with timed_operation(collect_timings) as timings:
+            ...
+            if collect_timings:
+                results['timings'] = timings.as_dict()
+    """
+
+    __slots__ = ('collect', 'timings', 'token')
+
+    def __init__(self, collect=False):
+        self.collect = collect
+        self.token = None
+
+    def __enter__(self):
+        active = _current_timings.get()
+        if active is not None:
+            self.timings = active
+            return active
+
+        sink = _sink
+        if not (self.collect or sink.enabled):
+            self.timings = NULL_TIMINGS
+            return NULL_TIMINGS
+
+        self.timings = StageTimings(sink)
+        self.token = _current_timings.set(self.timings)
+        return self.timings
+
+    def __exit__(self, *exc):
+        if self.token is not None:
+            _current_timings.reset(self.token)
+            self.token = None
+            self.timings.flush()
+        return False
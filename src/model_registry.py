@@ -0,0 +1,321 @@
+"""
+Process-wide model registry for the causality classifier
+
+Loading BioBERT means reading the tokenizer and ~110M parameters from disk
+(or the Hugging Face hub). The registry loads each model variant once per
+process and hands the same tokenizer/model pair to every CausalityClassifier
+that asks for it, so creating a classifier per document or per PDF is cheap.
+
+Entries are keyed by (model_path, revision, dtype, backend). An optional
+memory budget evicts the least recently used variants when several are
+resident at the same time.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+DEFAULT_BACKEND = 'torch'
+DEFAULT_DTYPE = 'float32'
+
+# 'onnx' runs an exported graph on ONNX Runtime (see src/onnx_backend.py)
+SUPPORTED_BACKENDS = ('torch', 'onnx')
+# 'int8' means dynamic INT8 quantization of the Linear layers (CPU only)
+SUPPORTED_DTYPES = ('float32', 'float16', 'bfloat16', 'int8')
+
+# Optional memory budget (in MB) for the default registry
+MEMORY_BUDGET_ENV = 'DRUG_CAUSALITY_MODEL_MEMORY_MB'
+
+
+class LoadedModel:
+    """
+    A tokenizer/model pair held by the registry
+
+    Attributes:
+        key: Registry key (model_path, revision, dtype, backend)
+        tokenizer: Hugging Face tokenizer
+        model: Model in eval mode
+        nbytes: Estimated resident size of the model weights
+    """
+
+    def __init__(self, key, tokenizer, model, nbytes):
+        self.key = key
+        self.tokenizer = tokenizer
+        self.model = model
+        self.nbytes = nbytes
+
+
+def estimate_model_bytes(model):
+    """
+    Estimate resident memory of a torch model from its state dict
+
+    Uses the state dict rather than parameters() so that packed weights of
+    quantized layers are counted too.
+    """
+    import torch
+
+    total = 0
+    seen = set()
+    pending = list(model.state_dict().values())
+    while pending:
+        value = pending.pop()
+        if isinstance(value, (tuple, list)):
+            pending.extend(value)
+        elif isinstance(value, torch.Tensor) and id(value) not in seen:
+            seen.add(id(value))
+            total += value.numel() * value.element_size()
+    return total
+
+
+# Weight files that identify a model revision, in order of preference
+WEIGHT_FILE_PATTERNS = ('*.safetensors', 'pytorch_model*.bin')
+# Config and tokenizer files fetched along with the weights
+MODEL_CONFIG_FILE_PATTERNS = ('*.json', '*.txt', '*.model')
+
+_fingerprint_cache = {}
+
+
+def _weight_files(model_dir):
+    """Weight files of the preferred format present in a model directory"""
+    for pattern in WEIGHT_FILE_PATTERNS:
+        files = sorted(Path(model_dir).glob(pattern))
+        if files:
+            return files
+    return []
+
+
+def resolve_model_dir(model_path, revision=None):
+    """
+    Return the local directory holding a model's files
+
+    Local directories are returned as-is. Hugging Face model ids resolve to
+    their snapshot in the local hub cache without contacting the hub when it
+    already holds the weights (e.g. after from_pretrained); otherwise only
+    the config, tokenizer and one weight format are downloaded.
+    """
+    path = Path(model_path)
+    if path.is_dir():
+        return path
+
+    from huggingface_hub import snapshot_download
+    from huggingface_hub.utils import LocalEntryNotFoundError
+
+    try:
+        model_dir = Path(snapshot_download(repo_id=str(model_path), revision=revision, local_files_only=True))
+        if _weight_files(model_dir):
+            return model_dir
+    except LocalEntryNotFoundError:
+        pass
+
+    for weights in WEIGHT_FILE_PATTERNS:
+        model_dir = Path(snapshot_download(
+            repo_id=str(model_path), revision=revision,
+            allow_patterns=[*MODEL_CONFIG_FILE_PATTERNS, weights]
+        ))
+        if any(model_dir.glob(weights)):
+            break
+    return model_dir
+
+
+def model_fingerprint(model_dir):
+    """
+    SHA-256 over a model's weight files and config
+
+    Identifies exactly which weights a derived artifact (quantized model,
+    ONNX export) was built from. Memoized per process on file size and mtime.
+    """
+    model_dir = Path(model_dir)
+    files = _weight_files(model_dir)
+    if not files:
+        raise FileNotFoundError(f"No model weights found in {model_dir}")
+    files.append(model_dir / 'config.json')
+
+    stamp = tuple((str(f), f.stat().st_size, f.stat().st_mtime_ns) for f in files)
+    if stamp in _fingerprint_cache:
+        return _fingerprint_cache[stamp]
+
+    digest = hashlib.sha256()
+    for f in files:
+        digest.update(f.name.encode('utf-8'))
+        with open(f, 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+
+    _fingerprint_cache[stamp] = digest.hexdigest()
+    return _fingerprint_cache[stamp]
+
+
+def _load_torch_model(model_path, revision, dtype):
+    """Load tokenizer and model for the PyTorch backend"""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path, revision=revision)
+
+    if dtype == 'int8':
+        from .quantization import load_quantized_model
+        model = load_quantized_model(model_path, revision=revision)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_path, revision=revision)
+        if dtype != DEFAULT_DTYPE:
+            model = model.to(getattr(torch, dtype))
+
+    model.eval()
+    return tokenizer, model, estimate_model_bytes(model)
+
+
+def _load_onnx_model(model_path, revision):
+    """Load tokenizer and ONNX Runtime session for the ONNX backend (no torch)"""
+    from .onnx_backend import load_onnx_model
+
+    tokenizer, session = load_onnx_model(model_path, revision=revision)
+    return tokenizer, session, session.nbytes
+
+
+class ModelRegistry:
+    """
+    Loads each model variant once and shares it across classifiers
+
+    Args:
+        memory_budget_bytes: Optional cap on the estimated size of all resident
+            models. When a new model pushes the total over the cap, the least
+            recently used variants are dropped from the registry. The most
+            recently loaded model is always kept, even if it alone exceeds
+            the budget.
+
+    Evicting a model only releases the registry's reference; classifiers that
+    still hold it keep working until they are garbage collected.
+    """
+
+    def __init__(self, memory_budget_bytes=None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_path, revision=None, dtype=DEFAULT_DTYPE, backend=DEFAULT_BACKEND):
+        """Normalize arguments into a registry key"""
+        if backend not in SUPPORTED_BACKENDS:
+            raise ValueError(f"Unsupported backend '{backend}'. Choose from: {', '.join(SUPPORTED_BACKENDS)}")
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}'. Choose from: {', '.join(SUPPORTED_DTYPES)}")
+        if backend == 'onnx' and dtype != DEFAULT_DTYPE:
+            raise ValueError("The onnx backend only serves float32 exports")
+        return (str(model_path), revision, dtype, backend)
+
+    def get(self, model_path, revision=None, dtype=DEFAULT_DTYPE, backend=DEFAULT_BACKEND):
+        """
+        Return the shared LoadedModel for a variant, loading it on first use
+
+        Args:
+            model_path: Local directory or Hugging Face model id
+            revision: Optional hub revision (branch, tag or commit hash)
+            dtype: Weight dtype name
+            backend: Inference backend name
+
+        Returns:
+            LoadedModel
+        """
+        key = self.make_key(model_path, revision, dtype, backend)
+
+        with self._lock:
+            loaded = self._models.get(key)
+            if loaded is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return loaded
+
+            if backend == 'onnx':
+                tokenizer, model, nbytes = _load_onnx_model(key[0], revision)
+            else:
+                tokenizer, model, nbytes = _load_torch_model(key[0], revision, dtype)
+            loaded = LoadedModel(key, tokenizer, model, nbytes)
+            self._models[key] = loaded
+            self.loads += 1
+
+            self._enforce_budget()
+            return loaded
+
+    def _enforce_budget(self):
+        """Drop least recently used models until the budget is met"""
+        if self.memory_budget_bytes is None:
+            return
+
+        while len(self._models) > 1 and self.resident_bytes() > self.memory_budget_bytes:
+            self._models.popitem(last=False)
+            self.evictions += 1
+
+    def resident_bytes(self):
+        """Estimated size of all models currently held by the registry"""
+        with self._lock:
+            return sum(loaded.nbytes for loaded in self._models.values())
+
+    def evict(self, model_path, revision=None, dtype=DEFAULT_DTYPE, backend=DEFAULT_BACKEND):
+        """Drop one variant from the registry. Returns True if it was resident."""
+        key = self.make_key(model_path, revision, dtype, backend)
+        with self._lock:
+            return self._models.pop(key, None) is not None
+
+    def clear(self):
+        """Drop every resident model"""
+        with self._lock:
+            self._models.clear()
+
+    def keys(self):
+        """Resident keys, least recently used first"""
+        with self._lock:
+            return list(self._models.keys())
+
+    def stats(self):
+        """Registry counters and resident models"""
+        with self._lock:
+            return {
+                'resident_models': len(self._models),
+                'resident_bytes': self.resident_bytes(),
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'loads': self.loads,
+                'hits': self.hits,
+                'evictions': self.evictions,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+
+def _budget_from_env():
+    value = os.environ.get(MEMORY_BUDGET_ENV)
+    if not value:
+        return None
+    return int(float(value) * 1024 * 1024)
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """Return the process-wide registry, creating it on first use"""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry(memory_budget_bytes=_budget_from_env())
+        return _default_registry
+
+
+def set_memory_budget(memory_budget_bytes):
+    """Set (or remove with None) the memory budget of the process-wide registry"""
+    registry = get_model_registry()
+    with registry._lock:
+        registry.memory_budget_bytes = memory_budget_bytes
+        registry._enforce_budget()
@@ -0,0 +1,281 @@
+"""
+ONNX Runtime export and inference backend
+
+Exports the BertForSequenceClassification model to ONNX and runs it on an
+ONNX Runtime CPU session. Serving workers that only need inference can use
+this backend without importing torch or transformers: tokenization goes
+through the `tokenizers` library directly from tokenizer.json.
+
+The export is written next to the model (<model_dir>/onnx/) together with
+onnx_metadata.json, which records the model revision and the fingerprint of
+the weights it came from. Loading validates both the ONNX file checksum and,
+when the source weights are present, that they still match the export.
+
+Usage:
+    # One-off export (needs torch)
+    python -m src.onnx_backend --model-path models/production_model_final
+
+    # Inference (no torch needed)
+    classifier = CausalityClassifier('models/production_model_final', backend='onnx')
+"""
+
+import argparse
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from .model_registry import WEIGHT_FILE_PATTERNS, model_fingerprint, resolve_model_dir
+from .paths import atomic_write
+
+
+ONNX_SUBDIR = 'onnx'
+ONNX_FILENAME = 'model.onnx'
+METADATA_FILENAME = 'onnx_metadata.json'
+
+DEFAULT_OPSET = 17
+DEFAULT_MAX_LENGTH = 96
+
+INPUT_NAMES = ('input_ids', 'attention_mask', 'token_type_ids')
+
+
+def default_onnx_dir(model_dir):
+    """Directory holding the ONNX export of a model"""
+    return Path(model_dir) / ONNX_SUBDIR
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _has_weights(model_dir):
+    return any(any(Path(model_dir).glob(pattern)) for pattern in WEIGHT_FILE_PATTERNS)
+
+
+def export_onnx(
+    model_path='PrashantRGore/drug-causality-bert-v2-model',
+    output_dir=None,
+    revision=None,
+    max_length=DEFAULT_MAX_LENGTH,
+    opset=DEFAULT_OPSET
+):
+    """
+    Export a sequence classification model to ONNX
+
+    Batch size and sequence length are dynamic axes, so the exported graph
+    works with the dynamically padded chunks of predict_batch.
+
+    Args:
+        model_path: Local model directory or Hugging Face model id
+        output_dir: Where to write model.onnx and onnx_metadata.json
+            (defaults to <model_dir>/onnx)
+        revision: Optional hub revision
+        max_length: Maximum sequence length the export is meant for
+        opset: ONNX opset version
+
+    Returns:
+        Path to the exported model.onnx
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    model_dir = resolve_model_dir(model_path, revision)
+    output_dir = Path(output_dir) if output_dir else default_onnx_dir(model_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+
+    sample = tokenizer(
+        ["Hearing loss secondary to bortezomib.", "Neuropathy following paclitaxel administration."],
+        return_tensors='pt',
+        truncation=True,
+        padding=True,
+        max_length=max_length
+    )
+    args = tuple(sample[name] for name in INPUT_NAMES)
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in INPUT_NAMES}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    onnx_path = output_dir / ONNX_FILENAME
+    export_kwargs = dict(
+        input_names=list(INPUT_NAMES),
+        output_names=['logits'],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset,
+    )
+
+    def write(tmp_path):
+        with torch.no_grad():
+            try:
+                # TorchScript-based exporter; handles dynamic_axes directly
+                torch.onnx.export(model, args, str(tmp_path), dynamo=False, **export_kwargs)
+            except TypeError:
+                # torch < 2.5 has no dynamo switch
+                torch.onnx.export(model, args, str(tmp_path), **export_kwargs)
+
+    atomic_write(onnx_path, write)
+
+    metadata = {
+        'model_path': str(model_path),
+        'revision': revision or getattr(model.config, '_commit_hash', None),
+        'source_fingerprint': model_fingerprint(model_dir),
+        'onnx_sha256': _file_sha256(onnx_path),
+        'max_length': max_length,
+        'opset': opset,
+        'input_names': list(INPUT_NAMES),
+        'exported_at': datetime.now().isoformat(),
+    }
+    with open(output_dir / METADATA_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+
+    return onnx_path
+
+
+class OnnxTokenizer:
+    """
+    Minimal batch tokenizer on top of `tokenizers`, producing NumPy inputs
+
+    Matches the Hugging Face fast tokenizer for the call pattern used by
+    CausalityClassifier: truncation to max_length and padding to the longest
+    text in the batch.
+    """
+
+    def __init__(self, model_dir):
+        from tokenizers import Tokenizer
+
+        self._tokenizer = Tokenizer.from_file(str(Path(model_dir) / 'tokenizer.json'))
+        self._tokenizer.no_padding()
+        self._tokenizer.no_truncation()
+        self._max_length = None
+
+        pad_token = '[PAD]'
+        pad_id = self._tokenizer.token_to_id(pad_token)
+        self._pad_id = 0 if pad_id is None else pad_id
+        self._pad_token = pad_token
+
+    def __call__(self, texts, max_length=DEFAULT_MAX_LENGTH):
+        if isinstance(texts, str):
+            texts = [texts]
+
+        if max_length != self._max_length:
+            self._tokenizer.enable_truncation(max_length=max_length)
+            self._max_length = max_length
+        self._tokenizer.enable_padding(pad_id=self._pad_id, pad_token=self._pad_token)
+
+        encodings = self._tokenizer.encode_batch(list(texts))
+        return {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+
+
+class OnnxSequenceClassifier:
+    """
+    ONNX Runtime CPU session for an exported classifier
+
+    Args:
+        onnx_dir: Directory with model.onnx and onnx_metadata.json
+        source_model_dir: Directory with the weights the export came from;
+            checked against the recorded fingerprint when weights are present
+        validate: Verify the ONNX checksum and source fingerprint on load
+        intra_op_threads: Optional ONNX Runtime intra-op thread count
+
+    Raises:
+        FileNotFoundError: If the export is missing
+        ValueError: If the export does not match its metadata or the weights
+    """
+
+    def __init__(self, onnx_dir, source_model_dir=None, validate=True, intra_op_threads=None):
+        import onnxruntime as ort
+
+        self.onnx_dir = Path(onnx_dir)
+        self.onnx_path = self.onnx_dir / ONNX_FILENAME
+        metadata_path = self.onnx_dir / METADATA_FILENAME
+
+        if not self.onnx_path.exists() or not metadata_path.exists():
+            raise FileNotFoundError(f"No ONNX export found in {self.onnx_dir}")
+
+        with open(metadata_path, encoding='utf-8') as f:
+            self.metadata = json.load(f)
+
+        if validate:
+            self._validate(source_model_dir)
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            str(self.onnx_path), sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.nbytes = self.onnx_path.stat().st_size
+
+    def _validate(self, source_model_dir):
+        if _file_sha256(self.onnx_path) != self.metadata.get('onnx_sha256'):
+            raise ValueError(f"ONNX file {self.onnx_path} does not match its recorded checksum; re-export it")
+
+        if source_model_dir is not None and _has_weights(source_model_dir):
+            if model_fingerprint(source_model_dir) != self.metadata.get('source_fingerprint'):
+                raise ValueError(
+                    f"ONNX export in {self.onnx_dir} was built from different weights than "
+                    f"{source_model_dir}; re-export with: python -m src.onnx_backend --model-path {source_model_dir}"
+                )
+
+    def __call__(self, inputs):
+        """Run the session on tokenized inputs and return logits as a NumPy array"""
+        feed = {name: inputs[name] for name in self.input_names}
+        return self.session.run(['logits'], feed)[0]
+
+
+def load_onnx_model(model_path, revision=None, onnx_dir=None, validate=True):
+    """
+    Load tokenizer and ONNX session for a model
+
+    Args:
+        model_path: Local model directory or Hugging Face model id
+        revision: Optional hub revision
+        onnx_dir: Directory of the export (defaults to <model_dir>/onnx)
+        validate: Verify checksum and source fingerprint
+
+    Returns:
+        (OnnxTokenizer, OnnxSequenceClassifier)
+    """
+    model_dir = resolve_model_dir(model_path, revision)
+    onnx_dir = Path(onnx_dir) if onnx_dir else default_onnx_dir(model_dir)
+
+    # Thread count of the CPU profile this process runs under, if any
+    from .cpu_profile import active_cpu_profile
+    applied = active_cpu_profile()
+    intra_op_threads = applied['intra_op_threads'] if applied else None
+
+    tokenizer = OnnxTokenizer(model_dir)
+    session = OnnxSequenceClassifier(
+        onnx_dir, source_model_dir=model_dir, validate=validate, intra_op_threads=intra_op_threads
+    )
+    return tokenizer, session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the causality classifier to ONNX")
+    parser.add_argument('--model-path', default='PrashantRGore/drug-causality-bert-v2-model')
+    parser.add_argument('--revision', default=None)
+    parser.add_argument('--output-dir', default=None, help="Defaults to <model_dir>/onnx")
+    parser.add_argument('--max-length', type=int, default=DEFAULT_MAX_LENGTH)
+    parser.add_argument('--opset', type=int, default=DEFAULT_OPSET)
+    args = parser.parse_args()
+
+    onnx_path = export_onnx(args.model_path, args.output_dir, args.revision, args.max_length, args.opset)
+    print(f"? ONNX model exported: {onnx_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Location of the on-disk caches
+
+Converted models, extracted PDF text, lexicon and MedDRA snapshots, early
+exit heads, FAERS responses and the FAERS store all live under one root
+directory, ~/.cache/drug-causality unless DRUG_CAUSALITY_CACHE_DIR is set.
+Every artifact is written with atomic_write, so processes sharing the cache
+never read a partial file or directory.
+"""
+
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+
+CACHE_DIR_ENV = 'DRUG_CAUSALITY_CACHE_DIR'
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'drug-causality'
+
+
+def get_cache_dir():
+    """Root directory for cached artifacts"""
+    return Path(os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR))
+
+
+def cache_artifact_path(kind, model_path, fingerprint, suffix, cache_dir=None):
+    """
+    Cache path of an artifact derived from a model or source file
+
+    Args:
+        kind: Subdirectory of the cache root (e.g. 'quantized')
+        model_path: Model directory, hub id or source file the artifact was
+            built from; its last path component names the artifact
+        fingerprint: Hex digest identifying exactly what it was built from
+        suffix: Appended to the name, e.g. '-int8.pt'
+        cache_dir: Directory to use instead of <cache root>/<kind>
+
+    Returns:
+        Path '<cache_dir>/<name>-<fingerprint[:16]><suffix>'
+    """
+    cache_dir = Path(cache_dir) if cache_dir else get_cache_dir() / kind
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', Path(str(model_path)).name or str(model_path))
+    return cache_dir / f"{safe_name}-{fingerprint[:16]}{suffix}"
+
+
+def _remove(path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def atomic_write(path, writer):
+    """
+    Create a file or directory under a temporary name and move it into place
+
+    Args:
+        path: Final file or directory path (parent directories are created)
+        writer: Callable(tmp_path) that writes the file or directory at
+            tmp_path; tmp_path sits next to path and keeps its suffix, so
+            e.g. np.save does not append another '.npy'
+
+    Returns:
+        path
+
+    A directory replaces an existing one at path. On error the temporary
+    file or directory is removed and the exception propagates.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{path.suffix}")
+    _remove(tmp_path)
+
+    try:
+        writer(tmp_path)
+        if tmp_path.is_dir() and path.is_dir():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    return path
@@ -0,0 +1,221 @@
+"""
+Content-addressed on-disk cache of extracted PDF text
+
+Uploads of the same PDF (Streamlit reruns, repeated batch sweeps, threshold
+changes) reuse the page texts extracted the first time. Entries are keyed by
+the SHA-256 of the file bytes plus the extractor version, so renamed or
+re-uploaded copies hit the same entry and a new extractor never reads stale
+text. Page texts are stored zlib-compressed; the least recently used entries
+are evicted once the cache exceeds its size budget.
+
+The cache is off by default because the stored text is patient case report
+content: set DRUG_CAUSALITY_PDF_CACHE_MB to a size budget, or pass
+enable=True to get_pdf_text_cache(), to turn it on.
+
+Usage:
+    cache = get_pdf_text_cache(enable=True)
+    pages = list(iter_pdf_pages(uploaded_file, cache=cache))
+    print(cache.stats())
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+
+from .paths import atomic_write, get_cache_dir
+
+
+# Size budget of the default cache in MB; setting it turns the cache on (0 disables it)
+PDF_CACHE_MB_ENV = 'DRUG_CAUSALITY_PDF_CACHE_MB'
+DEFAULT_PDF_CACHE_MB = 512
+
+ENTRY_SUFFIX = '.pages.z'
+
+# Eviction frees space down to this fraction of the budget, so a full cache
+# is not re-listed on every write
+EVICT_TO_FRACTION = 0.9
+
+
+def pdf_cache_key(data, extractor_version):
+    """Hash of the file bytes and the extractor that produced the text"""
+    digest = hashlib.sha256(data)
+    digest.update(b'\x00')
+    digest.update(extractor_version.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PdfTextCache:
+    """
+    Size-bounded directory of compressed page texts
+
+    Args:
+        cache_dir: Directory holding the entries
+        max_bytes: Budget for the compressed entries on disk; least recently
+            used entries are removed after a write pushes the total over it
+            (down to EVICT_TO_FRACTION of the budget)
+
+    Safe to share between processes: entries are written atomically and
+    a missing or unreadable entry is treated as a miss. The directory is
+    listed once when the cache is opened; after that writes keep a running
+    total and only a write that exceeds the budget lists it again.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_PDF_CACHE_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def get(self, key):
+        """
+        Cached pages for a key
+
+        Returns:
+            List of (text, error) pairs in page order, or None
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                pages = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return [(text, error) for text, error in pages]
+
+    def put(self, key, pages):
+        """
+        Store page texts
+
+        Args:
+            key: pdf_cache_key() of the file
+            pages: Iterable of (text, error) pairs in page order
+        """
+        payload = zlib.compress(json.dumps([list(page) for page in pages]).encode('utf-8'))
+        path = self._path(key)
+        try:
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+
+        atomic_write(path, lambda tmp_path: tmp_path.write_bytes(payload))
+
+        with self._lock:
+            self.writes += 1
+            self._total_bytes += len(payload) - replaced
+            over_budget = self.max_bytes is not None and self._total_bytes > self.max_bytes
+        if over_budget:
+            self._enforce_budget()
+
+    def _entries(self):
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for path in self.cache_dir.glob(f'*/*{ENTRY_SUFFIX}'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _enforce_budget(self):
+        """Remove least recently used entries until the total is back below the budget"""
+        # Re-list the directory: other processes may have written or evicted
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TO_FRACTION if total > self.max_bytes else total
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self.evictions += evicted
+            self._total_bytes = total
+
+    def size_bytes(self):
+        """Compressed size of all entries on disk"""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """Remove every entry"""
+        for _, _, path in self._entries():
+            try:
+                path.unlink()
+            except OSError:
+                pass
+        with self._lock:
+            self._total_bytes = 0
+
+    def stats(self):
+        """Hit/miss counters of this process and the size on disk"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                'lookups': lookups,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
+        counters['size_bytes'] = self.size_bytes()
+        counters['max_bytes'] = self.max_bytes
+        return counters
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_pdf_text_cache(enable=False):
+    """
+    Return the process-wide cache under the user cache directory
+
+    Args:
+        enable: Use the cache with the default budget even if
+            DRUG_CAUSALITY_PDF_CACHE_MB is unset
+
+    Returns None unless the cache is enabled, or if
+    DRUG_CAUSALITY_PDF_CACHE_MB is set to 0.
+    """
+    global _default_cache
+
+    budget = os.environ.get(PDF_CACHE_MB_ENV)
+    if budget:
+        budget_mb = float(budget)
+    elif enable:
+        budget_mb = DEFAULT_PDF_CACHE_MB
+    else:
+        return None
+    if budget_mb <= 0:
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PdfTextCache(get_cache_dir() / 'pdf_text', max_bytes=int(budget_mb * 1024 * 1024))
+        return _default_cache
@@ -0,0 +1,205 @@
+"""
+Streaming, optionally page-parallel PDF text extraction
+
+iter_pdf_pages() yields one PdfPage per page, in page order, as soon as it
+is extracted, so sentence splitting and classification can start on the
+first pages of a long regulatory PDF. For big files the pages can be
+extracted by a pool of worker processes; results are still yielded in
+order. A page that fails to extract is reported with its error and empty
+text instead of failing the whole document. Pass a PdfTextCache (see
+src/pdf_cache.py) to reuse text extracted from identical files.
+
+Usage:
+    for page in iter_pdf_pages('psur.pdf', workers=4):
+        if page.error:
+            print(f"page {page.number}: {page.error}")
+        ...
+
+    text = ''.join(iter_pdf_texts('case_report.pdf'))
+"""
+
+import io
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .pdf_cache import pdf_cache_key
+
+
+# Bump when extraction output can change (used to key cached text)
+EXTRACTOR_VERSION = 'pypdf2-pages-1'
+
+# Pages per task handed to a worker process
+PAGES_PER_TASK = 8
+
+# Below this many pages a process pool costs more than it saves
+MIN_PAGES_FOR_PARALLEL = 32
+
+
+PdfPage = namedtuple('PdfPage', ['number', 'text', 'error'])
+PdfPage.__doc__ = """Text of one PDF page (number is 1-based; error is None or a message)"""
+
+
+def read_pdf_bytes(source):
+    """
+    Raw bytes of a PDF given as a path, bytes or a binary file-like object
+
+    File-like objects (e.g. Streamlit uploads) are read from the start and
+    rewound afterwards.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+
+    if hasattr(source, 'read'):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        data = source.read()
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return data
+
+    path = Path(source)
+    if not path.exists():
+        raise FileNotFoundError(f"PDF file not found: {source}")
+    return path.read_bytes()
+
+
+def _open_reader(data):
+    import PyPDF2
+    return PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_page(reader, index):
+    try:
+        return PdfPage(index + 1, reader.pages[index].extract_text() or '', None)
+    except Exception as e:
+        return PdfPage(index + 1, '', f"{type(e).__name__}: {e}")
+
+
+# Reader opened once per worker process by _init_page_worker
+_worker_reader = None
+
+
+def _init_page_worker(data):
+    global _worker_reader
+    _worker_reader = _open_reader(data)
+
+
+def _extract_page_range(start, stop):
+    return [_extract_page(_worker_reader, index) for index in range(start, stop)]
+
+
+def count_pdf_pages(source):
+    """Number of pages of a PDF"""
+    return len(_open_reader(read_pdf_bytes(source)).pages)
+
+
+def iter_pdf_pages(source, workers=1, min_pages_for_parallel=MIN_PAGES_FOR_PARALLEL, cache=None):
+    """
+    Yield the pages of a PDF in order
+
+    Args:
+        source: Path, bytes or binary file-like object
+        workers: Number of worker processes; 1 extracts in this process
+        min_pages_for_parallel: Documents with fewer pages are always
+            extracted in this process
+        cache: Optional PdfTextCache. Hits skip extraction; a document is
+            stored once it has been extracted completely without page errors.
+            A failed cache write only prints a warning.
+
+    Yields:
+        PdfPage(number, text, error)
+
+    Raises:
+        FileNotFoundError: If a path does not exist
+        Exception: If the document itself cannot be opened
+    """
+    data = read_pdf_bytes(source)
+    if cache is None:
+        yield from _extract_pages(data, workers, min_pages_for_parallel)
+        return
+
+    key = pdf_cache_key(data, EXTRACTOR_VERSION)
+    cached = cache.get(key)
+    if cached is not None:
+        for number, (text, error) in enumerate(cached, 1):
+            yield PdfPage(number, text, error)
+        return
+
+    pages = []
+    for page in _extract_pages(data, workers, min_pages_for_parallel):
+        pages.append((page.text, page.error))
+        yield page
+
+    # Page errors may be transient (e.g. a crashed worker), so don't keep them
+    if all(error is None for _, error in pages):
+        try:
+            cache.put(key, pages)
+        except OSError as e:
+            print(f"Warning: Could not write PDF text cache {cache.cache_dir}: {e}")
+
+
+def _extract_pages(data, workers, min_pages_for_parallel):
+    try:
+        reader = _open_reader(data)
+        page_count = len(reader.pages)
+    except Exception as e:
+        raise Exception(f"Error extracting PDF: {e}")
+
+    workers = min(workers or 1, os.cpu_count() or 1)
+    if workers <= 1 or page_count < min_pages_for_parallel:
+        for index in range(page_count):
+            yield _extract_page(reader, index)
+        return
+
+    # Spawn so workers never inherit torch's thread pools from the parent
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_page_worker,
+        initargs=(data,)
+    ) as executor:
+        futures = [
+            executor.submit(_extract_page_range, start, min(start + PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PAGES_PER_TASK)
+        ]
+        try:
+            for start, future in zip(range(0, page_count, PAGES_PER_TASK), futures):
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    # A crashed task only loses its own pages
+                    error = f"{type(e).__name__}: {e}"
+                    pages = [
+                        PdfPage(index + 1, '', error)
+                        for index in range(start, min(start + PAGES_PER_TASK, page_count))
+                    ]
+                yield from pages
+        finally:
+            # Consumer stopped early: don't extract the remaining pages
+            for future in futures:
+                future.cancel()
+
+
+def iter_pdf_texts(source, workers=1, on_error=None, cache=None):
+    """
+    Yield page texts only, e.g. as the document for classify_causality
+
+    Args:
+        source: Path, bytes or binary file-like object
+        workers: Number of extraction worker processes
+        on_error: Optional callable(PdfPage) for pages that failed
+        cache: Optional PdfTextCache
+    """
+    for page in iter_pdf_pages(source, workers=workers, cache=cache):
+        if page.error and on_error is not None:
+            on_error(page)
+        yield page.text
+
+
+def extract_pdf_pages(source, workers=1, cache=None):
+    """List of PdfPage for a whole document"""
+    return list(iter_pdf_pages(source, workers=workers, cache=cache))
@@ -0,0 +1,194 @@
+"""
+Dynamic INT8 quantization for CPU inference
+
+Converts the Linear layers of the BioBERT classifier to dynamically quantized
+INT8 (weights stored as int8, activations quantized on the fly). On CPU this
+roughly halves latency and cuts weight memory by ~4x for the encoder layers.
+
+The quantized state dict is cached on disk after the first conversion, keyed
+by the fingerprint of the fp32 weights it came from and the torch and
+transformers versions, so later processes build the quantized module tree
+from the config and load the INT8 weights directly instead of loading fp32
+weights and quantizing again. Only tensors are stored (no pickled modules),
+and they are read back with weights_only=True.
+
+Usage:
+    classifier = CausalityClassifier(model_path, quantization='int8')
+
+    # Compare INT8 against fp32 on a sample set
+    python -m src.quantization --model-path models/production_model_final
+"""
+
+import argparse
+import hashlib
+import json
+
+import numpy as np
+
+from .model_registry import model_fingerprint, resolve_model_dir
+from .paths import atomic_write, cache_artifact_path
+
+
+SUPPORTED_QUANTIZATION = ('int8',)
+
+# Sample sentences for the fp32/INT8 agreement check
+AGREEMENT_SAMPLE_TEXTS = [
+    "Patient developed hearing loss after taking bortezomib.",
+    "Hearing loss secondary to bortezomib is a very rare side effect.",
+    "Neuropathy following paclitaxel administration.",
+    "Cardiotoxicity is a known side effect of doxorubicin.",
+    "Acute kidney injury was attributed to cisplatin-induced nephrotoxicity.",
+    "Methotrexate was discontinued after the patient developed hepatotoxicity.",
+    "Thrombocytopenia possibly related to rituximab resolved after dechallenge.",
+    "Rhabdomyolysis associated with simvastatin was confirmed by elevated CK.",
+    "Patient has a history of diabetes and hypertension.",
+    "Takes metformin daily for type 2 diabetes.",
+    "The patient was discharged in stable condition.",
+    "Blood pressure was controlled with metoprolol throughout the admission.",
+    "No adverse events were reported during the study period.",
+    "The tumour responded to four cycles of chemotherapy.",
+    "Renal function remained within normal limits.",
+    "She was referred to audiology for routine screening.",
+]
+
+
+def quantize_dynamic_int8(model):
+    """Return a copy of a torch model with Linear layers dynamically quantized to INT8"""
+    import torch
+
+    quantize_dynamic = getattr(torch.ao.quantization, 'quantize_dynamic', None) or torch.quantization.quantize_dynamic
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantized_cache_key(fingerprint):
+    """Fingerprint of the fp32 weights combined with the torch and transformers versions"""
+    import torch
+    import transformers
+
+    payload = f"{fingerprint}:torch-{torch.__version__}:transformers-{transformers.__version__}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def quantized_cache_path(model_path, fingerprint, cache_dir=None):
+    """Cache file for the INT8 state dict of a model with the given weight fingerprint"""
+    return cache_artifact_path('quantized', model_path, quantized_cache_key(fingerprint), '-int8.pt', cache_dir)
+
+
+def load_quantized_model(model_path, revision=None, cache_dir=None, use_cache=True):
+    """
+    Load the dynamic INT8 variant of a model, converting it on first use
+
+    Args:
+        model_path: Local model directory or Hugging Face model id
+        revision: Optional hub revision
+        cache_dir: Directory for cached conversions (defaults to the user cache)
+        use_cache: Read and write the on-disk cache
+
+    Returns:
+        Quantized torch model in eval mode
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForSequenceClassification
+
+    model_dir = resolve_model_dir(model_path, revision)
+    cache_path = quantized_cache_path(model_path, model_fingerprint(model_dir), cache_dir)
+
+    if use_cache and cache_path.exists():
+        try:
+            state_dict = torch.load(cache_path, map_location='cpu', weights_only=True)
+            model = AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(model_dir))
+            model.eval()
+            quantized = quantize_dynamic_int8(model)
+            quantized.load_state_dict(state_dict)
+            quantized.eval()
+            return quantized
+        except Exception as e:
+            print(f"Warning: Rebuilding unreadable quantized model cache {cache_path}: {e}")
+
+    model = AutoModelForSequenceClassification.from_pretrained(model_dir)
+    model.eval()
+    quantized = quantize_dynamic_int8(model)
+    quantized.eval()
+
+    if use_cache:
+        atomic_write(cache_path, lambda tmp_path: torch.save(quantized.state_dict(), tmp_path))
+
+    return quantized
+
+
+def quantization_agreement(
+    model_path='PrashantRGore/drug-causality-bert-v2-model',
+    texts=None,
+    threshold=0.5,
+    use_preprocessing=True,
+    enhance_score=True,
+    revision=None
+):
+    """
+    Compare INT8 predictions against fp32 on a sample set
+
+    Args:
+        model_path: Path to trained model
+        texts: Sample sentences (defaults to AGREEMENT_SAMPLE_TEXTS)
+        threshold: Classification threshold
+        use_preprocessing: Apply medical terminology preprocessing
+        enhance_score: Apply marker-based score enhancement
+        revision: Optional model revision
+
+    Returns:
+        dict with label flips, flip rate and drift of P(related)
+    """
+    from .inference import CausalityClassifier
+
+    texts = list(texts or AGREEMENT_SAMPLE_TEXTS)
+    fp32 = CausalityClassifier(model_path, threshold, use_preprocessing, revision=revision)
+    int8 = CausalityClassifier(model_path, threshold, use_preprocessing, revision=revision, quantization='int8')
+
+    fp32_results = fp32.predict_batch(texts, return_probs=True, enhance_score=enhance_score)
+    int8_results = int8.predict_batch(texts, return_probs=True, enhance_score=enhance_score)
+
+    fp32_probs = np.array([r['probabilities']['related'] for r in fp32_results])
+    int8_probs = np.array([r['probabilities']['related'] for r in int8_results])
+    drift = np.abs(int8_probs - fp32_probs)
+
+    flips = []
+    for i, (a, b) in enumerate(zip(fp32_results, int8_results)):
+        if a['label'] != b['label']:
+            flips.append({
+                'text': texts[i],
+                'fp32_prediction': a['prediction'],
+                'int8_prediction': b['prediction'],
+                'fp32_probability_related': a['probabilities']['related'],
+                'int8_probability_related': b['probabilities']['related'],
+            })
+
+    return {
+        'samples': len(texts),
+        'label_flips': len(flips),
+        'flip_rate': len(flips) / len(texts) if texts else 0,
+        'max_probability_drift': float(drift.max()) if texts else 0.0,
+        'mean_probability_drift': float(drift.mean()) if texts else 0.0,
+        'threshold_used': threshold,
+        'flipped_samples': flips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check INT8 vs fp32 agreement of the causality classifier")
+    parser.add_argument('--model-path', default='PrashantRGore/drug-causality-bert-v2-model')
+    parser.add_argument('--revision', default=None)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--samples', help="Text file with one sample sentence per line")
+    args = parser.parse_args()
+
+    texts = None
+    if args.samples:
+        with open(args.samples, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    report = quantization_agreement(args.model_path, texts, threshold=args.threshold, revision=args.revision)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
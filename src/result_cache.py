@@ -0,0 +1,190 @@
+"""
+Two-tier cache of raw classifier logits
+
+Literature PDFs and periodic reports repeat a lot of boilerplate sentences,
+and the same articles are re-run whenever thresholds change. The cache keeps
+the model's raw logits per sentence:
+
+- tier 1: bounded in-memory LRU
+- tier 2: persistent SQLite store that survives restarts (optional)
+
+Keys hash (preprocessed text, model revision, max_length, preprocessing flag).
+Thresholds and score enhancement are applied after lookup, so cached entries
+stay valid when those settings change.
+
+Usage:
+    cache = LogitCache(db_path='~/.cache/drug-causality/logits.sqlite3')
+    classifier = CausalityClassifier(model_path, cache=cache)
+    ...
+    print(cache.stats())
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+
+class LogitCache:
+    """
+    In-memory LRU in front of an optional SQLite store
+
+    Args:
+        max_memory_entries: Capacity of the in-memory LRU tier
+        db_path: SQLite file for the persistent tier (None keeps the cache
+            in memory only)
+
+    Logits are stored as float32 bytes, so a cache hit returns exactly the
+    values the model produced.
+    """
+
+    def __init__(self, max_memory_entries=100_000, db_path=None):
+        self.max_memory_entries = max_memory_entries
+        self.db_path = Path(db_path).expanduser() if db_path else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        if self.db_path is not None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS logits ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL)'
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(input_text, model_revision, max_length, use_preprocessing):
+        """Hash of everything that determines the logits of one text"""
+        digest = hashlib.sha256()
+        for part in (model_revision, str(max_length), '1' if use_preprocessing else '0', input_text):
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        Look up logits for several keys
+
+        Returns:
+            dict mapping each found key to a float32 array of logits
+        """
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                value = self._memory.get(key)
+                if value is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = value
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            if self._db is not None and missing:
+                # Stay well below SQLite's bound-parameter limit
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    rows = self._db.execute(
+                        f'SELECT key, value FROM logits WHERE key IN ({placeholders})', chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        value = np.frombuffer(blob, dtype=np.float32)
+                        found[key] = value
+                        self._remember(key, value)
+                        self.disk_hits += 1
+
+            self.misses += sum(1 for key in missing if key not in found)
+
+        return found
+
+    def put_many(self, items):
+        """
+        Store logits
+
+        Args:
+            items: Iterable of (key, logits) pairs
+        """
+        rows = []
+        with self._lock:
+            for key, logits in items:
+                value = np.ascontiguousarray(logits, dtype=np.float32)
+                self._remember(key, value)
+                rows.append((key, value.tobytes(), time.time()))
+            self.writes += len(rows)
+
+            if self._db is not None and rows:
+                self._db.executemany('INSERT OR REPLACE INTO logits (key, value, created) VALUES (?, ?, ?)', rows)
+                self._db.commit()
+
+    def stats(self):
+        """Hit-rate statistics per tier"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                'lookups': lookups,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_hit_rate': self.memory_hits / lookups if lookups else 0.0,
+                'disk_hit_rate': self.disk_hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'memory_entries': len(self._memory),
+                'memory_capacity': self.max_memory_entries,
+                'persistent': self._db is not None,
+            }
+
+    def reset_stats(self):
+        """Zero the hit/miss counters"""
+        with self._lock:
+            self.memory_hits = self.disk_hits = self.misses = self.writes = 0
+
+    def clear(self):
+        """Drop every cached entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM logits')
+                self._db.commit()
+
+    def disable_persistent(self, reason):
+        """
+        Stop using the persistent tier for the rest of the session
+
+        Used when cache keys cannot identify the model weights, so entries
+        written by other weights could otherwise be served from disk.
+        """
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.close()
+            self._db = None
+        print(f"Warning: Persistent logit cache disabled: {reason}")
+
+    def close(self):
+        """Close the persistent store"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
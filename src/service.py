@@ -0,0 +1,487 @@
+"""
+Asyncio HTTP inference service with dynamic micro-batching
+
+A dependency-free (stdlib asyncio) HTTP/1.1 server around CausalityClassifier.
+Concurrent requests are coalesced by a MicroBatcher: texts wait in a queue
+until either max_batch_size texts are pending or the oldest has waited
+max_wait_ms, then the whole batch goes through one predict_batch call on a
+worker thread. A text that is already queued or being scored is not queued
+again; its callers share the pending result.
+
+Endpoints:
+    POST /v1/classify            {"text": "..."}
+    POST /v1/classify/batch      {"texts": ["...", ...]}
+    POST /v1/classify/document   {"text": "...", "top_k": 10}
+    GET  /v1/stats               batching efficiency and queue depth
+    GET  /health
+    GET  /metrics                per-stage timings, Prometheus text format (with --metrics)
+
+With a CPU profile of several replicas (--cpu-profile or
+DRUG_CAUSALITY_CPU_PROFILE, see src/cpu_profile.py), one server process per
+replica is started on the same port (SO_REUSEPORT), each pinned to its own
+cores; the kernel spreads connections across them.
+
+Usage:
+    python -m src.service --model-path models/production_model_final --port 8080
+    python -m src.service --cpu-profile replicas=2,intra=8,inter=1,pin=1
+
+    curl -s localhost:8080/v1/classify -d '{"text": "Hearing loss secondary to bortezomib."}'
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+
+from .cpu_profile import active_cpu_profile, apply_cpu_profile, get_cpu_profile, parse_cpu_profile
+from .inference import CausalityAggregate, CausalityClassifier, CausalityStream, iter_document_sentences
+from .metrics import PrometheusMetricsSink, get_metrics_sink, set_metrics_sink
+
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Largest request body accepted (whole documents are sent as text)
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predictions into batches
+
+    Args:
+        classifier: CausalityClassifier used for every batch
+        max_batch_size: Most texts per predict_batch call
+        max_wait_ms: Longest time the first text of a batch waits for more
+
+    Batches run one at a time on a dedicated thread, so the event loop keeps
+    accepting requests (and filling the next batch) during a forward pass.
+    """
+
+    def __init__(self, classifier, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.classifier = classifier
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = None
+        self._in_flight = {}
+        self._worker = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='micro-batcher')
+
+        self.texts_submitted = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_queue_depth = 0
+        self.total_queue_wait = 0.0
+        self.total_model_seconds = 0.0
+        self.batch_size_histogram = {}
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        self._executor.shutdown(wait=True)
+
+    def submit(self, text):
+        """Future for the predict_batch result of one text"""
+        self.texts_submitted += 1
+
+        future = self._in_flight.get(text)
+        if future is not None:
+            self.deduplicated += 1
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[text] = future
+        self._queue.put_nowait((text, future, time.perf_counter()))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    async def predict(self, text):
+        # Shield: one cancelled caller must not cancel a result others share
+        return await asyncio.shield(self.submit(text))
+
+    async def predict_many(self, texts):
+        return await asyncio.gather(*(self.predict(text) for text in texts))
+
+    async def _collect(self):
+        """Wait for one text, then gather more until the batch is full or max_wait passes"""
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Anything that is already queued rides along without waiting
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            texts = [text for text, _, _ in batch]
+            started = time.perf_counter()
+
+            try:
+                results = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self.classifier.predict_batch(texts, return_probs=True, batch_size=self.max_batch_size)
+                )
+                error = None
+            except Exception as e:
+                results, error = None, e
+
+            finished = time.perf_counter()
+            self.batches += 1
+            self.batched_texts += len(batch)
+            self.total_model_seconds += finished - started
+            self.batch_size_histogram[len(batch)] = self.batch_size_histogram.get(len(batch), 0) + 1
+
+            for i, (text, future, queued_at) in enumerate(batch):
+                self.total_queue_wait += started - queued_at
+                self._in_flight.pop(text, None)
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(results[i])
+
+    def stats(self):
+        """Batching efficiency and queue depth"""
+        batches = self.batches
+        return {
+            'texts_submitted': self.texts_submitted,
+            'deduplicated': self.deduplicated,
+            'dedup_rate': self.deduplicated / self.texts_submitted if self.texts_submitted else 0.0,
+            'batches': batches,
+            'batched_texts': self.batched_texts,
+            'mean_batch_size': self.batched_texts / batches if batches else 0.0,
+            'batch_fill_ratio': self.batched_texts / (batches * self.max_batch_size) if batches else 0.0,
+            'batch_size_histogram': {str(k): v for k, v in sorted(self.batch_size_histogram.items())},
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight_texts': len(self._in_flight),
+            'mean_queue_wait_ms': 1000 * self.total_queue_wait / self.batched_texts if self.batched_texts else 0.0,
+            'mean_batch_model_ms': 1000 * self.total_model_seconds / batches if batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class InferenceService:
+    """
+    HTTP front end over a MicroBatcher
+
+    Args:
+        classifier: CausalityClassifier to serve
+        max_batch_size: Most texts per forward pass
+        max_wait_ms: Longest a text waits for its batch to fill
+    """
+
+    def __init__(self, classifier, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.classifier = classifier
+        self.batcher = MicroBatcher(classifier, max_batch_size, max_wait_ms)
+        self.started_at = None
+        self.requests = 0
+        self.errors = 0
+        self._server = None
+
+        self.routes = {
+            ('POST', '/v1/classify'): self.handle_classify,
+            ('POST', '/v1/classify/batch'): self.handle_batch,
+            ('POST', '/v1/classify/document'): self.handle_document,
+            ('GET', '/v1/stats'): self.handle_stats,
+            ('GET', '/health'): self.handle_health,
+            ('GET', '/metrics'): self.handle_metrics,
+        }
+
+    # Handlers
+
+    async def handle_classify(self, body):
+        text = body.get('text')
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'text' must be a non-empty string")
+        return await self.batcher.predict(text)
+
+    async def handle_batch(self, body):
+        texts = body.get('texts')
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'texts' must be a list of strings")
+        return {'results': await self.batcher.predict_many(texts)}
+
+    async def handle_document(self, body):
+        text = body.get('text')
+        if not isinstance(text, str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'text' must be a string")
+        top_k = body.get('top_k', 10)
+        if not isinstance(top_k, int) or top_k < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'top_k' must be a non-negative integer")
+
+        start_time = datetime.now()
+        aggregate = CausalityAggregate(top_k=top_k)
+        sentences = list(iter_document_sentences(text))
+
+        eligible = [
+            (index, sent) for index, sent in enumerate(sentences)
+            if sent.strip() and len(sent.strip()) >= CausalityStream.MIN_SENTENCE_CHARS
+        ]
+        results = dict(zip(
+            (index for index, _ in eligible),
+            await self.batcher.predict_many([sent for _, sent in eligible])
+        ))
+        for index, sent in enumerate(sentences):
+            aggregate.add_sentence(index, sent, results.get(index))
+
+        duration = (datetime.now() - start_time).total_seconds()
+        return aggregate.to_results(self.classifier.threshold, self.classifier.use_preprocessing, duration)
+
+    async def handle_stats(self, body):
+        return {
+            'uptime_seconds': time.time() - self.started_at if self.started_at else 0.0,
+            'requests': self.requests,
+            'errors': self.errors,
+            'cpu_profile': active_cpu_profile(),
+            'batching': self.batcher.stats(),
+        }
+
+    async def handle_health(self, body):
+        return {'status': 'ok', 'model_path': str(self.classifier.model_path)}
+
+    async def handle_metrics(self, body):
+        sink = get_metrics_sink()
+        if not hasattr(sink, 'exposition'):
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Metrics are disabled; start the service with --metrics")
+        return sink.exposition()
+
+    # HTTP plumbing
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        content_length = headers.get('content-length') or '0'
+        try:
+            length = int(content_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid Content-Length: {content_length!r}")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target.split('?', 1)[0], headers, body
+
+    async def _dispatch(self, method, path, body):
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} not allowed on {path}")
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+        payload = {}
+        if method == 'POST':
+            try:
+                payload = json.loads(body.decode('utf-8') or '{}')
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+            if not isinstance(payload, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+        return await handler(payload)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    self.requests += 1
+                    status, response = HTTPStatus.OK, await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    self.errors += 1
+                    status, response, headers = e.status, {'error': e.message}, {'connection': 'close'}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    self.errors += 1
+                    status, response, headers = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, {'connection': 'close'}
+
+                keep_alive = headers.get('connection', '').lower() == 'keep-alive'
+                if isinstance(response, str):
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                    payload = response.encode('utf-8')
+                else:
+                    content_type = 'application/json; charset=utf-8'
+                    payload = json.dumps(response, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host='127.0.0.1', port=8080, reuse_port=False):
+        """Start serving; returns the asyncio server (port 0 picks a free port)"""
+        await self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port, reuse_port=reuse_port)
+        self.started_at = time.time()
+        return self._server
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+
+    async def serve_forever(self, host='127.0.0.1', port=8080, reuse_port=False):
+        server = await self.start(host, port, reuse_port)
+        bound = server.sockets[0].getsockname()
+        print(f"? Serving on http://{bound[0]}:{bound[1]}")
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def _build_service(options):
+    if options.get('metrics'):
+        set_metrics_sink(PrometheusMetricsSink())
+    classifier = CausalityClassifier(
+        options['model_path'], options['threshold'],
+        backend=options['backend'], quantization=options['quantization']
+    )
+    return InferenceService(classifier, options['max_batch_size'], options['max_wait_ms'])
+
+
+def _serve_replica(cpu_profile, replica_index, options):
+    """Replica process: apply its slice of the CPU profile, then serve on the shared port"""
+    apply_cpu_profile(cpu_profile, replica_index, options['backend'])
+    service = _build_service(options)
+    try:
+        asyncio.run(service.serve_forever(options['host'], options['port'], reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(options, cpu_profile=None):
+    """
+    Run the service in this process, or one process per replica of the profile
+
+    Args:
+        options: dict with model_path, threshold, backend, quantization,
+            max_batch_size, max_wait_ms, host, port and metrics (serve /metrics)
+        cpu_profile: Optional CPUProfile
+    """
+    if cpu_profile is None or cpu_profile.replicas == 1:
+        if cpu_profile is not None:
+            apply_cpu_profile(cpu_profile, 0, options['backend'])
+        service = _build_service(options)
+        try:
+            asyncio.run(service.serve_forever(options['host'], options['port']))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    # Spawn so replicas never inherit torch's thread pools from this process
+    context = multiprocessing.get_context('spawn')
+    processes = [
+        context.Process(target=_serve_replica, args=(cpu_profile, index, options), name=f'replica-{index}')
+        for index in range(cpu_profile.replicas)
+    ]
+    print(f"? Starting {len(processes)} replicas ({cpu_profile.describe()})")
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the causality classifier over HTTP")
+    parser.add_argument('--model-path', default='PrashantRGore/drug-causality-bert-v2-model')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--max-batch-size', type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument('--backend', default='torch', choices=['torch', 'onnx'])
+    parser.add_argument('--quantization', default=None, choices=['int8'])
+    parser.add_argument('--cpu-profile', help="CPU profile spec or JSON file (default: $DRUG_CAUSALITY_CPU_PROFILE)")
+    parser.add_argument('--metrics', action='store_true', help="Record per-stage timings and serve them on /metrics")
+    args = parser.parse_args()
+
+    cpu_profile = parse_cpu_profile(args.cpu_profile) if args.cpu_profile else get_cpu_profile()
+    options = {
+        'model_path': args.model_path,
+        'threshold': args.threshold,
+        'backend': args.backend,
+        'quantization': args.quantization,
+        'max_batch_size': args.max_batch_size,
+        'max_wait_ms': args.max_wait_ms,
+        'host': args.host,
+        'port': args.port,
+        'metrics': args.metrics,
+    }
+    serve(options, cpu_profile)
+
+
+if __name__ == "__main__":
+    main()
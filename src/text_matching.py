@@ -0,0 +1,331 @@
+"""
+Compiled multi-pattern matching for medical text
+
+Patterns are compiled once into a trie-shaped regular expression, e.g.
+['adverse event', 'adverse effect', 'adr'] becomes
+'ad(?:r|verse e(?:ffect|vent))'. The regex engine then walks the trie in C,
+so a scan costs roughly O(text length x match depth) no matter how many
+patterns there are, instead of one full pass per pattern.
+
+Matching is leftmost-longest, with optional word-boundary semantics.
+"""
+
+import json
+import re
+from bisect import bisect_right
+from pathlib import Path
+
+
+_END = ''
+
+# Joins texts for batch scanning; never part of a pattern
+_SEPARATOR = '\x00'
+
+
+def _build_trie(patterns):
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[_END] = True
+    return trie
+
+
+def _trie_to_regex(node):
+    alternatives = [
+        re.escape(char) + _trie_to_regex(child)
+        for char, child in sorted((k, v) for k, v in node.items() if k != _END)
+    ]
+    if not alternatives:
+        return ''
+
+    if len(alternatives) == 1 and _END not in node:
+        return alternatives[0]
+
+    body = '(?:' + '|'.join(alternatives) + ')'
+    # Optional tail: the greedy '?' prefers the longer pattern
+    return body + '?' if _END in node else body
+
+
+def trie_regex(patterns):
+    """Regex source matching any of the patterns, preferring the longest"""
+    patterns = [p for p in dict.fromkeys(patterns) if p]
+    if not patterns:
+        # Never matches
+        return r'(?!x)x'
+    return _trie_to_regex(_build_trie(patterns))
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class MultiPatternMatcher:
+    """
+    Find many literal patterns in one pass
+
+    Matching is case-sensitive; callers lowercase text and patterns first,
+    as the rest of the pipeline does.
+
+    Args:
+        patterns: Iterable of literal strings
+        word_boundary: Only match patterns not preceded or followed by a
+            word character (no matches inside other words)
+    """
+
+    def __init__(self, patterns, word_boundary=False):
+        self.patterns = [p for p in dict.fromkeys(patterns) if p]
+        self.word_boundary = word_boundary
+        self.index = {p: i for i, p in enumerate(self.patterns)}
+
+        source = trie_regex(self.patterns)
+        if word_boundary:
+            source = r'(?<!\w)(?:' + source + r')(?!\w)'
+
+        self.regex = re.compile(source)
+        # Zero-width lookahead: reports the longest match starting at every position
+        self._overlap_regex = re.compile('(?=(' + source + '))')
+
+        # Patterns that are proper prefixes of each pattern also occur wherever
+        # the longer pattern occurs (at a word boundary, if required)
+        self._prefixes = {}
+        for pattern in self.patterns:
+            prefixes = [pattern[:n] for n in range(1, len(pattern)) if pattern[:n] in self.index]
+            if word_boundary:
+                prefixes = [p for p in prefixes if not _is_word_char(pattern[len(p)])]
+            self._prefixes[pattern] = prefixes
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def finditer(self, text):
+        """Yield non-overlapping (start, end, pattern) matches, leftmost-longest"""
+        for match in self.regex.finditer(text):
+            yield match.start(), match.end(), match.group()
+
+    def occurrences(self, text):
+        """
+        All occurrences, including overlapping and nested ones
+
+        Returns:
+            List of (start, end, pattern) sorted by start, longest first
+        """
+        # Nothing can start before the leftmost match
+        first = self.regex.search(text)
+        if first is None:
+            return []
+
+        found = []
+        for match in self._overlap_regex.finditer(text, first.start()):
+            start = match.start()
+            longest = match.group(1)
+            found.append((start, start + len(longest), longest))
+            for prefix in reversed(self._prefixes[longest]):
+                found.append((start, start + len(prefix), prefix))
+        return found
+
+    def present(self, text):
+        """Set of patterns that occur anywhere in the text"""
+        return {pattern for _, _, pattern in self.occurrences(text)}
+
+    def counts(self, text):
+        """Occurrences per pattern (overlapping occurrences counted)"""
+        counts = {}
+        for _, _, pattern in self.occurrences(text):
+            counts[pattern] = counts.get(pattern, 0) + 1
+        return counts
+
+
+class MarkerDetector:
+    """
+    Case-insensitive marker detection with spans
+
+    Finds every marker of a (possibly large) list in one scan of the
+    lowercased text.
+
+    Args:
+        markers: Marker phrases; the order is kept in 'markers_found'
+        word_boundary: Only match whole words/phrases
+    """
+
+    def __init__(self, markers, word_boundary=False):
+        self.markers = [m.lower() for m in dict.fromkeys(markers) if m and _SEPARATOR not in m]
+        self.matcher = MultiPatternMatcher(self.markers, word_boundary=word_boundary)
+
+    def __len__(self):
+        return len(self.markers)
+
+    def detect(self, text):
+        """
+        Detect markers in one text
+
+        Returns:
+            dict with:
+                has_markers: Whether any marker occurs
+                markers_found: Distinct markers present, in marker-list order
+                marker_count: Number of distinct markers present
+                spans: (start, end, marker) for every occurrence, offsets
+                    into text.lower()
+                occurrences: Occurrences per marker
+        """
+        return self._summarize(self.matcher.occurrences(text.lower()))
+
+    def _summarize(self, spans):
+        counts = {}
+        for _, _, marker in spans:
+            counts[marker] = counts.get(marker, 0) + 1
+        found = sorted(counts, key=self.matcher.index.__getitem__)
+
+        return {
+            'has_markers': bool(found),
+            'markers_found': found,
+            'marker_count': len(found),
+            'spans': spans,
+            'occurrences': counts,
+        }
+
+    def detect_batch(self, texts):
+        """
+        Detect markers in many texts with a single scan
+
+        Texts are joined with a NUL separator (which no marker contains), scanned
+        once, and the spans are mapped back to offsets within each text.
+
+        Returns:
+            List of dicts in input order, same format as detect()
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+
+        lowered = [text.lower().replace(_SEPARATOR, ' ') for text in texts]
+        starts = []
+        position = 0
+        for text in lowered:
+            starts.append(position)
+            position += len(text) + 1
+
+        spans_per_text = [[] for _ in texts]
+        for start, end, marker in self.matcher.occurrences(_SEPARATOR.join(lowered)):
+            i = bisect_right(starts, start) - 1
+            offset = starts[i]
+            spans_per_text[i].append((start - offset, end - offset, marker))
+
+        return [self._summarize(spans) for spans in spans_per_text]
+
+
+class ReplacementTable:
+    """
+    Compiled phrase replacement table
+
+    Args:
+        replacements: Mapping (or iterable of pairs) old -> new, in priority order
+        word_boundary: Only replace whole words/phrases, so e.g. 'adr' no
+            longer rewrites the inside of 'adrenaline'
+        compat: Reproduce the legacy behaviour of applying str.replace once
+            per entry in order, including replacements that create new matches
+            for later entries
+
+    In the default single-pass mode every position is rewritten at most once,
+    using the longest entry that matches there. Compat mode first rejects
+    texts that contain no entry with one scan. Otherwise small tables run the
+    sequential str.replace loop (cheaper than any scan in CPython), and large
+    tables only run str.replace for entries that occur, rescanning after each
+    replacement that changed the text. Either way the output is identical to
+    the sequential loop.
+    """
+
+    # Below this size the plain str.replace loop beats scanning for candidates
+    COMPAT_SCAN_MIN_RULES = 128
+
+    def __init__(self, replacements, word_boundary=False, compat=False):
+        if compat and word_boundary:
+            raise ValueError("compat mode reproduces plain substring replacement; word_boundary is not supported")
+
+        items = replacements.items() if hasattr(replacements, 'items') else replacements
+        self.rules = [(old, new) for old, new in items if old]
+        self.word_boundary = word_boundary
+        self.compat = compat
+
+        # First entry wins if a phrase is listed twice
+        self.mapping = {}
+        for old, new in self.rules:
+            self.mapping.setdefault(old, new)
+
+        self.matcher = MultiPatternMatcher(self.mapping.keys(), word_boundary=word_boundary)
+
+    def __len__(self):
+        return len(self.mapping)
+
+    def _apply_compat(self, text):
+        # No entry anywhere in the text: nothing to do
+        if self.matcher.regex.search(text) is None:
+            return text
+
+        if len(self.rules) < self.COMPAT_SCAN_MIN_RULES:
+            for old, new in self.rules:
+                text = text.replace(old, new)
+            return text
+
+        present = self.matcher.present(text)
+
+        for old, new in self.rules:
+            if old in present and old != new:
+                replaced = text.replace(old, new)
+                if replaced != text:
+                    text = replaced
+                    present = self.matcher.present(text)
+        return text
+
+    def apply(self, text):
+        """Rewrite text with the table"""
+        if self.compat:
+            return self._apply_compat(text)
+        return self.matcher.regex.sub(lambda match: self.mapping[match.group()], text)
+
+
+def load_replacement_table(path, base=None, word_boundary=True, lowercase=True):
+    """
+    Load a (site-specific) synonym/replacement table from a file
+
+    Supported formats:
+        .json: object mapping phrase -> replacement
+        anything else: one 'phrase<TAB>replacement' pair per line; blank
+            lines and lines starting with '#' are ignored
+
+    Args:
+        path: File to load
+        base: Optional mapping merged in first (file entries override it)
+        word_boundary: Whole-word matching for the compiled table
+        lowercase: Lowercase phrases and replacements (preprocessing works
+            on lowercased text)
+
+    Returns:
+        ReplacementTable in single-pass mode
+    """
+    path = Path(path)
+    entries = dict(base or {})
+
+    if path.suffix.lower() == '.json':
+        with open(path, encoding='utf-8') as f:
+            loaded = json.load(f)
+        pairs = loaded.items()
+    else:
+        pairs = []
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.rstrip('\n')
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                if '\t' not in line:
+                    raise ValueError(f"{path}:{line_number}: expected 'phrase<TAB>replacement'")
+                old, new = line.split('\t', 1)
+                pairs.append((old.strip(), new.strip()))
+
+    for old, new in pairs:
+        if lowercase:
+            old, new = old.lower(), new.lower()
+        entries[old] = new
+
+    return ReplacementTable(entries, word_boundary=word_boundary)
@@ -1,9 +1,12 @@
 ﻿import streamlit as st
 from src.ollama_report_generator import OllamaReportGenerator
-import PyPDF2
+from src.pdf_text import extract_pdf_pages
+from src.batch_jobs import BatchJobRunner
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import torch
 import os
+import hashlib
+import time
 
 MODEL_OPTIONS = {
     "Llama 3.2 (3B)": "llama3.2:3b",
@@ -39,6 +42,76 @@ def load_biobert_model():
 
 model, tokenizer = load_biobert_model()
 
+# Uploads whose extracted text is kept across reruns
+MAX_CACHED_UPLOADS = 16
+
+@st.cache_data(max_entries=MAX_CACHED_UPLOADS, show_spinner="Extracting PDF text...")
+def extract_uploaded_pdf(file_hash, _data):
+    """Text and unreadable pages of an upload, memoized by content hash"""
+    pages = extract_pdf_pages(_data)
+    text = "".join(page.text + "\n" for page in pages)
+    return text, [(page.number, page.error) for page in pages if page.error]
+
+# Seconds between progress refreshes of a running batch
+BATCH_REFRESH_SECONDS = 2
+
+@st.cache_resource
+def get_batch_runner():
+    """Background batch runner shared by all sessions (one model, one job at a time)"""
+    return BatchJobRunner(model_path="PrashantRGore/drug-causality-bert-v2-model")
+
+def show_batch_job(job):
+    """Progress, per-file results and the report archive of a batch job"""
+    snapshot = job.snapshot()
+    st.progress(
+        snapshot['progress'],
+        text=f"{snapshot['finished_files']}/{snapshot['total_files']} files · {snapshot['status']} · {snapshot['elapsed_seconds']:.0f}s",
+    )
+    st.dataframe(
+        [
+            {
+                "File": entry['file'],
+                "Status": entry['status'],
+                "Pages": entry['pages'],
+                "Classification": entry['classification'] or "",
+                "Confidence": f"{entry['confidence']:.2%}" if entry.get('confidence') is not None else "",
+                "Seconds": round(entry['seconds'], 2) if entry['seconds'] is not None else None,
+                "Error": entry['error'] or "",
+            }
+            for entry in snapshot['files']
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    if snapshot['status'] == "failed":
+        st.error(f"Batch failed: {snapshot['error']}")
+    if job.done:
+        summary = job.summary()
+        st.success(
+            f"Batch {snapshot['status']}: {summary['related_count']} related, "
+            f"{summary['not_related_count']} not related, {summary['failed']} failed"
+        )
+        st.download_button(
+            "Download All Reports (.zip)",
+            data=job.archive(),
+            file_name=f"{job.job_id}_reports.zip",
+            mime="application/zip",
+            key=f"download_{job.job_id}",
+        )
+
+# Older Streamlit versions lack fragments; the page then reruns as a whole while a batch runs
+if hasattr(st, "fragment"):
+    @st.fragment(run_every=BATCH_REFRESH_SECONDS)
+    def show_running_batch_job(job):
+        show_batch_job(job)
+        if job.done:
+            st.rerun()
+else:
+    show_running_batch_job = None
+
+batch_rerun_pending = False
+
 tab1, tab2, tab3, tab4 = st.tabs([
     "Single Text",
     "PDF Analysis",
@@ -79,10 +152,10 @@ with tab2:
     model_name_2 = MODEL_OPTIONS[model_choice_2]
 
     if pdf_file is not None:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        full_text = ""
-        for page in pdf_reader.pages:
-            full_text += page.extract_text() + "\n"
+        pdf_bytes = pdf_file.getvalue()
+        full_text, page_errors = extract_uploaded_pdf(hashlib.sha256(pdf_bytes).hexdigest(), pdf_bytes)
+        for page_number, error in page_errors:
+            st.warning(f"Page {page_number} could not be read: {error}")
 
         st.text_area("Extracted Text (Preview)", full_text[:500] + "...", height=150)
 
@@ -117,8 +190,41 @@ with tab2:
         st.info("Please upload a medical case report PDF.")
 
 with tab3:
-    st.header("Batch Processing (Coming Soon)")
-    st.warning("Batch PDF analysis is under construction for this demo.")
+    st.header("Batch Processing")
+    st.caption("Files are processed in the background; you can keep using the other tabs while a batch runs.")
+    batch_files = st.file_uploader("Upload medical case report PDFs", type=["pdf"], accept_multiple_files=True, key="batch_pdfs")
+    batch_threshold = st.slider("Classification threshold", 0.3, 0.9, 0.5, step=0.01, key="batch_threshold")
+    batch_verdict_only = st.checkbox(
+        "Verdict only (stop scoring a file once a related sentence is found)", key="batch_verdict_only"
+    )
+
+    runner = get_batch_runner()
+    job = runner.get(st.session_state.get('batch_job_id'))
+    job_running = job is not None and not job.done
+
+    start_col, cancel_col = st.columns(2)
+    if start_col.button("Start Batch", disabled=not batch_files or job_running):
+        job_id = runner.submit(
+            [(uploaded.name, uploaded.getvalue()) for uploaded in batch_files],
+            threshold=batch_threshold,
+            verdict_only=batch_verdict_only,
+        )
+        st.session_state['batch_job_id'] = job_id
+        job = runner.get(job_id)
+        job_running = True
+    if cancel_col.button("Cancel Batch", disabled=not job_running):
+        job.cancel()
+        st.info("Cancelling: the file in progress will finish, remaining files are skipped.")
+
+    if job is None:
+        st.info("Please upload one or more medical case report PDFs and start a batch.")
+    elif job.done:
+        show_batch_job(job)
+    elif show_running_batch_job is not None:
+        show_running_batch_job(job)
+    else:
+        show_batch_job(job)
+        batch_rerun_pending = True
 
 with tab4:
     st.header("Instructions & About")
@@ -127,12 +233,13 @@ with tab4:
     
     1. **Single Text Classification**: Enter a clinical sentence to classify drug-event causality relationship.
     2. **PDF Analysis**: Upload medical case reports for full document processing with drug/event extraction.
-    3. **Classification Threshold**: Adjust to balance between sensitivity and specificity:
+    3. **Batch Processing**: Upload many PDFs at once; they are classified in the background with live per-file progress, and all reports download as one zip archive.
+    4. **Classification Threshold**: Adjust to balance between sensitivity and specificity:
        - 0.3–0.4: High sensitivity (catches more cases)
        - 0.5: Balanced (default)
        - 0.7–0.8: High precision (fewer false positives)
-    4. **Ollama Model Selection**: Choose from local LLM models for clinical report generation (local deployment only).
-    5. **Local Privacy**: Ollama runs reports 100% offline using local models; no cloud API required.
+    5. **Ollama Model Selection**: Choose from local LLM models for clinical report generation (local deployment only).
+    6. **Local Privacy**: Ollama runs reports 100% offline using local models; no cloud API required.
     
     ### Requirements for Local Use with Ollama
     - Install Ollama from https://ollama.com/download
@@ -156,3 +263,7 @@ with tab4:
     """)
 
 st.markdown("> **Switch between multiple local LLMs for report style, privacy, and accuracy (local deployment only).**")
+
+if batch_rerun_pending:
+    time.sleep(BATCH_REFRESH_SECONDS)
+    st.rerun()